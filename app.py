@@ -1,11 +1,36 @@
+import os
+import time
+import queue
+import threading
 import gradio as gr
-from ghcp_exclusion_builder.scanner import scan_directory_for_pii
+from ghcp_exclusion_builder.scanner import (
+    scan_directory_for_pii, scan_git_refs_for_pii, exclusion_rule_lines, MAX_ANALYZED_BYTES, NLP_BATCH_SIZE
+)
 from ghcp_exclusion_builder.exclusions import (
     COMMON_NON_TEXT_EXCLUSIONS, EXCLUSION_PRESETS
 )
 from ghcp_exclusion_builder.presidio_analyzer_setup import (
-    get_presidio_analyzer, PII_ENTITY_TYPES
+    get_presidio_analyzer, PII_ENTITY_TYPES, SPACY_MODEL_CHOICES, SPACY_MODEL_NAME
 )
+from ghcp_exclusion_builder.jobs import ScanScheduler, DEFAULT_WORKER_BUDGET
+from ghcp_exclusion_builder.triage import triage_directory_for_pii, TRIAGE_TIME_BUDGET_SECONDS
+
+# Scans are CPU-heavy: on a shared instance at most this many run at once,
+# and at most SCAN_QUEUE_SIZE requests wait in the server-side queue
+MAX_CONCURRENT_SCANS = int(os.environ.get("GHCP_MAX_CONCURRENT_SCANS", "1"))
+SCAN_QUEUE_SIZE = int(os.environ.get("GHCP_SCAN_QUEUE_SIZE", "8"))
+
+# Minimum seconds between partial result updates sent to the browser
+OUTPUT_UPDATE_INTERVAL = 0.5
+
+# Cancel events of the running scans, by Gradio session
+_active_scans = {}
+
+# Worker processes shared by all multi-repository scan jobs submitted through the API
+SCAN_JOB_WORKERS = int(os.environ.get("GHCP_SCAN_JOB_WORKERS", str(DEFAULT_WORKER_BUDGET)))
+
+_scan_scheduler = None
+_scan_scheduler_lock = threading.Lock()
 
 
 def update_effective_exclusions_display(
@@ -27,12 +52,236 @@ def update_effective_exclusions_display(
     return ", ".join(sorted(list(effective_patterns)))
 
 
-def main():
+def report_gradio_progress(progress, done_count, total_count, desc):
+    """Forward a scanner progress report to a Gradio progress tracker."""
+    if total_count is None:
+        progress((done_count, None), desc=desc, unit="files")
+    else:
+        progress(done_count / max(total_count, 1), desc=desc)
+
+
+def _partial_output(rule_lines, flagged_count):
+    header = f"# Scanning... {flagged_count} files flagged so far\n\n"
+    return header + "\n".join(rule_lines)
+
+
+def run_scan(
+    directory_path,
+    selected_presets,
+    custom_exclusions_str,
+    confidence_threshold,
+    min_entities_threshold,
+    selected_entity_types,
+    num_workers,
+    use_cache,
+    clear_cache,
+    incremental,
+    changed_since_ref,
+    max_analyzed_bytes,
+    use_prefilter,
+    nlp_batch_size,
+    spacy_model_name,
+    git_refs_str,
+    minimize_percent,
+    use_gitignore,
+    triage,
+    triage_time_budget,
+    file_time_budget,
+    extract_source,
+    sample_structured,
+    request: gr.Request,
+    progress=gr.Progress(track_tqdm=True)
+):
+    """
+    Run a scan in a background thread and stream the exclusion rules of
+    flagged files to the UI while it runs. The scan stops when the cancel
+    button is pressed or the browser disconnects. With git refs given, their
+    committed trees are scanned instead of the working tree.
+    """
+    events = queue.Queue()
+    outcome = {}
+    cancel_event = threading.Event()
+    _active_scans[request.session_hash] = cancel_event
+
+    git_refs = [ref.strip() for ref in (git_refs_str or "").split(",") if ref.strip()]
+
+    def scan():
+        try:
+            if triage:
+                outcome['result'] = triage_directory_for_pii(
+                    directory_path,
+                    selected_presets,
+                    custom_exclusions_str,
+                    confidence_threshold=confidence_threshold,
+                    min_entities_threshold=min_entities_threshold,
+                    selected_entity_types=selected_entity_types,
+                    time_budget_seconds=triage_time_budget or TRIAGE_TIME_BUDGET_SECONDS,
+                    use_prefilter=use_prefilter,
+                    use_gitignore=use_gitignore,
+                    spacy_model_name=spacy_model_name,
+                    nlp_batch_size=nlp_batch_size,
+                    cancel_event=cancel_event,
+                    progress=lambda *report: events.put(("progress", report))
+                )
+                return
+            if git_refs:
+                outcome['result'] = scan_git_refs_for_pii(
+                    directory_path,
+                    git_refs,
+                    selected_presets,
+                    custom_exclusions_str,
+                    confidence_threshold=confidence_threshold,
+                    min_entities_threshold=min_entities_threshold,
+                    selected_entity_types=selected_entity_types,
+                    use_cache=use_cache,
+                    max_analyzed_bytes=max_analyzed_bytes,
+                    use_prefilter=use_prefilter,
+                    nlp_batch_size=nlp_batch_size,
+                    spacy_model_name=spacy_model_name,
+                    on_finding=lambda finding: events.put(("finding", finding)),
+                    cancel_event=cancel_event,
+                    file_time_budget=file_time_budget or None,
+                    extract_source=extract_source,
+                    sample_structured=sample_structured,
+                    progress=lambda *report: events.put(("progress", report))
+                )
+                return
+            outcome['result'] = scan_directory_for_pii(
+                directory_path,
+                selected_presets,
+                custom_exclusions_str,
+                confidence_threshold=confidence_threshold,
+                min_entities_threshold=min_entities_threshold,
+                selected_entity_types=selected_entity_types,
+                num_workers=num_workers,
+                use_cache=use_cache,
+                clear_cache=clear_cache,
+                incremental=incremental,
+                changed_since_ref=changed_since_ref or None,
+                max_analyzed_bytes=max_analyzed_bytes,
+                use_prefilter=use_prefilter,
+                nlp_batch_size=nlp_batch_size,
+                spacy_model_name=spacy_model_name,
+                on_finding=lambda finding: events.put(("finding", finding)),
+                collect_rules=True,
+                cancel_event=cancel_event,
+                minimize_ratio=minimize_percent / 100.0 if minimize_percent else None,
+                use_gitignore=use_gitignore,
+                file_time_budget=file_time_budget or None,
+                extract_source=extract_source,
+                sample_structured=sample_structured,
+                progress=lambda *report: events.put(("progress", report))
+            )
+        except Exception as e:
+            outcome['result'] = f"Error during scan: {e}"
+        finally:
+            events.put(("done", None))
+
+    # Gradio UI updates stay on this thread; the scan thread only posts events
+    threading.Thread(target=scan, name="pii-scan", daemon=True).start()
+    rule_lines = []
+    flagged_count = 0
+    current_ref = None
+    last_update = time.monotonic()
     try:
-        get_presidio_analyzer()
+        while True:
+            kind, payload = events.get()
+            if kind == "done":
+                break
+            if kind == "progress":
+                report_gradio_progress(progress, *payload)
+                continue
+            if payload.get("ref", current_ref) != current_ref:
+                current_ref = payload["ref"]
+                rule_lines.append(f"# --- Ref: {current_ref} ---")
+            if "error" in payload:
+                rule_lines.append(f"# Error processing: {payload['path']} - {payload['error']}")
+            else:
+                flagged_count += 1
+                rule_lines.extend(exclusion_rule_lines(payload['path'], payload['pii_types'], payload.get('pii_columns')))
+            if time.monotonic() - last_update >= OUTPUT_UPDATE_INTERVAL:
+                last_update = time.monotonic()
+                yield _partial_output(rule_lines, flagged_count)
+        yield outcome['result']
+    finally:
+        # Also reached when the browser goes away while the scan is running
+        cancel_event.set()
+        if _active_scans.get(request.session_hash) is cancel_event:
+            del _active_scans[request.session_hash]
+
+
+def cancel_scan(request: gr.Request):
+    cancel_event = _active_scans.get(request.session_hash)
+    if cancel_event is not None:
+        cancel_event.set()
+
+
+# --- Scan Jobs API ---
+def get_scan_scheduler():
+    """Create the shared job scheduler on first use and resume unfinished jobs."""
+    global _scan_scheduler
+    with _scan_scheduler_lock:
+        if _scan_scheduler is None:
+            _scan_scheduler = ScanScheduler(worker_budget=SCAN_JOB_WORKERS)
+            _scan_scheduler.resume()
+    return _scan_scheduler
+
+
+def submit_scan_job(repository_paths: list[str], settings: dict | None = None) -> str:
+    """
+    Queue a PII scan of several repository roots and return the job id.
+    ``settings`` takes scan options by name, e.g. ``selected_entity_types``,
+    ``selected_presets``, ``confidence_threshold`` or ``min_entities_threshold``.
+    """
+    try:
+        return get_scan_scheduler().submit(repository_paths, settings)
+    except ValueError as e:
+        raise gr.Error(str(e))
+
+
+def scan_job_status(job_id: str) -> dict:
+    """Progress of a scan job: counts per status and the state of each repository."""
+    status = get_scan_scheduler().status(job_id)
+    if status is None:
+        raise gr.Error(f"Unknown scan job: {job_id}")
+    return status
+
+
+def scan_job_result(job_id: str) -> dict:
+    """Settings, summaries, findings and exclusion rules of every repository of a scan job."""
+    results = get_scan_scheduler().results(job_id)
+    if results is None:
+        raise gr.Error(f"Unknown scan job: {job_id}")
+    for repository in results["repositories"]:
+        rule_lines = []
+        for finding in repository["findings"]:
+            if "error" not in finding:
+                rule_lines.extend(exclusion_rule_lines(finding["path"], finding["pii_types"], finding.get("pii_columns")))
+        repository["rules"] = "\n".join(rule_lines)
+        # The Gradio client would take dicts with a "path" key for files to download
+        repository["findings"] = [
+            {"file": finding["path"], **{key: value for key, value in finding.items() if key != "path"}}
+            for finding in repository["findings"]
+        ]
+    return results
+
+
+def cancel_scan_job(job_id: str) -> int:
+    """Drop the queued repositories of a scan job and return how many were dropped."""
+    return get_scan_scheduler().cancel(job_id)
+
+
+def warm_up_analyzer():
+    try:
+        get_presidio_analyzer(["PERSON"])
     except RuntimeError as e:
         print(f"Failed to initialize Presidio Analyzer on startup: {e}")
 
+
+def main():
+    # Load the default model in the background so the UI starts serving right away
+    threading.Thread(target=warm_up_analyzer, name="analyzer-warm-up", daemon=True).start()
+
     with gr.Blocks() as iface:
         gr.Markdown(
             "## PII Scanner & GitHub Copilot Exclusion Generator\n"
@@ -66,6 +315,11 @@ def main():
                         "/dist/**, *.log"
                     )
                 )
+                use_gitignore_checkbox = gr.Checkbox(
+                    value=False,
+                    label="Respect .gitignore",
+                    info="Skip files and directories the repository's .gitignore files ignore"
+                )
         
         with gr.Row():
             with gr.Column(scale=1):
@@ -86,7 +340,104 @@ def main():
                     minimum=1,
                     maximum=100
                 )
+            with gr.Column(scale=1):
+                max_analyzed_bytes_number = gr.Number(
+                    value=MAX_ANALYZED_BYTES,
+                    precision=0,
+                    label="Max Bytes Analyzed per File",
+                    info="Larger files are analyzed in overlapping windows up to this limit (0 = no limit)",
+                    minimum=0
+                )
+                file_time_budget_number = gr.Number(
+                    value=0,
+                    label="Max Seconds per File",
+                    info="Abandon and list files whose analysis takes longer (0 = no limit)",
+                    minimum=0
+                )
+            with gr.Column(scale=1):
+                minimize_slider = gr.Slider(
+                    minimum=0,
+                    maximum=100,
+                    value=0,
+                    step=5,
+                    label="Minimize Rules (% flagged)",
+                    info="Replace per-file rules with /dir/** or extension globs where at least this share "
+                         "of the files is flagged (0 = one rule per file)"
+                )
         
+        with gr.Row():
+            with gr.Column(scale=1):
+                num_workers_slider = gr.Slider(
+                    minimum=1,
+                    maximum=max(2, os.cpu_count() or 1),
+                    value=1,
+                    step=1,
+                    label="Worker Processes",
+                    info="Number of processes analyzing files in parallel (1 = serial scan)"
+                )
+                nlp_batch_size_number = gr.Number(
+                    value=NLP_BATCH_SIZE,
+                    precision=0,
+                    label="NLP Batch Size",
+                    info="Small files run through the spaCy pipeline together (1 = one file at a time)",
+                    minimum=1,
+                    maximum=1024
+                )
+            with gr.Column(scale=1):
+                use_cache_checkbox = gr.Checkbox(
+                    value=True,
+                    label="Use Analysis Cache",
+                    info="Reuse results for file content analyzed in earlier scans"
+                )
+                clear_cache_checkbox = gr.Checkbox(
+                    value=False,
+                    label="Clear Cache Before Scanning"
+                )
+                use_prefilter_checkbox = gr.Checkbox(
+                    value=True,
+                    label="Prefilter Files",
+                    info="Skip NLP for files that cannot contain the selected PII types"
+                )
+                extract_source_checkbox = gr.Checkbox(
+                    value=True,
+                    label="Comments and Strings Only in Source Files",
+                    info="Analyze only comments, string literals and data values of Python, JS/TS, Java, C#, Go, "
+                         "YAML and JSON files"
+                )
+                sample_structured_checkbox = gr.Checkbox(
+                    value=True,
+                    label="Sample Columns of Data Files",
+                    info="Analyze CSV, TSV, JSON Lines and JSON arrays from a bounded sample of values per column, "
+                         "whatever their size"
+                )
+            with gr.Column(scale=1):
+                incremental_checkbox = gr.Checkbox(
+                    value=False,
+                    label="Incremental Scan (git)",
+                    info="Only analyze files changed since the last scan and merge with its results"
+                )
+                changed_since_ref_textbox = gr.Textbox(
+                    label="Changed Since Ref (optional)",
+                    placeholder="e.g., main (defaults to the last scanned commit)"
+                )
+                git_refs_textbox = gr.Textbox(
+                    label="Git Refs to Scan (optional, comma-separated)",
+                    placeholder="e.g., main, release/2.0",
+                    info="Scan these refs from the git object database, without a checkout (bare mirrors work); "
+                         "worker processes and incremental mode do not apply"
+                )
+                triage_checkbox = gr.Checkbox(
+                    value=False,
+                    label="Triage Mode (sampling)",
+                    info="Estimate PII density per directory from sampled files instead of scanning everything"
+                )
+                triage_time_budget_number = gr.Number(
+                    value=TRIAGE_TIME_BUDGET_SECONDS,
+                    precision=0,
+                    label="Triage Time Budget (seconds)",
+                    minimum=1
+                )
+
         with gr.Row():
             entity_types_checkboxgroup = gr.CheckboxGroup(
                 choices=PII_ENTITY_TYPES,
@@ -94,6 +445,12 @@ def main():
                 label="PII Entity Types to Detect",
                 info="Select which types of PII entities to detect in files"
             )
+            spacy_model_dropdown = gr.Dropdown(
+                choices=SPACY_MODEL_CHOICES,
+                value=SPACY_MODEL_NAME,
+                label="spaCy Model",
+                info="Model used for PERSON, LOCATION, NRP and DATE_TIME; smaller models load and run faster"
+            )
 
         effective_patterns_display = gr.Textbox(
             label="Effective Exclusion Patterns (Read-only)",
@@ -101,7 +458,9 @@ def main():
             lines=3
         )
 
-        scan_button = gr.Button("Scan for PII and Generate Exclusions")
+        with gr.Row():
+            scan_button = gr.Button("Scan for PII and Generate Exclusions", variant="primary")
+            cancel_button = gr.Button("Cancel Scan", variant="stop")
 
         output_textbox = gr.Textbox(
             label="Generated GitHub Copilot Exclusion Rules",
@@ -127,18 +486,45 @@ def main():
         )
 
         scan_button.click(
-            fn=scan_directory_for_pii,
+            fn=run_scan,
             inputs=[
                 directory_path_input,
                 presets_checkboxgroup,
                 custom_exclusions_textbox,
                 confidence_threshold,
                 min_entities_threshold,
-                entity_types_checkboxgroup
+                entity_types_checkboxgroup,
+                num_workers_slider,
+                use_cache_checkbox,
+                clear_cache_checkbox,
+                incremental_checkbox,
+                changed_since_ref_textbox,
+                max_analyzed_bytes_number,
+                use_prefilter_checkbox,
+                nlp_batch_size_number,
+                spacy_model_dropdown,
+                git_refs_textbox,
+                minimize_slider,
+                use_gitignore_checkbox,
+                triage_checkbox,
+                triage_time_budget_number,
+                file_time_budget_number,
+                extract_source_checkbox,
+                sample_structured_checkbox
             ],
-            outputs=output_textbox
+            outputs=output_textbox,
+            concurrency_limit=MAX_CONCURRENT_SCANS,
+            concurrency_id="scan"
         )
+        cancel_button.click(fn=cancel_scan, inputs=None, outputs=None, queue=False)
+
+        # Multi-repository scan jobs, for scripts and scheduled sweeps (see the "Use via API" page)
+        gr.api(submit_scan_job, api_name="submit_scan_job", queue=False)
+        gr.api(scan_job_status, api_name="scan_job_status", queue=False)
+        gr.api(scan_job_result, api_name="scan_job_result", queue=False)
+        gr.api(cancel_scan_job, api_name="cancel_scan_job", queue=False)
 
+    iface.queue(max_size=SCAN_QUEUE_SIZE)
     iface.launch()
 
 
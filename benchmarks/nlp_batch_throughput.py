@@ -0,0 +1,86 @@
+"""
+Compare analyzer throughput (files/second) for different NLP batch sizes.
+
+Generates a synthetic set of small text files, then analyzes all of them once
+per batch size with the same Presidio engine. The prefilter and cache are off
+so every file goes through the NLP pipeline.
+
+    python benchmarks/nlp_batch_throughput.py --files 2000 --batch-sizes 1 8 32 128
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ghcp_exclusion_builder.presidio_analyzer_setup import get_presidio_analyzer, SPACY_MODEL_NAME  # noqa: E402
+from ghcp_exclusion_builder.scanner import MAX_ANALYZED_BYTES, _iter_analyzed_files  # noqa: E402
+
+FIRST_NAMES = ["John", "Jane", "Maria", "Wei", "Olga", "Ahmed", "Lucas", "Priya"]
+LAST_NAMES = ["Doe", "Smith", "Garcia", "Chen", "Ivanova", "Khan", "Silva", "Patel"]
+FILLER_LINES = [
+    "def handler(event, context):",
+    "    return {'statusCode': 200}",
+    "# TODO: refactor this module",
+    "Configuration values are loaded from the environment.",
+    "The quick brown fox jumps over the lazy dog.",
+]
+
+
+def _generate_files(root, file_count, lines_per_file, seed=0):
+    rng = random.Random(seed)
+    paths = []
+    for i in range(file_count):
+        lines = [rng.choice(FILLER_LINES) for _ in range(lines_per_file)]
+        if rng.random() < 0.3:
+            lines.append(f"Author: {rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}")
+        path = os.path.join(root, f"file_{i:05d}.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines))
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--files", type=int, default=1000, help="Number of synthetic files")
+    parser.add_argument("--lines", type=int, default=20, help="Lines per synthetic file")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32, 128])
+    parser.add_argument("--model", default=SPACY_MODEL_NAME, help="spaCy model name or path")
+    parser.add_argument("--entities", nargs="+", default=["PERSON"])
+    args = parser.parse_args()
+
+    analyzer = get_presidio_analyzer(args.entities, args.model)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = _generate_files(tmp_dir, args.files, args.lines)
+        print(f"{args.files} files, model {args.model}, entities {', '.join(args.entities)}")
+        for nlp_batch_size in args.batch_sizes:
+            analysis_options = {
+                'entity_types': args.entities,
+                'confidence_threshold': 0.0,
+                'min_entities_threshold': 1,
+                'max_analyzed_bytes': MAX_ANALYZED_BYTES,
+                'cache_config_key': None,
+                'use_prefilter': False,
+                'nlp_batch_size': nlp_batch_size,
+                'spacy_model_name': args.model,
+                'profile': False,
+            }
+            start = time.perf_counter()
+            entity_count = 0
+            for _path, file_result in _iter_analyzed_files(
+                analyzer, ((path, path, os.path.getsize(path)) for path in paths), analysis_options
+            ):
+                entity_count += len(file_result['results'] or [])
+            elapsed = time.perf_counter() - start
+            print(
+                f"batch size {nlp_batch_size:>4}: {elapsed:7.2f}s, "
+                f"{args.files / elapsed:8.1f} files/s, {entity_count} entities"
+            )
+
+
+if __name__ == "__main__":
+    main()
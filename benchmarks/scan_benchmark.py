@@ -0,0 +1,235 @@
+"""
+Time the scan stages on a synthetic repository and write the results as JSON.
+
+Stages are measured separately: the pruned directory walk, exclusion
+matching (compiled matcher and the reference ``is_excluded``) over every
+path in the tree, file reads (map, sniff, decode) and the full scan with a
+mocked analyzer and, with ``--real``, with the Presidio analyzer.
+
+    python benchmarks/scan_benchmark.py --files 5000 --output results/main.json
+    python benchmarks/scan_benchmark.py --files 5000 --output results/branch.json --compare results/main.json
+"""
+import os
+import re
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import subprocess
+from collections import namedtuple
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic_repo import (  # noqa: E402
+    BENCHMARK_PRESETS, add_generator_arguments, generate_repository, generator_kwargs
+)
+from ghcp_exclusion_builder.exclusions import (  # noqa: E402
+    COMMON_NON_TEXT_EXCLUSIONS, EXCLUSION_PRESETS, ExclusionMatcher, is_excluded
+)
+from ghcp_exclusion_builder.file_reader import SNIFF_BYTES, decode_text, map_file, sniff_text_encoding  # noqa: E402
+from ghcp_exclusion_builder.scanner import scan_directory_for_pii  # noqa: E402
+from ghcp_exclusion_builder.walker import walk_directory  # noqa: E402
+
+RESULT_FORMAT_VERSION = 1
+
+MockResult = namedtuple("MockResult", "entity_type score start end")
+_MOCK_NAME_PATTERN = re.compile(r"\b[A-Z][a-z]+ [A-Z][a-z]+\b")
+
+
+class MockAnalyzer:
+    """Regex stand-in for the Presidio analyzer: every 'Firstname Lastname' is a PERSON."""
+
+    def analyze(self, text, language, entities, **kwargs):
+        return [
+            MockResult("PERSON", 0.85, match.start(), match.end())
+            for match in _MOCK_NAME_PATTERN.finditer(text)
+        ]
+
+
+def _exclusion_patterns():
+    patterns = list(COMMON_NON_TEXT_EXCLUSIONS)
+    for preset_name in BENCHMARK_PRESETS:
+        patterns.extend(p for p in EXCLUSION_PRESETS[preset_name] if p not in patterns)
+    return patterns
+
+
+def _stage(seconds, files=None, bytes_read=None, **extra):
+    stage = {"seconds": round(seconds, 6)}
+    if files is not None:
+        stage["files"] = files
+        stage["files_per_second"] = round(files / seconds, 1) if seconds else None
+    if bytes_read is not None:
+        stage["bytes"] = bytes_read
+        stage["mb_per_second"] = round(bytes_read / seconds / 1e6, 2) if seconds else None
+    stage.update(extra)
+    return stage
+
+
+def time_walk(root, matcher):
+    start = time.perf_counter()
+    candidates = list(walk_directory(root, matcher))
+    elapsed = time.perf_counter() - start
+    return candidates, _stage(elapsed, files=len(candidates))
+
+
+def time_exclusion_matching(root, patterns, matcher):
+    """Match every path of the unpruned tree, like a walk without directory pruning would."""
+    relative_paths = []
+    for dir_path, _dir_names, file_names in os.walk(root):
+        relative_dir = os.path.relpath(dir_path, root).replace(os.sep, "/")
+        prefix = "" if relative_dir == "." else relative_dir + "/"
+        relative_paths.extend(prefix + name for name in file_names)
+
+    start = time.perf_counter()
+    matched = sum(1 for path in relative_paths if matcher.is_excluded_in_tree(path))
+    matcher_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for path in relative_paths:
+        parts = path.split("/")
+        any(is_excluded("/".join(parts[:i]) + "/", patterns) for i in range(1, len(parts))) \
+            or is_excluded(path, patterns)
+    reference_seconds = time.perf_counter() - start
+    return {
+        "matcher": _stage(matcher_seconds, files=len(relative_paths), excluded=matched),
+        "reference_is_excluded": _stage(reference_seconds, files=len(relative_paths)),
+    }
+
+
+def time_reads(candidates):
+    start = time.perf_counter()
+    bytes_read = 0
+    binary_files = 0
+    for _relative_path, file_path_abs, _file_size in candidates:
+        with map_file(file_path_abs) as data:
+            text_encoding = sniff_text_encoding(data[:SNIFF_BYTES])
+            if text_encoding is None:
+                binary_files += 1
+                continue
+            encoding, text_start, _unit_size = text_encoding
+            decode_text(data, text_start, len(data), encoding)
+            bytes_read += len(data)
+    elapsed = time.perf_counter() - start
+    return _stage(elapsed, files=len(candidates), bytes_read=bytes_read, binary_files=binary_files)
+
+
+def time_scan(root, entity_types, scan_options, total_bytes, analyzer=None):
+    scan_kwargs = dict(
+        selected_entity_types=entity_types, min_entities_threshold=1, collect_rules=False, **scan_options
+    )
+    flagged = []
+    start = time.perf_counter()
+    if analyzer is not None:
+        with patch("ghcp_exclusion_builder.scanner.get_presidio_analyzer", return_value=analyzer):
+            summary = scan_directory_for_pii(root, BENCHMARK_PRESETS, "", on_finding=flagged.append, **scan_kwargs)
+    else:
+        summary = scan_directory_for_pii(root, BENCHMARK_PRESETS, "", on_finding=flagged.append, **scan_kwargs)
+    elapsed = time.perf_counter() - start
+    if summary.startswith("Error"):
+        raise RuntimeError(summary)
+    scanned = int(re.search(r"PII in \d+ of (\d+) files", summary).group(1))
+    return _stage(elapsed, files=scanned, bytes_read=total_bytes, flagged_files=len(flagged))
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(root, manifest, args):
+    patterns = _exclusion_patterns()
+    matcher = ExclusionMatcher(patterns)
+    candidates, walk_stage = time_walk(root, matcher)
+    candidate_bytes = sum(size or 0 for _path, _abs, size in candidates)
+    scan_options = {"num_workers": args.workers, "use_prefilter": not args.no_prefilter}
+
+    stages = {
+        "walk": walk_stage,
+        "exclusion_matching": time_exclusion_matching(root, patterns, matcher),
+        "read": time_reads(candidates),
+        "scan_mock_analyzer": time_scan(
+            root, ["PERSON"], {**scan_options, "num_workers": 1}, candidate_bytes, analyzer=MockAnalyzer()
+        ),
+    }
+    if args.real:
+        stages["scan_presidio"] = time_scan(
+            root, args.entities, {**scan_options, "nlp_batch_size": args.nlp_batch_size}, candidate_bytes
+        )
+    return {
+        "format_version": RESULT_FORMAT_VERSION,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": _git_commit(),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "repository": manifest,
+        "options": {
+            "workers": args.workers, "prefilter": not args.no_prefilter, "entities": args.entities,
+            "nlp_batch_size": args.nlp_batch_size, "presets": BENCHMARK_PRESETS,
+        },
+        "stages": stages,
+    }
+
+
+def _flatten_stages(stages, prefix=""):
+    for name, stage in stages.items():
+        if "seconds" in stage:
+            yield prefix + name, stage["seconds"]
+        else:
+            yield from _flatten_stages(stage, prefix + name + ".")
+
+
+def print_report(results, baseline=None):
+    baseline_seconds = dict(_flatten_stages(baseline["stages"])) if baseline else {}
+    for name, seconds in _flatten_stages(results["stages"]):
+        line = f"{name:<45} {seconds:9.3f}s"
+        if name in baseline_seconds and seconds:
+            line += f"   {baseline_seconds[name] / seconds:5.2f}x vs baseline"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    add_generator_arguments(parser)
+    parser.add_argument("--repo", help="Benchmark an existing tree instead of generating one")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes for the Presidio scan")
+    parser.add_argument("--no-prefilter", action="store_true")
+    parser.add_argument("--real", action="store_true", help="Also time a scan with the Presidio analyzer")
+    parser.add_argument("--entities", nargs="+", default=["PERSON", "EMAIL_ADDRESS"])
+    parser.add_argument("--nlp-batch-size", type=int, default=32)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if args.repo:
+            root = args.repo
+            manifest = {"path": os.path.abspath(root)}
+        else:
+            root = tmp_dir
+            manifest = generate_repository(root, **generator_kwargs(args))
+        results = run_benchmarks(root, manifest, args)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f_baseline:
+            baseline = json.load(f_baseline)
+    print_report(results, baseline)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f_results:
+            json.dump(results, f_results, indent=1, sort_keys=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Measure import time and time-to-first-scan in fresh interpreters.
+
+Each measurement runs in a new Python process, so module and model loading
+are paid every time, as they are for a batch job or a freshly started app.
+
+    python benchmarks/startup_time.py --repeat 5 --entities EMAIL_ADDRESS
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ["gradio", "spacy", "presidio_analyzer"]
+
+IMPORT_SCRIPT = """
+import sys, json, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+FIRST_SCAN_SCRIPT = """
+import sys, json, time
+start = time.perf_counter()
+from ghcp_exclusion_builder.scanner import scan_directory_for_pii
+result = scan_directory_for_pii(
+    {directory!r}, None, "", selected_entity_types={entities!r}, min_entities_threshold=1
+)
+elapsed = time.perf_counter() - start
+if result.startswith("Error"):
+    raise SystemExit(result)
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def _run_fresh(script):
+    completed = subprocess.run(
+        [sys.executable, "-c", script], cwd=REPO_ROOT, capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip() or completed.stdout.strip())
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def _measure(label, script, repeat):
+    runs = [_run_fresh(script) for _ in range(repeat)]
+    seconds = statistics.median(run["seconds"] for run in runs)
+    loaded = ", ".join(runs[-1]["loaded"]) or "none"
+    print(f"{label:<40} {seconds * 1000:9.1f} ms   heavy modules loaded: {loaded}")
+
+
+def _generate_files(root, file_count):
+    for i in range(file_count):
+        with open(os.path.join(root, f"file_{i:04d}.txt"), "w", encoding="utf-8") as f:
+            f.write(f"Contact user{i}@example.com about ticket {i}.\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3, help="Fresh processes per measurement")
+    parser.add_argument("--files", type=int, default=50, help="Files in the first-scan directory")
+    parser.add_argument("--entities", nargs="+", default=["EMAIL_ADDRESS"])
+    args = parser.parse_args()
+
+    print(f"median of {args.repeat} fresh processes")
+    _measure("import ghcp_exclusion_builder.scanner", IMPORT_SCRIPT.format(
+        module="ghcp_exclusion_builder.scanner", heavy=HEAVY_MODULES), args.repeat)
+    _measure("import app (Gradio UI)", IMPORT_SCRIPT.format(module="app", heavy=HEAVY_MODULES), args.repeat)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        _generate_files(tmp_dir, args.files)
+        _measure(f"first scan ({', '.join(args.entities)})", FIRST_SCAN_SCRIPT.format(
+            directory=tmp_dir, entities=args.entities, heavy=HEAVY_MODULES), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
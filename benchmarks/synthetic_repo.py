@@ -0,0 +1,166 @@
+"""
+Deterministic synthetic repository trees for benchmarks.
+
+The tree has source-like text files spread over nested directories, a share
+of them containing names and e-mail addresses, plus the noise the presets
+are meant to prune: node_modules/, .git/, build/, dist/ and __pycache__/
+directories and binary files.
+
+    python benchmarks/synthetic_repo.py /tmp/synthetic --files 5000 --depth 4
+"""
+import os
+import json
+import math
+import random
+import argparse
+
+FIRST_NAMES = ["John", "Jane", "Maria", "Wei", "Olga", "Ahmed", "Lucas", "Priya", "Kofi", "Sofia"]
+LAST_NAMES = ["Doe", "Smith", "Garcia", "Chen", "Ivanova", "Khan", "Silva", "Patel", "Mensah", "Rossi"]
+FILLER_LINES = [
+    "def handler(event, context):",
+    "    return {'statusCode': 200, 'body': json.dumps(result)}",
+    "# TODO: refactor this module once the new API is stable",
+    "const config = require('./config');",
+    "for (let i = 0; i < items.length; i++) { total += items[i].price; }",
+    "Configuration values are loaded from the environment at startup.",
+    "SELECT id, created_at FROM orders WHERE status = 'open';",
+    "    if not self.is_loaded():",
+]
+SOURCE_EXTENSIONS = [".py", ".js", ".ts", ".md", ".txt", ".java", ".sql", ".yaml"]
+NOISE_DIRECTORIES = ["node_modules", ".git", "build", "dist", "__pycache__"]
+
+# Presets that prune the noise directories above
+BENCHMARK_PRESETS = ["Python", "Node.js"]
+
+
+def _file_size(rng, median_size, size_sigma, max_size):
+    """Draw a file size from a log-normal distribution around ``median_size``."""
+    return max(1, min(max_size, int(rng.lognormvariate(math.log(median_size), size_sigma))))
+
+
+def _pii_line(rng):
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    return f"# Maintainer: {first} {last} <{first.lower()}.{last.lower()}@example.com>"
+
+
+def _text_content(rng, size, pii_entities):
+    lines = []
+    length = 0
+    while length < size:
+        line = rng.choice(FILLER_LINES)
+        lines.append(line)
+        length += len(line) + 1
+    for _ in range(pii_entities):
+        lines.insert(rng.randrange(len(lines) + 1), _pii_line(rng))
+    return "\n".join(lines)
+
+
+def _directory_paths(rng, dir_count, depth, fan_out):
+    directories = [""]
+    child_counts = {"": 0}
+    while len(directories) < dir_count:
+        parent = rng.choice(directories)
+        if parent.count("/") >= depth or child_counts[parent] >= fan_out:
+            if all(d.count("/") >= depth or child_counts[d] >= fan_out for d in directories):
+                break
+            continue
+        directory = f"{parent}pkg_{len(directories):04d}/"
+        child_counts[parent] += 1
+        child_counts[directory] = 0
+        directories.append(directory)
+    return directories
+
+
+def generate_repository(
+    root, file_count=1000, depth=4, fan_out=8, median_size=2000, size_sigma=1.0,
+    max_size=2_000_000, pii_density=0.1, pii_entities=3, noise_ratio=0.3, binary_ratio=0.02, seed=0,
+):
+    """
+    Write a synthetic tree under ``root`` and return its manifest: the
+    generation parameters plus counts and bytes of source, PII, noise and
+    binary files. The same parameters and seed always give the same tree.
+    """
+    rng = random.Random(seed)
+    manifest = {
+        "parameters": {
+            "file_count": file_count, "depth": depth, "fan_out": fan_out, "median_size": median_size,
+            "size_sigma": size_sigma, "max_size": max_size, "pii_density": pii_density,
+            "pii_entities": pii_entities, "noise_ratio": noise_ratio, "binary_ratio": binary_ratio, "seed": seed,
+        },
+        "source_files": 0, "pii_files": 0, "noise_files": 0, "binary_files": 0, "bytes": 0,
+    }
+    directories = _directory_paths(rng, max(1, file_count // 20), depth, fan_out)
+    noise_count = int(file_count * noise_ratio)
+    binary_count = int(file_count * binary_ratio)
+
+    for i in range(file_count - noise_count - binary_count):
+        directory = rng.choice(directories)
+        has_pii = rng.random() < pii_density
+        content = _text_content(rng, _file_size(rng, median_size, size_sigma, max_size),
+                                pii_entities if has_pii else 0)
+        path = os.path.join(root, directory, f"module_{i:06d}{rng.choice(SOURCE_EXTENSIONS)}")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+        manifest["source_files"] += 1
+        manifest["pii_files"] += has_pii
+        manifest["bytes"] += len(content.encode("utf-8"))
+
+    for i in range(noise_count):
+        # Noise sits at the repository root (or a package root) like real build output
+        noise_dir = rng.choice(NOISE_DIRECTORIES)
+        nested = "/".join(f"dep_{rng.randrange(50):02d}" for _ in range(rng.randrange(1, depth + 1)))
+        path = os.path.join(root, noise_dir, nested, f"noise_{i:06d}.js")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        content = _text_content(rng, _file_size(rng, median_size, size_sigma, max_size), 0)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+        manifest["noise_files"] += 1
+        manifest["bytes"] += len(content)
+
+    for i in range(binary_count):
+        # Unknown extensions, so only content sniffing can tell they are binary
+        path = os.path.join(root, rng.choice(directories), f"blob_{i:05d}.bin")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        size = _file_size(rng, median_size, size_sigma, max_size)
+        with open(path, "wb") as f:
+            f.write(rng.randbytes(size))
+        manifest["binary_files"] += 1
+        manifest["bytes"] += size
+
+    return manifest
+
+
+def add_generator_arguments(parser):
+    parser.add_argument("--files", type=int, default=1000, help="Total number of files")
+    parser.add_argument("--depth", type=int, default=4, help="Maximum directory depth")
+    parser.add_argument("--fan-out", type=int, default=8, help="Maximum subdirectories per directory")
+    parser.add_argument("--median-size", type=int, default=2000, help="Median file size in bytes")
+    parser.add_argument("--size-sigma", type=float, default=1.0, help="Log-normal spread of file sizes")
+    parser.add_argument("--max-size", type=int, default=2_000_000, help="Largest file size in bytes")
+    parser.add_argument("--pii-density", type=float, default=0.1, help="Share of source files with PII")
+    parser.add_argument("--pii-entities", type=int, default=3, help="PII lines per PII file")
+    parser.add_argument("--noise-ratio", type=float, default=0.3, help="Share of files in pruned noise directories")
+    parser.add_argument("--binary-ratio", type=float, default=0.02, help="Share of binary files")
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def generator_kwargs(args):
+    return {
+        "file_count": args.files, "depth": args.depth, "fan_out": args.fan_out,
+        "median_size": args.median_size, "size_sigma": args.size_sigma, "max_size": args.max_size,
+        "pii_density": args.pii_density, "pii_entities": args.pii_entities,
+        "noise_ratio": args.noise_ratio, "binary_ratio": args.binary_ratio, "seed": args.seed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("root", help="Directory to create the tree in")
+    add_generator_arguments(parser)
+    args = parser.parse_args()
+    print(json.dumps(generate_repository(args.root, **generator_kwargs(args)), indent=1))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+import re
+import weakref
+import multiprocessing
+from collections import namedtuple
+
+# --- Configuration ---
+# Whitespace-free runs longer than this (minified bundles, one-line CSV or
+# JSON, base64) make tokenization and some recognizers very slow
+GUARD_MAX_RUN_CHARS = 1_000
+
+# Characters a long run is split at; they are replaced by spaces, so the text
+# keeps its length and analyzer offsets stay valid
+_RUN_SEPARATORS = re.compile(r"[,;|{}()\[\]<>=&\"'`]")
+_LONG_RUN = re.compile(r"\S{%d,}" % (GUARD_MAX_RUN_CHARS + 1))
+
+# Lines longer than this (a minified file or a data dump on one line, with
+# spaces) are broken into lines of at most this length at whitespace, which
+# is turned into a newline, again keeping the text's length
+GUARD_MAX_LINE_CHARS = 10_000
+_LONG_LINE = re.compile(r"[^\n]{%d,}" % (GUARD_MAX_LINE_CHARS + 1))
+
+# Analyzer hit as passed between processes; has the attributes the scanner reads
+AnalyzerHit = namedtuple("AnalyzerHit", ["entity_type", "start", "end", "score"])
+
+
+class AnalysisAbandoned(Exception):
+    """An analyzer call was given up: it ran out of time, or its process died."""
+
+
+# --- Pathological Input Guard ---
+def _split_run(run):
+    split = _RUN_SEPARATORS.sub(" ", run)
+    # What is still too long has no separators at all (base64, hex, minified
+    # identifiers) and cannot hold names or addresses; it is blanked
+    return _LONG_RUN.sub(lambda match: " " * len(match.group()), split)
+
+
+def _split_line(line):
+    pieces = []
+    start = 0
+    while len(line) - start > GUARD_MAX_LINE_CHARS:
+        # Runs are split first, so one of the last GUARD_MAX_RUN_CHARS + 1
+        # characters up to the limit is whitespace
+        cut = start + GUARD_MAX_LINE_CHARS
+        while not line[cut].isspace():
+            cut -= 1
+        pieces.append(line[start:cut])
+        start = cut + 1
+    pieces.append(line[start:])
+    return "\n".join(pieces)
+
+
+def guard_text(text):
+    """
+    Return ``(guarded, runs_split, lines_split)``: ``text`` with every
+    whitespace-free run over ``GUARD_MAX_RUN_CHARS`` split at separator
+    characters, and the rest of such runs blanked, then every line over
+    ``GUARD_MAX_LINE_CHARS`` broken at whitespace, and whether either guard
+    changed anything. The result has the same length as ``text``.
+    """
+    if len(text) <= GUARD_MAX_RUN_CHARS:
+        return text, False, False
+    guarded = _LONG_RUN.sub(lambda match: _split_run(match.group()), text)
+    runs_split = guarded != text
+    if len(guarded) <= GUARD_MAX_LINE_CHARS:
+        return guarded, runs_split, False
+    line_guarded = _LONG_LINE.sub(lambda match: _split_line(match.group()), guarded)
+    return line_guarded, runs_split, line_guarded != guarded
+
+
+# --- Per-File Time Budget ---
+def analyze_texts(analyzer, texts, entities, batch_size=1):
+    """Analyze ``texts`` with a Presidio engine, batched through ``nlp.pipe`` above a batch size of one."""
+    if batch_size > 1 and len(texts) > 1:
+        from presidio_analyzer import BatchAnalyzerEngine
+
+        return list(BatchAnalyzerEngine(analyzer_engine=analyzer).analyze_iterator(
+            texts, language='en', batch_size=batch_size, entities=entities
+        ))
+    return [analyzer.analyze(text=text, language='en', entities=entities) for text in texts]
+
+
+def _serve_analysis(analyzer, connection):
+    """Child process loop: analyze requests from ``connection`` until the parent goes away."""
+    while True:
+        try:
+            texts, entities, batch_size = connection.recv()
+        except EOFError:
+            return
+        try:
+            batch_results = analyze_texts(analyzer, texts, entities, batch_size)
+            connection.send(("ok", [
+                [(r.entity_type, r.start, r.end, r.score) for r in analyzer_results]
+                for analyzer_results in batch_results
+            ]))
+        except Exception as e:
+            connection.send(("error", f"{type(e).__name__}: {e}"))
+
+
+def _stop_child(process, connection):
+    connection.close()
+    if process.is_alive():
+        process.kill()
+    process.join()
+
+
+class TimeBudgetAnalyzer:
+    """
+    Wraps an analyzer engine so calls can be given a ``timeout``. Calls run
+    in a child process forked from this one, so it shares the loaded engine
+    without reloading the model. A call that overruns is abandoned by killing
+    the child and raising ``AnalysisAbandoned``; the next call forks a new one.
+    """
+
+    def __init__(self, analyzer):
+        self._analyzer = analyzer
+        self._process = None
+        self._connection = None
+        self._finalizer = None
+
+    @staticmethod
+    def is_supported():
+        """Abandoning a call needs a forked child, which not every platform offers."""
+        return "fork" in multiprocessing.get_all_start_methods()
+
+    def _start_child(self):
+        context = multiprocessing.get_context("fork")
+        self._connection, child_connection = context.Pipe()
+        self._process = context.Process(
+            target=_serve_analysis, args=(self._analyzer, child_connection), daemon=True
+        )
+        self._process.start()
+        child_connection.close()
+        self._finalizer = weakref.finalize(self, _stop_child, self._process, self._connection)
+
+    def analyze(self, text, language='en', entities=None, timeout=None):
+        return self.analyze_batch([text], entities, 1, timeout)[0]
+
+    def analyze_batch(self, texts, entities=None, batch_size=1, timeout=None):
+        """Analyze several texts; raises ``AnalysisAbandoned`` if they take longer than ``timeout`` seconds."""
+        if timeout is not None and timeout <= 0:
+            raise AnalysisAbandoned("ran out of time")
+        if self._process is None:
+            self._start_child()
+        try:
+            self._connection.send((texts, entities, batch_size))
+            ready = self._connection.poll(timeout)
+        except OSError:
+            self.close()
+            raise AnalysisAbandoned("the analysis process exited unexpectedly")
+        if not ready:
+            self.close()
+            raise AnalysisAbandoned("ran out of time")
+        try:
+            status, payload = self._connection.recv()
+        except EOFError:
+            # The child died (e.g. out of memory); the next call starts a new one
+            self.close()
+            raise AnalysisAbandoned("the analysis process exited unexpectedly")
+        if status == "error":
+            raise RuntimeError(payload)
+        return [[AnalyzerHit(*hit) for hit in hits] for hits in payload]
+
+    def close(self):
+        """Stop the child process, if one is running."""
+        if self._finalizer is not None:
+            self._finalizer()
+        self._process = None
+        self._connection = None
+        self._finalizer = None
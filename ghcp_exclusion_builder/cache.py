@@ -0,0 +1,157 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+from importlib import metadata
+
+# --- Configuration ---
+DEFAULT_CACHE_DIR = os.environ.get(
+    "GHCP_EXCLUSION_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "ghcp_exclusion_builder")
+)
+CACHE_FILE_NAME = "analysis_cache.sqlite"
+
+# Upper bound for the stored result rows; least recently used rows go first
+DEFAULT_MAX_CACHE_BYTES = 256 * 1024 * 1024
+
+# Failures of the cache file itself (unwritable directory, locked or corrupt
+# database); a scan can always go on without the cache
+CACHE_ERRORS = (OSError, sqlite3.Error)
+
+
+def _presidio_version():
+    try:
+        return metadata.version("presidio-analyzer")
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def analyzer_config_key(model_name, entity_types, extra=None):
+    """
+    Fingerprint of everything besides file content that decides the analyzer
+    output: spaCy model, entity types, Presidio version and read settings.
+    """
+    from .deny_list import deny_list_fingerprint  # deny_list imports this module
+
+    config = {
+        "model": model_name,
+        "entities": sorted(entity_types),
+        "presidio": _presidio_version(),
+        "extra": extra or {},
+    }
+    deny_lists = deny_list_fingerprint(entity_types)
+    if deny_lists:
+        # Only present with deny list types, so other cached results stay valid
+        config["deny_lists"] = deny_lists
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def content_cache_key(raw_content, config_key):
+    """Cache key for the given analyzed bytes under an analyzer configuration."""
+    digest = hashlib.sha256(raw_content)
+    digest.update(config_key.encode("ascii"))
+    return digest.hexdigest()
+
+
+def early_exit_cache_key(cache_key, confidence_threshold, min_entities_threshold):
+    """
+    Cache key for the partial results of an analysis of ``cache_key``'s
+    content that stopped once these thresholds were reached; they are only
+    valid for a scan with the same thresholds.
+    """
+    thresholds = json.dumps([confidence_threshold, min_entities_threshold])
+    return hashlib.sha256(f"{cache_key}:early-exit:{thresholds}".encode("ascii")).hexdigest()
+
+
+class AnalysisCache:
+    """
+    SQLite-backed, content-addressed store of per-file analyzer results.
+
+    Each row maps a content key to the list of ``(entity_type, score)`` pairs
+    (``(entity_type, score, column)`` for data files sampled by column) the
+    analyzer returned for that content. Rows are evicted least recently
+    used first once the stored size exceeds ``max_size_bytes``.
+    """
+
+    def __init__(self, cache_dir=None, max_size_bytes=DEFAULT_MAX_CACHE_BYTES):
+        self.cache_dir = cache_dir or DEFAULT_CACHE_DIR
+        self.max_size_bytes = max_size_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.path = os.path.join(self.cache_dir, CACHE_FILE_NAME)
+        self._conn = sqlite3.connect(self.path, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " key TEXT PRIMARY KEY,"
+            " results TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)"
+        )
+        self._conn.commit()
+
+    def get(self, key):
+        row = self._conn.execute(
+            "SELECT results FROM results WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        return [tuple(item) for item in json.loads(row[0])]
+
+    def put_many(self, items):
+        """Store ``(key, results)`` pairs in a single transaction."""
+        now = time.time()
+        rows = []
+        for key, results in items:
+            # Results of sampled data files also carry their column
+            payload = json.dumps([list(result) for result in results])
+            rows.append((key, payload, len(key) + len(payload), now))
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO results (key, results, size, last_used) "
+                "VALUES (?, ?, ?, ?)",
+                rows
+            )
+
+    def touch_many(self, keys):
+        """Mark rows as recently used so eviction keeps them."""
+        now = time.time()
+        with self._conn:
+            self._conn.executemany(
+                "UPDATE results SET last_used = ? WHERE key = ?",
+                [(now, key) for key in keys]
+            )
+
+    def evict(self):
+        """Drop least recently used rows until the cache fits its size bound."""
+        total_size = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM results"
+        ).fetchone()[0]
+        if total_size <= self.max_size_bytes:
+            return 0
+
+        keys_to_delete = []
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM results ORDER BY last_used ASC"
+        ):
+            if total_size <= self.max_size_bytes:
+                break
+            keys_to_delete.append((key,))
+            total_size -= size
+        with self._conn:
+            self._conn.executemany("DELETE FROM results WHERE key = ?", keys_to_delete)
+        return len(keys_to_delete)
+
+    def clear(self):
+        with self._conn:
+            self._conn.execute("DELETE FROM results")
+        self._conn.execute("VACUUM")
+
+    def __len__(self):
+        return self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def close(self):
+        self._conn.close()
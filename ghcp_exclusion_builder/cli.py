@@ -0,0 +1,438 @@
+import sys
+import json
+import argparse
+import contextlib
+from .scanner import scan_directory_for_pii, scan_git_refs_for_pii, exclusion_rule_lines, MAX_ANALYZED_BYTES, NLP_BATCH_SIZE
+from .exclusions import EXCLUSION_PRESETS
+from .presidio_analyzer_setup import PII_ENTITY_TYPES, SPACY_MODEL_NAME
+from .profiling import ChromeTraceRecorder, ScanProfile, SLOWEST_FILES_COUNT
+from .jobs import DEFAULT_WORKER_BUDGET, STATUS_FAILED, JobStore, ScanScheduler
+from .minimize import DEFAULT_MIN_FLAGGED_RATIO
+from .triage import TRIAGE_SAMPLES_PER_DIRECTORY, TRIAGE_TIME_BUDGET_SECONDS, triage_directory_for_pii
+from .daemon import daemon_scan
+
+# --- Configuration ---
+OUTPUT_FORMATS = ["jsonl", "sarif", "yaml"]
+
+# Exit codes: no PII found, PII found, scan could not run
+EXIT_CLEAN = 0
+EXIT_PII_FOUND = 1
+EXIT_ERROR = 2
+
+TOOL_NAME = "ghcp-exclusion-builder"
+TOOL_URI = "https://github.com/aymenfurter/exclusion-generator"
+SARIF_SCHEMA = "https://json.schemastore.org/sarif-2.1.0.json"
+SARIF_RULES = [
+    {
+        "id": "pii-detected",
+        "shortDescription": {"text": "File contains PII and should be excluded from GitHub Copilot"},
+    },
+    {
+        "id": "scan-error",
+        "shortDescription": {"text": "File could not be scanned for PII"},
+    },
+]
+
+
+def _describe_pii_types(pii_types):
+    return ", ".join(f"{count} {pii_type}" for pii_type, count in pii_types.items())
+
+
+# --- Streaming Writers ---
+class JsonLinesWriter:
+    """One JSON object per finding, then a summary object (with the scan profile, if any)."""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def _write(self, record):
+        self.stream.write(json.dumps(record, sort_keys=True) + "\n")
+        self.stream.flush()
+
+    def write_finding(self, finding):
+        record_type = "error" if "error" in finding else "finding"
+        self._write({"type": record_type, **finding, "path": f"/{finding['path']}"})
+
+    def close(self, summary, profile=None):
+        record = {"type": "summary", "report": summary}
+        if profile is not None:
+            record["profile"] = profile
+        self._write(record)
+
+
+class SarifWriter:
+    """A SARIF 2.1.0 log whose ``results`` array is written as findings arrive."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.result_count = 0
+        self.started = False
+
+    def _start(self):
+        # Written on first use, so a scan that fails up front leaves no partial log
+        tool = {"driver": {"name": TOOL_NAME, "informationUri": TOOL_URI, "rules": SARIF_RULES}}
+        self.stream.write(
+            f'{{"version": "2.1.0", "$schema": "{SARIF_SCHEMA}", '
+            f'"runs": [{{"tool": {json.dumps(tool)}, "results": [\n'
+        )
+        self.started = True
+
+    def write_finding(self, finding):
+        if not self.started:
+            self._start()
+        if "error" in finding:
+            result = {"ruleId": "scan-error", "level": "note", "message": {"text": finding["error"]}}
+        else:
+            result = {
+                "ruleId": "pii-detected",
+                "level": "warning",
+                "message": {"text": f"Contains: {_describe_pii_types(finding['pii_types'])}"},
+                "properties": {"piiCount": finding["pii_count"], "piiTypes": finding["pii_types"]},
+            }
+            if "pii_columns" in finding:
+                result["properties"]["piiColumns"] = finding["pii_columns"]
+        result["locations"] = [{
+            "physicalLocation": {"artifactLocation": {"uri": finding["path"], "uriBaseId": "SRCROOT"}}
+        }]
+        if "ref" in finding:
+            result.setdefault("properties", {})["ref"] = finding["ref"]
+        separator = ",\n" if self.result_count else ""
+        self.stream.write(separator + json.dumps(result, sort_keys=True))
+        self.stream.flush()
+        self.result_count += 1
+
+    def close(self, summary, profile=None):
+        if not self.started:
+            self._start()
+        run_properties = f', "properties": {{"profile": {json.dumps(profile, sort_keys=True)}}}' if profile else ""
+        self.stream.write(f"\n]{run_properties}}}]}}\n")
+        self.stream.flush()
+
+
+class ExclusionYamlWriter:
+    """GitHub Copilot content exclusion list, one rule per flagged file (one list per ref for git refs)."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.ref = None
+
+    def write_finding(self, finding):
+        if finding.get("ref", self.ref) != self.ref:
+            self.ref = finding["ref"]
+            self.stream.write(f"# --- Ref: {self.ref} ---\n")
+        if "error" in finding:
+            lines = [f"# Error processing: {finding['path']} - {finding['error']}"]
+        else:
+            lines = exclusion_rule_lines(finding["path"], finding["pii_types"], finding.get("pii_columns"))
+        self.stream.write("\n".join(lines) + "\n")
+        self.stream.flush()
+
+    def close(self, summary, profile=None):
+        # The summary already lists the profile's timings
+        self.stream.write("\n" + summary)
+        self.stream.flush()
+
+
+OUTPUT_WRITERS = {
+    "jsonl": JsonLinesWriter,
+    "sarif": SarifWriter,
+    "yaml": ExclusionYamlWriter,
+}
+
+
+# --- Command Line ---
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m ghcp_exclusion_builder",
+        description="Scan a directory for files with PII and stream GitHub Copilot exclusion findings.",
+        epilog=f"Exit codes: {EXIT_CLEAN} no PII found, {EXIT_PII_FOUND} PII found, {EXIT_ERROR} scan error.",
+    )
+    parser.add_argument("directory", nargs="?", help="Directory to scan")
+    parser.add_argument("--repo-list",
+                        help="File listing repository roots (one per line) to scan as one persisted job; "
+                             "writes one JSON line per repository")
+    parser.add_argument("--job-workers", type=int, default=DEFAULT_WORKER_BUDGET,
+                        help="Repositories scanned at once with --repo-list")
+    parser.add_argument("--git-refs", nargs="+", metavar="REF",
+                        help="Scan these refs' committed trees from the git object database (bare repositories work) "
+                             "instead of the working tree; not combined with --workers, --incremental, --clear-cache "
+                             "or --profile")
+    parser.add_argument("-f", "--format", choices=OUTPUT_FORMATS, default="jsonl", help="Output format")
+    parser.add_argument("-o", "--output", help="Write findings to this file instead of stdout")
+    parser.add_argument("--preset", action="append", choices=list(EXCLUSION_PRESETS), default=[],
+                        help="Exclusion preset (repeatable)")
+    parser.add_argument("--exclude", action="append", default=[],
+                        help="Comma-separated exclusion patterns (repeatable)")
+    parser.add_argument("--gitignore", action="store_true",
+                        help="Skip files and directories ignored by the repository's .gitignore files "
+                             "and .git/info/exclude")
+    parser.add_argument("--entity-types", nargs="+", choices=PII_ENTITY_TYPES, default=["PERSON"],
+                        help="PII entity types to detect")
+    parser.add_argument("--confidence", type=float, default=60, help="Confidence threshold in percent")
+    parser.add_argument("--min-entities", type=int, default=2, help="PII entities needed to flag a file")
+    parser.add_argument("--max-bytes", type=int, default=MAX_ANALYZED_BYTES,
+                        help="Bytes analyzed per file (0 = no limit)")
+    parser.add_argument("--file-time-budget", type=float, metavar="SECONDS",
+                        help="Abandon the analysis of a file after this many seconds and list it in the output")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes")
+    parser.add_argument("--nlp-batch-size", type=int, default=NLP_BATCH_SIZE, help="Small files per NLP batch")
+    parser.add_argument("--spacy-model", default=SPACY_MODEL_NAME, help="spaCy model for NER entity types")
+    parser.add_argument("--no-prefilter", action="store_true", help="Run NLP on every file")
+    parser.add_argument("--no-source-extraction", action="store_true",
+                        help="Analyze the full text of source files, not only their comments and strings")
+    parser.add_argument("--no-column-sampling", action="store_true",
+                        help="Analyze CSV/TSV/JSON data files as text instead of sampling values per column")
+    parser.add_argument("--cache", action="store_true", help="Use the persistent analysis cache")
+    parser.add_argument("--clear-cache", action="store_true", help="Clear the analysis cache first")
+    parser.add_argument("--cache-dir", help="Analysis cache directory")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only analyze files changed since the last scan (git)")
+    parser.add_argument("--changed-since", help="Git ref to diff against in incremental mode")
+    parser.add_argument("--state-path", help="Incremental scan state file (default: under the cache directory)")
+    parser.add_argument("--profile", action="store_true",
+                        help="Time each stage and file; report throughput and the slowest files")
+    parser.add_argument("--slowest", type=int, default=SLOWEST_FILES_COUNT,
+                        help="Slowest files listed with --profile")
+    parser.add_argument("--trace-file",
+                        help="Write the profile's spans as a Chrome trace (chrome://tracing, Perfetto); implies --profile")
+    parser.add_argument("--minimize", action="store_true",
+                        help="Collapse per-file rules into directory and extension globs (--format yaml); "
+                             "the rules are written when the scan ends")
+    parser.add_argument("--minimize-ratio", type=float, default=DEFAULT_MIN_FLAGGED_RATIO,
+                        help="Share of flagged files a directory or extension needs for a glob with --minimize")
+    parser.add_argument("--triage", action="store_true",
+                        help="Estimate PII density per directory from a sample within a time budget instead of a "
+                             "full scan; jsonl writes one record per directory, yaml the report and provisional rules")
+    parser.add_argument("--time-budget", type=float, default=TRIAGE_TIME_BUDGET_SECONDS,
+                        help="Seconds a --triage run may take, walk included")
+    parser.add_argument("--byte-budget", type=int, help="Bytes a --triage run may analyze")
+    parser.add_argument("--samples-per-dir", type=int, default=TRIAGE_SAMPLES_PER_DIRECTORY,
+                        help="Files sampled at most per directory with --triage")
+    parser.add_argument("--seed", type=int, help="Random seed for reproducible --triage samples")
+    parser.add_argument("--no-daemon", action="store_true",
+                        help="Analyze in this process even when an analyzer daemon is running")
+    parser.add_argument("--thin-client", action="store_true",
+                        help="Have the running analyzer daemon scan the directory and only write its findings")
+    return parser
+
+
+def _scan_settings(args):
+    """Scan job settings (see ``jobs.JOB_SETTINGS_DEFAULTS``) from parsed ``args``."""
+    return {
+        "selected_presets": args.preset,
+        "custom_exclusions_str": ",".join(args.exclude),
+        "confidence_threshold": args.confidence,
+        "min_entities_threshold": args.min_entities,
+        "selected_entity_types": args.entity_types,
+        "use_cache": args.cache,
+        "incremental": args.incremental,
+        "changed_since_ref": args.changed_since,
+        "max_analyzed_bytes": args.max_bytes,
+        "use_prefilter": not args.no_prefilter,
+        "nlp_batch_size": args.nlp_batch_size,
+        "spacy_model_name": args.spacy_model,
+        "cache_dir": args.cache_dir,
+        "use_gitignore": args.gitignore,
+        "file_time_budget": args.file_time_budget,
+        "extract_source": not args.no_source_extraction,
+        "sample_structured": not args.no_column_sampling,
+    }
+
+
+def run(args, stream):
+    """Run the scan described by parsed ``args``, streaming findings to ``stream``."""
+    writer = OUTPUT_WRITERS[args.format](stream)
+    flagged_count = 0
+
+    def on_finding(finding):
+        nonlocal flagged_count
+        if "error" not in finding:
+            flagged_count += 1
+        if not args.minimize:
+            writer.write_finding(finding)
+
+    trace_recorder = ChromeTraceRecorder() if args.trace_file else None
+    profile = None
+    if args.profile or trace_recorder is not None:
+        profile = ScanProfile(slowest_count=args.slowest, on_span=trace_recorder)
+
+    # Keep the output stream machine-readable: scanner messages go to stderr
+    with contextlib.redirect_stdout(sys.stderr):
+        if args.thin_client:
+            summary = daemon_scan(args.directory, _scan_settings(args), on_finding=on_finding)
+        elif args.git_refs:
+            summary = scan_git_refs_for_pii(
+                args.directory,
+                args.git_refs,
+                args.preset,
+                ",".join(args.exclude),
+                confidence_threshold=args.confidence,
+                min_entities_threshold=args.min_entities,
+                selected_entity_types=args.entity_types,
+                use_cache=args.cache,
+                cache_dir=args.cache_dir,
+                max_analyzed_bytes=args.max_bytes,
+                use_prefilter=not args.no_prefilter,
+                nlp_batch_size=args.nlp_batch_size,
+                spacy_model_name=args.spacy_model,
+                on_finding=on_finding,
+                collect_rules=False,
+                use_daemon=not args.no_daemon,
+                file_time_budget=args.file_time_budget,
+                extract_source=not args.no_source_extraction,
+                sample_structured=not args.no_column_sampling,
+            )
+        else:
+            summary = scan_directory_for_pii(
+                args.directory,
+                args.preset,
+                ",".join(args.exclude),
+                confidence_threshold=args.confidence,
+                min_entities_threshold=args.min_entities,
+                selected_entity_types=args.entity_types,
+                num_workers=args.workers,
+                use_cache=args.cache,
+                clear_cache=args.clear_cache,
+                incremental=args.incremental,
+                changed_since_ref=args.changed_since,
+                cache_dir=args.cache_dir,
+                state_path=args.state_path,
+                max_analyzed_bytes=args.max_bytes,
+                use_prefilter=not args.no_prefilter,
+                nlp_batch_size=args.nlp_batch_size,
+                spacy_model_name=args.spacy_model,
+                on_finding=on_finding,
+                collect_rules=args.minimize,
+                profile=profile,
+                minimize_ratio=args.minimize_ratio if args.minimize else None,
+                use_gitignore=args.gitignore,
+                use_daemon=not args.no_daemon,
+                file_time_budget=args.file_time_budget,
+                extract_source=not args.no_source_extraction,
+                sample_structured=not args.no_column_sampling,
+            )
+    if summary.startswith("Error"):
+        print(summary, file=sys.stderr)
+        return EXIT_ERROR
+    if args.minimize:
+        # The minimized rules follow the summary once the whole tree is known
+        summary, _separator, rules = summary.partition("\n\n")
+        stream.write(rules + "\n")
+        summary += "\n"
+
+    writer.close(summary, profile.as_dict() if profile is not None else None)
+    if trace_recorder is not None:
+        trace_recorder.write(args.trace_file)
+    if args.format != "yaml":
+        print(summary, end="", file=sys.stderr)
+    return EXIT_PII_FOUND if flagged_count else EXIT_CLEAN
+
+
+def run_triage(args, stream):
+    """Sample the directory in ``args`` and write per-directory estimates (jsonl) or the report (yaml)."""
+    estimates = []
+
+    def on_directory(estimate):
+        estimates.append(estimate)
+        if args.format == "jsonl":
+            stream.write(json.dumps({"type": "directory", **estimate, "directory": f"/{estimate['directory']}"},
+                                    sort_keys=True) + "\n")
+
+    with contextlib.redirect_stdout(sys.stderr):
+        report = triage_directory_for_pii(
+            args.directory,
+            args.preset,
+            ",".join(args.exclude),
+            confidence_threshold=args.confidence,
+            min_entities_threshold=args.min_entities,
+            selected_entity_types=args.entity_types,
+            time_budget_seconds=args.time_budget,
+            byte_budget=args.byte_budget,
+            samples_per_directory=args.samples_per_dir,
+            use_prefilter=not args.no_prefilter,
+            use_gitignore=args.gitignore,
+            spacy_model_name=args.spacy_model,
+            nlp_batch_size=args.nlp_batch_size,
+            seed=args.seed,
+            on_directory=on_directory,
+            use_daemon=not args.no_daemon,
+        )
+    if report.startswith("Error"):
+        print(report, file=sys.stderr)
+        return EXIT_ERROR
+    if args.format == "jsonl":
+        stream.write(json.dumps({"type": "summary", "report": report}, sort_keys=True) + "\n")
+        print(report, file=sys.stderr)
+    else:
+        stream.write(report + "\n")
+    stream.flush()
+    return EXIT_PII_FOUND if any(estimate["flagged_samples"] for estimate in estimates) else EXIT_CLEAN
+
+
+def run_sweep(args, stream):
+    """
+    Scan every repository listed in ``args.repo_list`` through the job
+    scheduler and write one JSON line per repository as it finishes. The job
+    and its results are persisted in the job store under the cache directory.
+    """
+    with open(args.repo_list, "r", encoding="utf-8") as f_repos:
+        repository_paths = [line.strip() for line in f_repos if line.strip() and not line.startswith("#")]
+    settings = _scan_settings(args)
+    outcome = {"flagged": 0, "failed": 0}
+
+    def on_result(job_id, result):
+        flagged_count = sum(1 for finding in result["findings"] if "error" not in finding)
+        outcome["flagged"] += flagged_count
+        outcome["failed"] += result["status"] == STATUS_FAILED
+        stream.write(json.dumps({
+            "type": "repository", "job_id": job_id, **result, "flagged_files": flagged_count
+        }, sort_keys=True) + "\n")
+        stream.flush()
+
+    scheduler = ScanScheduler(worker_budget=args.job_workers, store=JobStore(args.cache_dir), on_result=on_result)
+    try:
+        job_id = scheduler.submit(repository_paths, settings)
+        print(f"Scan job {job_id}: {len(repository_paths)} repositories", file=sys.stderr)
+        scheduler.wait()
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return EXIT_ERROR
+    finally:
+        scheduler.shutdown()
+        scheduler.store.close()
+    if outcome["failed"]:
+        return EXIT_ERROR
+    return EXIT_PII_FOUND if outcome["flagged"] else EXIT_CLEAN
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if (args.directory is None) == (args.repo_list is None):
+        parser.error("give either a directory or --repo-list")
+    if args.repo_list and args.git_refs:
+        parser.error("--git-refs scans a single repository")
+    if args.repo_list and args.format != "jsonl":
+        parser.error("--repo-list writes JSON Lines only")
+    if args.gitignore and args.git_refs:
+        parser.error("--gitignore applies to working tree scans; committed trees contain no ignored files")
+    incremental_options = [args.incremental, args.changed_since, args.state_path]
+    if args.git_refs and (args.workers > 1 or any(incremental_options) or args.profile or args.trace_file):
+        parser.error("--git-refs scans run in one process without stored state or profiling; "
+                     "drop --workers, --incremental/--changed-since/--state-path and --profile/--trace-file")
+    if args.git_refs and args.clear_cache:
+        parser.error("--clear-cache applies to working tree scans; run it without --git-refs first")
+    if args.minimize and (args.format != "yaml" or args.git_refs or args.repo_list):
+        parser.error("--minimize applies to the exclusion list of a directory scan (--format yaml)")
+    if args.triage and (args.format == "sarif" or args.git_refs or args.repo_list or args.minimize):
+        parser.error("--triage samples one directory and writes jsonl or yaml")
+    other_modes = [args.git_refs, args.repo_list, args.triage, args.minimize, args.profile, args.trace_file]
+    if args.thin_client and (any(other_modes) or args.no_daemon):
+        parser.error("--thin-client sends a plain directory scan to the analyzer daemon")
+    if not 0 < args.minimize_ratio <= 1:
+        parser.error("--minimize-ratio must be greater than 0 and at most 1")
+    command = run_sweep if args.repo_list else run_triage if args.triage else run
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as stream:
+            return command(args, stream)
+    return command(args, sys.stdout)
@@ -0,0 +1,442 @@
+import os
+import sys
+import json
+import time
+import queue
+import signal
+import socket
+import argparse
+import threading
+import socketserver
+from collections import Counter
+from .cache import DEFAULT_CACHE_DIR
+from .analysis_guard import AnalysisAbandoned, AnalyzerHit, TimeBudgetAnalyzer, analyze_texts
+from .presidio_analyzer_setup import (
+    PII_ENTITY_TYPES, SPACY_MODEL_NAME, _analyzer_engines, get_presidio_analyzer
+)
+
+# --- Configuration ---
+# Unix domain socket of the resident analyzer daemon
+DAEMON_SOCKET_PATH = os.environ.get("GHCP_ANALYZER_SOCKET", os.path.join(DEFAULT_CACHE_DIR, "analyzer.sock"))
+
+# Analyze and scan requests waiting for the daemon; further requests are
+# turned away and their clients analyze in-process instead
+DAEMON_QUEUE_SIZE = int(os.environ.get("GHCP_DAEMON_QUEUE_SIZE", "16"))
+
+# How long a client waits for the daemon to accept its connection
+DAEMON_CONNECT_TIMEOUT_SECONDS = 2.0
+
+# Requests answered by the connection thread without queueing
+_IMMEDIATE_OPS = {"health", "stats"}
+_QUEUED_OPS = {"analyze", "scan"}
+
+
+# --- Server ---
+class _DaemonRequestHandler(socketserver.StreamRequestHandler):
+    """One client connection: JSON requests in, JSON lines back, one request at a time."""
+
+    def handle(self):
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                op = request["op"]
+            except (ValueError, TypeError, KeyError):
+                self._send({"type": "error", "error": "Malformed request"})
+                continue
+            if op in _IMMEDIATE_OPS:
+                self._send(self.server.daemon.answer(op))
+            elif op in _QUEUED_OPS:
+                if not self._relay(request):
+                    return
+            else:
+                self._send({"type": "error", "error": f"Unknown request: {op}"})
+
+    def _relay(self, request):
+        """Queue ``request`` and pass its replies on; False once the client is gone."""
+        replies = self.server.daemon.submit(request)
+        if replies is None:
+            return self._send({"type": "error", "error": "The analyzer daemon is busy or shutting down"})
+        while True:
+            reply = replies.get()
+            if not self._send(reply):
+                # Stops a scan whose client disconnected after the current file
+                request["cancel_event"].set()
+                return False
+            if reply["type"] != "finding":
+                return True
+
+    def _send(self, record):
+        try:
+            self.wfile.write(json.dumps(record).encode("utf-8") + b"\n")
+            self.wfile.flush()
+        except OSError:
+            return False
+        return True
+
+
+class _DaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class AnalyzerDaemon:
+    """
+    Long-lived process that keeps Presidio engines warm and serves analyze
+    and scan requests on a Unix domain socket. Requests are executed one at
+    a time, in arrival order, from a bounded queue; health and stats
+    requests are answered right away.
+    """
+
+    def __init__(self, socket_path=None, queue_size=DAEMON_QUEUE_SIZE):
+        self.socket_path = socket_path or DAEMON_SOCKET_PATH
+        self.queue_size = max(1, int(queue_size))
+        # Bounded in ``submit``, so the stop marker can always be queued
+        self._requests = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._counts = Counter()
+        self._busy_seconds = 0.0
+        self._started = time.monotonic()
+        self._server = None
+        self._stopping = False
+        # Engines wrapped for analyze requests with a timeout, by engine id,
+        # with the recognizers their child process was forked with
+        self._time_budget_analyzers = {}
+        self._threads = []
+
+    def warm_up(self, entity_types=None, model_name=SPACY_MODEL_NAME):
+        """Build the engine for ``entity_types`` before the first request needs it."""
+        get_presidio_analyzer(entity_types, model_name)
+
+    def start(self):
+        """Bind the socket and serve from background threads."""
+        socket_dir = os.path.dirname(self.socket_path)
+        if socket_dir:
+            os.makedirs(socket_dir, exist_ok=True)
+        if os.path.exists(self.socket_path):
+            if daemon_request({"op": "health"}, self.socket_path) is not None:
+                raise RuntimeError(f"An analyzer daemon is already listening on {self.socket_path}")
+            # Left behind by a daemon that did not shut down cleanly
+            os.unlink(self.socket_path)
+        # The daemon reads any file its user can read, so only that user may connect
+        previous_umask = os.umask(0o177)
+        try:
+            self._server = _DaemonServer(self.socket_path, _DaemonRequestHandler)
+        finally:
+            os.umask(previous_umask)
+        self._server.daemon = self
+        self._threads = [
+            threading.Thread(target=self._work, name="analyzer-daemon-worker", daemon=True),
+            threading.Thread(target=self._server.serve_forever, name="analyzer-daemon-server", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def shutdown(self):
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._server = None
+        # Connections that are still open get their further requests turned down
+        with self._stats_lock:
+            self._stopping = True
+            self._requests.put(None)
+        try:
+            os.unlink(self.socket_path)
+        except FileNotFoundError:
+            pass
+
+    def submit(self, request):
+        """Queue a request; returns the queue its replies arrive on, or None when the queue is full."""
+        request["cancel_event"] = threading.Event()
+        replies = queue.Queue()
+        with self._stats_lock:
+            if self._stopping or self._requests.qsize() >= self.queue_size:
+                self._counts["rejected"] += 1
+                return None
+            self._requests.put((request, replies))
+        return replies
+
+    def answer(self, op):
+        """Reply to a health or stats request."""
+        self._count(op)
+        record = {"type": "result", "status": "ok", "pid": os.getpid()}
+        if op == "stats":
+            with self._stats_lock:
+                record.update({
+                    "uptime_seconds": round(time.monotonic() - self._started, 3),
+                    "busy_seconds": round(self._busy_seconds, 3),
+                    "queued": self._requests.qsize(),
+                    "queue_size": self.queue_size,
+                    "requests": dict(self._counts),
+                    "engines": sorted(_analyzer_engines),
+                })
+        return record
+
+    def _count(self, name, amount=1):
+        with self._stats_lock:
+            self._counts[name] += amount
+
+    def _work(self):
+        while True:
+            item = self._requests.get()
+            if item is None:
+                # Requests queued before the shutdown are answered, not run
+                while not self._requests.empty():
+                    _request, replies = self._requests.get()
+                    replies.put({"type": "error", "error": "The analyzer daemon is shutting down"})
+                return
+            request, replies = item
+            started = time.monotonic()
+            try:
+                if request["op"] == "analyze":
+                    replies.put(self._analyze(request))
+                else:
+                    replies.put(self._scan(request, replies.put))
+            except Exception as e:
+                replies.put({"type": "error", "error": f"{type(e).__name__}: {e}"})
+            with self._stats_lock:
+                self._busy_seconds += time.monotonic() - started
+
+    def _analyze(self, request):
+        texts = request["texts"]
+        entities = request.get("entities")
+        # The engine the client would have built for its selected entity types
+        analyzer = get_presidio_analyzer(
+            request.get("entity_types", entities), request.get("model_name") or SPACY_MODEL_NAME
+        )
+        batch_size = int(request.get("batch_size") or 1)
+        self._count("analyze")
+        self._count("texts_analyzed", len(texts))
+        if request.get("timeout") is None:
+            batch_results = analyze_texts(analyzer, texts, entities, batch_size)
+        else:
+            # The client's file time budget is enforced here, where the analysis runs
+            recognizers, time_budget_analyzer = self._time_budget_analyzers.get(id(analyzer), (None, None))
+            if recognizers is not analyzer.registry.recognizers:
+                # A child forked before the deny list recognizers were replaced still has the old lists
+                if time_budget_analyzer is not None:
+                    time_budget_analyzer.close()
+                time_budget_analyzer = TimeBudgetAnalyzer(analyzer)
+                self._time_budget_analyzers[id(analyzer)] = (analyzer.registry.recognizers, time_budget_analyzer)
+            try:
+                batch_results = time_budget_analyzer.analyze_batch(
+                    texts, entities, batch_size, request["timeout"]
+                )
+            except AnalysisAbandoned as e:
+                self._count("abandoned")
+                return {"type": "result", "abandoned": str(e)}
+        return {
+            "type": "result",
+            "results": [
+                [[r.entity_type, r.start, r.end, r.score] for r in analyzer_results]
+                for analyzer_results in batch_results
+            ],
+        }
+
+    def _scan(self, request, send):
+        from .jobs import _scan_repository, job_settings
+
+        try:
+            settings = job_settings(request.get("settings"))
+        except ValueError as e:
+            return {"type": "error", "error": str(e)}
+        self._count("scan")
+        summary, _findings = _scan_repository(
+            request["directory"], settings,
+            on_finding=lambda finding: send({"type": "finding", "finding": finding}),
+            cancel_event=request["cancel_event"],
+        )
+        return {"type": "result", "summary": summary}
+
+
+# --- Client ---
+class DaemonConnection:
+    """A client connection to the analyzer daemon."""
+
+    def __init__(self, socket_path=None):
+        self.socket_path = socket_path or DAEMON_SOCKET_PATH
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            self._socket.settimeout(DAEMON_CONNECT_TIMEOUT_SECONDS)
+            self._socket.connect(self.socket_path)
+            # Scans and large texts take as long as they take
+            self._socket.settimeout(None)
+        except OSError:
+            self._socket.close()
+            raise
+        self._stream = self._socket.makefile("rwb")
+
+    def request(self, request, on_record=None):
+        """
+        Send ``request`` and return the daemon's final reply. Records sent
+        before it (scan findings) go to ``on_record``. Raises RuntimeError
+        for an error reply and OSError when the connection breaks.
+        """
+        self._stream.write(json.dumps(request).encode("utf-8") + b"\n")
+        self._stream.flush()
+        for line in self._stream:
+            record = json.loads(line)
+            if record["type"] == "error":
+                raise RuntimeError(record["error"])
+            if record["type"] == "result":
+                return record
+            if on_record is not None:
+                on_record(record)
+        raise ConnectionError("The analyzer daemon closed the connection")
+
+    def close(self):
+        self._stream.close()
+        self._socket.close()
+
+
+def daemon_request(request, socket_path=None):
+    """Send one request on a fresh connection; None when no daemon answers."""
+    try:
+        connection = DaemonConnection(socket_path)
+    except OSError:
+        return None
+    try:
+        return connection.request(request)
+    except (OSError, ValueError, RuntimeError):
+        return None
+    finally:
+        connection.close()
+
+
+class RemoteAnalyzer:
+    """
+    Stand-in for a Presidio ``AnalyzerEngine`` that sends texts to the
+    daemon. If the daemon goes away or turns a request down, analysis
+    continues with an in-process engine.
+    """
+
+    def __init__(self, connection, entity_types=None, model_name=SPACY_MODEL_NAME):
+        self._connection = connection
+        self._entity_types = entity_types
+        self._model_name = model_name
+        self._local_analyzer = None
+        self._local_time_budget_analyzer = None
+
+    def analyze(self, text, language='en', entities=None, timeout=None):
+        return self.analyze_batch([text], entities, 1, timeout)[0]
+
+    def analyze_batch(self, texts, entities=None, batch_size=1, timeout=None):
+        """
+        Analyze several texts in one round trip; returns one result list per
+        text. With a ``timeout`` the daemon abandons analysis that takes
+        longer, which raises ``AnalysisAbandoned``.
+        """
+        if self._local_analyzer is None:
+            try:
+                response = self._connection.request({
+                    "op": "analyze",
+                    "texts": texts,
+                    "entity_types": self._entity_types,
+                    "entities": entities,
+                    "model_name": self._model_name,
+                    "batch_size": batch_size,
+                    "timeout": timeout,
+                })
+                if "abandoned" in response:
+                    raise AnalysisAbandoned(response["abandoned"])
+                return [[AnalyzerHit(*result) for result in results] for results in response["results"]]
+            except (OSError, ValueError, RuntimeError) as e:
+                print(f"Analyzer daemon unavailable ({e}); analyzing in-process.")
+                self.close()
+                self._local_analyzer = get_presidio_analyzer(self._entity_types, self._model_name)
+        if timeout is None:
+            return analyze_texts(self._local_analyzer, texts, entities, batch_size)
+        if self._local_time_budget_analyzer is None:
+            self._local_time_budget_analyzer = TimeBudgetAnalyzer(self._local_analyzer)
+        return self._local_time_budget_analyzer.analyze_batch(texts, entities, batch_size, timeout)
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+def connect_analyzer_daemon(entity_types=None, model_name=SPACY_MODEL_NAME, socket_path=None):
+    """Return a ``RemoteAnalyzer`` if a daemon answers on the socket, otherwise None."""
+    socket_path = socket_path or DAEMON_SOCKET_PATH
+    if not os.path.exists(socket_path):
+        return None
+    try:
+        connection = DaemonConnection(socket_path)
+    except OSError:
+        return None
+    try:
+        connection.request({"op": "health"})
+    except (OSError, ValueError, RuntimeError):
+        connection.close()
+        return None
+    return RemoteAnalyzer(connection, entity_types, model_name)
+
+
+def daemon_scan(directory_path, settings, on_finding=None, socket_path=None):
+    """
+    Have the daemon scan ``directory_path`` with scan job ``settings`` (see
+    ``jobs.JOB_SETTINGS_DEFAULTS``) and return the summary, passing findings
+    to ``on_finding`` as they arrive. Returns an "Error..." string when no
+    daemon is running or the scan is turned down.
+    """
+    try:
+        connection = DaemonConnection(socket_path)
+    except OSError as e:
+        return f"Error: No analyzer daemon is running ({e})."
+    try:
+        response = connection.request(
+            {"op": "scan", "directory": os.path.abspath(directory_path), "settings": settings},
+            on_record=lambda record: on_finding(record["finding"]) if on_finding is not None else None,
+        )
+    except (OSError, ValueError, RuntimeError) as e:
+        return f"Error: The analyzer daemon could not run the scan: {e}"
+    finally:
+        connection.close()
+    return response["summary"]
+
+
+# --- Entry Point ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m ghcp_exclusion_builder.daemon",
+        description="Keep Presidio analyzer engines loaded and serve scans over a Unix domain socket.",
+    )
+    parser.add_argument("--socket", default=DAEMON_SOCKET_PATH, help="Unix domain socket path")
+    parser.add_argument("--queue-size", type=int, default=DAEMON_QUEUE_SIZE,
+                        help="Requests that may wait for the analyzer")
+    parser.add_argument("--entity-types", nargs="+", choices=PII_ENTITY_TYPES, default=["PERSON"],
+                        help="Entity types whose engine is loaded at startup")
+    parser.add_argument("--spacy-model", default=SPACY_MODEL_NAME, help="spaCy model loaded at startup")
+    parser.add_argument("--stats", action="store_true", help="Print a running daemon's stats and exit")
+    args = parser.parse_args(argv)
+
+    if args.stats:
+        stats = daemon_request({"op": "stats"}, args.socket)
+        if stats is None:
+            print(f"No analyzer daemon is listening on {args.socket}", file=sys.stderr)
+            return 1
+        print(json.dumps(stats, indent=2, sort_keys=True))
+        return 0
+
+    daemon = AnalyzerDaemon(args.socket, args.queue_size)
+    try:
+        daemon.warm_up(args.entity_types, args.spacy_model)
+        daemon.start()
+    except RuntimeError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    print(f"Analyzer daemon listening on {args.socket} (pid {os.getpid()})", file=sys.stderr)
+    stopped = threading.Event()
+    signal.signal(signal.SIGTERM, lambda _signum, _frame: stopped.set())
+    try:
+        stopped.wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
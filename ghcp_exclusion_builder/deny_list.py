@@ -0,0 +1,257 @@
+import os
+import re
+import json
+import glob
+import pickle
+import hashlib
+from collections import deque
+from .cache import DEFAULT_CACHE_DIR
+
+# --- Configuration ---
+# Directory with one "<ENTITY_TYPE>.txt" term list per custom entity type
+DENY_LIST_DIR = os.environ.get(
+    "GHCP_DENY_LIST_DIR",
+    os.path.join(os.path.expanduser("~"), ".config", "ghcp_exclusion_builder", "deny_lists")
+)
+
+# Optional per-type options in the deny list directory, e.g.
+# {"EMPLOYEE_ID": {"ignore_case": false, "word_boundaries": true, "score": 0.95}}
+DENY_LIST_OPTIONS_FILE = "deny_lists.json"
+
+DENY_LIST_DEFAULT_OPTIONS = {
+    "ignore_case": True,
+    "word_boundaries": True,
+    "score": 0.85,
+}
+
+# Built automata are stored here, keyed on the list content and options
+DENY_LIST_CACHE_SUBDIR = "deny_lists"
+
+# Bumped when the stored automaton layout changes
+AUTOMATON_FORMAT_VERSION = 1
+
+_ENTITY_TYPE_PATTERN = re.compile(r"[A-Z][A-Z0-9_]*\Z")
+
+# Content hashes of list files by (path, mtime, size), so engines can check
+# on every request whether their lists changed without reading them again
+_content_hashes = {}
+
+# Transition keys pack the state and the character's code point (< 2**21)
+_CODE_POINT_BITS = 21
+
+
+# --- Text Folding ---
+def _fold_case(text):
+    """Lower-case ``text`` without changing its length, so match offsets stay valid."""
+    folded = text.lower()
+    if len(folded) == len(text):
+        return folded
+    # A few characters (e.g. "İ") lower-case to two; those keep their case
+    return "".join(char if len(char.lower()) != 1 else char.lower() for char in text)
+
+
+def _is_word_char(char):
+    return char.isalnum() or char == "_"
+
+
+# --- Aho-Corasick Automaton ---
+class DenyListMatcher:
+    """
+    Finds every occurrence of a large set of terms in one linear pass over
+    the text with an Aho-Corasick automaton, instead of a regex alternation
+    whose cost grows with the number of terms.
+
+    With ``ignore_case`` terms and text are lower-cased; with
+    ``word_boundaries`` a match must not continue a word on either side
+    (checked only where the term itself starts or ends with a word character).
+    """
+
+    def __init__(self, terms, ignore_case=True, word_boundaries=True):
+        self.ignore_case = ignore_case
+        self.word_boundaries = word_boundaries
+        self.term_count = 0
+        # Goto transitions (state << 21 | code point -> state), failure links,
+        # and the lengths of the terms ending in each state, longest first
+        self._goto = {}
+        self._fail = [0]
+        self._outputs = {}
+        self._build(terms)
+
+    def _build(self, terms):
+        goto = self._goto
+        fail = self._fail
+        children = {}
+        outputs = {}
+        for term in terms:
+            term = _fold_case(term) if self.ignore_case else term
+            if not term:
+                continue
+            state = 0
+            for char in term:
+                key = state << _CODE_POINT_BITS | ord(char)
+                next_state = goto.get(key)
+                if next_state is None:
+                    next_state = len(fail)
+                    fail.append(0)
+                    goto[key] = next_state
+                    children.setdefault(state, []).append((ord(char), next_state))
+                state = next_state
+            if len(term) not in outputs.setdefault(state, set()):
+                outputs[state].add(len(term))
+                self.term_count += 1
+
+        # Breadth-first, so a state's failure target is complete before its children
+        pending = deque(child for _code, child in children.get(0, ()))
+        while pending:
+            state = pending.popleft()
+            for code, child in children.get(state, ()):
+                fallback = fail[state]
+                while fallback and (fallback << _CODE_POINT_BITS | code) not in goto:
+                    fallback = fail[fallback]
+                target = goto.get(fallback << _CODE_POINT_BITS | code, 0)
+                fail[child] = target
+                if target in outputs:
+                    outputs[child] = outputs.get(child, set()) | outputs[target]
+                pending.append(child)
+        self._outputs = {state: tuple(sorted(lengths, reverse=True)) for state, lengths in outputs.items()}
+
+    def find(self, text):
+        """Return ``(start, end)`` offsets of every term occurrence in ``text``."""
+        goto = self._goto
+        fail = self._fail
+        outputs = self._outputs
+        search_text = _fold_case(text) if self.ignore_case else text
+        matches = []
+        state = 0
+        for position, char in enumerate(search_text):
+            code = ord(char)
+            while True:
+                next_state = goto.get(state << _CODE_POINT_BITS | code)
+                if next_state is not None:
+                    state = next_state
+                    break
+                if not state:
+                    break
+                state = fail[state]
+            lengths = outputs.get(state)
+            if lengths is None:
+                continue
+            end = position + 1
+            for length in lengths:
+                start = end - length
+                if self.word_boundaries and not self._on_word_boundaries(text, start, end):
+                    continue
+                matches.append((start, end))
+        return matches
+
+    @staticmethod
+    def _on_word_boundaries(text, start, end):
+        if start > 0 and _is_word_char(text[start]) and _is_word_char(text[start - 1]):
+            return False
+        if end < len(text) and _is_word_char(text[end - 1]) and _is_word_char(text[end]):
+            return False
+        return True
+
+
+# --- Deny List Files ---
+def deny_list_specs(deny_list_dir=None):
+    """
+    Describe the deny lists in ``deny_list_dir``: entity type -> ``{'path',
+    'ignore_case', 'word_boundaries', 'score'}``. Files whose name is not an
+    upper-case entity type (``STAFF_NAME.txt``) are ignored.
+    """
+    deny_list_dir = deny_list_dir or DENY_LIST_DIR
+    options = {}
+    try:
+        with open(os.path.join(deny_list_dir, DENY_LIST_OPTIONS_FILE), "r", encoding="utf-8") as f_options:
+            options = json.load(f_options)
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError) as e:
+        print(f"Error reading deny list options in {deny_list_dir}: {e}")
+
+    specs = {}
+    for list_path in sorted(glob.glob(os.path.join(deny_list_dir, "*.txt"))):
+        entity_type = os.path.splitext(os.path.basename(list_path))[0]
+        if not _ENTITY_TYPE_PATTERN.match(entity_type):
+            continue
+        specs[entity_type] = {
+            "path": list_path,
+            **DENY_LIST_DEFAULT_OPTIONS,
+            **options.get(entity_type, {}),
+        }
+    return specs
+
+
+def deny_list_entity_types(deny_list_dir=None):
+    """Entity types provided by the deny lists, in file name order."""
+    return list(deny_list_specs(deny_list_dir))
+
+
+def _read_terms(list_path):
+    with open(list_path, "r", encoding="utf-8") as f_terms:
+        for line in f_terms:
+            term = line.strip()
+            if term and not term.startswith("#"):
+                yield term
+
+
+def _content_hash(list_path):
+    stat = os.stat(list_path)
+    key = (list_path, stat.st_mtime_ns, stat.st_size)
+    content_hash = _content_hashes.get(key)
+    if content_hash is None:
+        content_hash = hashlib.sha256()
+        with open(list_path, "rb") as f_terms:
+            for chunk in iter(lambda: f_terms.read(1 << 20), b""):
+                content_hash.update(chunk)
+        for stale_key in list(_content_hashes):
+            if stale_key[0] == list_path:
+                _content_hashes.pop(stale_key, None)
+        _content_hashes[key] = content_hash
+    return content_hash.copy()
+
+
+def _spec_fingerprint(spec):
+    digest = _content_hash(spec["path"])
+    digest.update(json.dumps(
+        [AUTOMATON_FORMAT_VERSION, spec["ignore_case"], spec["word_boundaries"]]
+    ).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def deny_list_fingerprint(entity_types, deny_list_dir=None):
+    """Fingerprint of the selected deny lists' content and options, for analysis cache keys."""
+    specs = deny_list_specs(deny_list_dir)
+    return {
+        entity_type: [_spec_fingerprint(specs[entity_type]), specs[entity_type]["score"]]
+        for entity_type in sorted(set(entity_types or ()) & set(specs))
+    }
+
+
+def load_deny_list_matcher(entity_type, spec, cache_dir=None):
+    """
+    Return the ``DenyListMatcher`` for a deny list, loading the automaton from
+    the on-disk cache when the list and its options are unchanged and
+    building (and storing) it otherwise.
+    """
+    automaton_dir = os.path.join(cache_dir or DEFAULT_CACHE_DIR, DENY_LIST_CACHE_SUBDIR)
+    automaton_path = os.path.join(automaton_dir, f"{entity_type}-{_spec_fingerprint(spec)[:32]}.pickle")
+    try:
+        with open(automaton_path, "rb") as f_automaton:
+            return pickle.load(f_automaton)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+        pass
+
+    matcher = DenyListMatcher(_read_terms(spec["path"]), spec["ignore_case"], spec["word_boundaries"])
+    try:
+        os.makedirs(automaton_dir, exist_ok=True)
+        for stale_path in glob.glob(os.path.join(automaton_dir, f"{entity_type}-*.pickle")):
+            os.remove(stale_path)
+        temporary_path = f"{automaton_path}.{os.getpid()}.tmp"
+        with open(temporary_path, "wb") as f_automaton:
+            pickle.dump(matcher, f_automaton, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary_path, automaton_path)
+    except OSError as e:
+        print(f"Error storing the deny list automaton for {entity_type}: {e}")
+    return matcher
@@ -0,0 +1,40 @@
+from presidio_analyzer import EntityRecognizer, RecognizerResult
+from .deny_list import deny_list_specs, load_deny_list_matcher
+
+# Imported by presidio_analyzer_setup once Presidio is loaded
+
+
+class DenyListRecognizer(EntityRecognizer):
+    """
+    Presidio recognizer for one deny list entity type, backed by an
+    Aho-Corasick ``DenyListMatcher``. The automaton is loaded (or built) the
+    first time the entity type is analyzed, so unselected lists cost nothing.
+    """
+
+    def __init__(self, entity_type, spec, cache_dir=None):
+        self._spec = spec
+        self._cache_dir = cache_dir
+        self._matcher = None
+        super().__init__(supported_entities=[entity_type], name=f"DenyList_{entity_type}")
+
+    def load(self):
+        pass
+
+    def analyze(self, text, entities, nlp_artifacts=None):
+        entity_type = self.supported_entities[0]
+        if entity_type not in entities:
+            return []
+        if self._matcher is None:
+            self._matcher = load_deny_list_matcher(entity_type, self._spec, self._cache_dir)
+        return [
+            RecognizerResult(entity_type=entity_type, start=start, end=end, score=self._spec["score"])
+            for start, end in self._matcher.find(text)
+        ]
+
+
+def deny_list_recognizers(deny_list_dir=None, cache_dir=None):
+    """One ``DenyListRecognizer`` per deny list file."""
+    return [
+        DenyListRecognizer(entity_type, spec, cache_dir)
+        for entity_type, spec in deny_list_specs(deny_list_dir).items()
+    ]
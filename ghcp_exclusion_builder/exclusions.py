@@ -1,4 +1,5 @@
 import os
+import re
 import fnmatch
 
 # --- Configuration ---
@@ -128,6 +129,12 @@ def is_excluded(item_path_normalized, exclusion_patterns):
                     return True
             continue
 
+        # Handle globs anchored at the root, e.g. '/data/**/*.csv'
+        if clean_pattern.startswith('/') and ('*' in clean_pattern or '?' in clean_pattern):
+            if fnmatch.fnmatch(item_path_normalized, clean_pattern.lstrip('/')):
+                return True
+            continue
+
         # Handle exact paths from root (must start with /)
         if clean_pattern.startswith('/'):
             if item_path_normalized == clean_pattern.lstrip('/'):
@@ -153,3 +160,135 @@ def is_excluded(item_path_normalized, exclusion_patterns):
                 return True
 
     return False
+
+
+# --- Compiled Exclusion Matching ---
+_TRIE_TERMINAL = object()
+
+
+class ExclusionMatcher:
+    """
+    Pre-compiled form of an exclusion pattern list.
+
+    Returns exactly what ``is_excluded(path, patterns)`` returns, but does the
+    pattern classification once: basename suffix globs like ``*.png`` go into a
+    hash set, rooted ``/dir/**`` prefixes into a path trie, exact names and
+    paths into sets, and all remaining globs into combined regexes.
+    """
+
+    def __init__(self, exclusion_patterns):
+        self.patterns = list(exclusion_patterns)
+        self._suffixes = set()
+        self._exact_names = set()
+        self._exact_paths = set()
+        self._root_trie = {}
+        dir_regexes = []
+        name_regexes = []
+        path_regexes = []
+
+        for pattern in self.patterns:
+            clean_pattern = pattern.strip().replace(os.sep, '/')
+            if not clean_pattern:
+                continue
+
+            if clean_pattern.endswith('/**'):
+                dir_base = clean_pattern[:-3]
+                if dir_base.startswith('/'):
+                    self._add_root_prefix(dir_base.lstrip('/'))
+                else:
+                    # Equivalent to the '/dir/' substring check plus the
+                    # exact directory match in is_excluded.
+                    escaped = re.escape(dir_base)
+                    dir_regexes.append(f"(?:(?s:.*?/)?{escaped}/)")
+                    dir_regexes.append(f"(?:{escaped}\\Z)")
+                continue
+
+            is_glob = '*' in clean_pattern or '?' in clean_pattern
+            if clean_pattern.startswith('/') and not is_glob:
+                self._exact_paths.add(clean_pattern.lstrip('/'))
+                continue
+
+            if is_glob:
+                # fnmatch.fnmatch normalizes case on both sides; mirror that.
+                norm_pattern = os.path.normcase(clean_pattern.lstrip('/'))
+                if '/' in clean_pattern:
+                    path_regexes.append(f"(?:{fnmatch.translate(norm_pattern)})")
+                elif norm_pattern.startswith('*') and not any(c in norm_pattern[1:] for c in '*?['):
+                    self._suffixes.add(norm_pattern[1:])
+                else:
+                    name_regexes.append(f"(?:{fnmatch.translate(norm_pattern)})")
+                continue
+
+            if '/' in clean_pattern:
+                self._exact_paths.add(clean_pattern)
+            else:
+                self._exact_names.add(clean_pattern)
+
+        self._suffix_lengths = sorted({len(s) for s in self._suffixes})
+        self._dir_regex = re.compile("|".join(dir_regexes)) if dir_regexes else None
+        self._name_regex = re.compile("|".join(name_regexes)) if name_regexes else None
+        self._path_regex = re.compile("|".join(path_regexes)) if path_regexes else None
+
+    def _add_root_prefix(self, dir_base):
+        node = self._root_trie
+        for part in dir_base.split('/'):
+            node = node.setdefault(part, {})
+        node[_TRIE_TERMINAL] = True
+
+    def _matches_root_prefix(self, item_path_normalized):
+        # A rooted '/base/**' matches when the path equals base or starts
+        # with 'base/', i.e. when base's components prefix the path's.
+        if not self._root_trie:
+            return False
+        node = self._root_trie
+        for part in item_path_normalized.split('/'):
+            node = node.get(part)
+            if node is None:
+                return False
+            if _TRIE_TERMINAL in node:
+                return True
+        return False
+
+    def is_excluded(self, item_path_normalized):
+        if item_path_normalized in self._exact_paths:
+            return True
+        if self._matches_root_prefix(item_path_normalized):
+            return True
+
+        item_name = os.path.basename(item_path_normalized.rstrip('/'))
+        if item_name in self._exact_names:
+            return True
+
+        if self._suffix_lengths:
+            norm_name = os.path.normcase(item_name)
+            name_length = len(norm_name)
+            for length in self._suffix_lengths:
+                if length > name_length:
+                    break
+                if norm_name[name_length - length:] in self._suffixes:
+                    return True
+        if self._name_regex is not None:
+            if self._name_regex.match(os.path.normcase(item_name)):
+                return True
+
+        if self._dir_regex is not None:
+            if self._dir_regex.match(item_path_normalized):
+                return True
+        if self._path_regex is not None:
+            if self._path_regex.match(os.path.normcase(item_path_normalized)):
+                return True
+
+        return False
+
+    def is_excluded_in_tree(self, item_path_normalized):
+        """
+        True if the path or any of its parent directories is excluded, i.e.
+        whether a pruning directory walk would skip it.
+        """
+        parts = item_path_normalized.rstrip('/').split('/')
+        for depth in range(1, len(parts)):
+            if self.is_excluded('/'.join(parts[:depth]) + '/'):
+                return True
+        return self.is_excluded(item_path_normalized)
+
+    __call__ = is_excluded
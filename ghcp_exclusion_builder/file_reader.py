@@ -0,0 +1,88 @@
+import mmap
+import codecs
+import contextlib
+
+# --- Configuration ---
+# Bytes inspected at the start of a file to tell text from binary
+SNIFF_BYTES = 8192
+
+# Share of control bytes (other than tab, newline, form feed, escape, ...)
+# in the sniffed head above which a file without NUL bytes counts as binary
+BINARY_CONTROL_RATIO = 0.3
+
+# Byte order marks, longest first (the UTF-32 LE mark starts with the UTF-16 LE one):
+# (mark, codec, bytes per code unit)
+_BYTE_ORDER_MARKS = [
+    (codecs.BOM_UTF32_LE, "utf-32-le", 4),
+    (codecs.BOM_UTF32_BE, "utf-32-be", 4),
+    (codecs.BOM_UTF8, "utf-8", 1),
+    (codecs.BOM_UTF16_LE, "utf-16-le", 2),
+    (codecs.BOM_UTF16_BE, "utf-16-be", 2),
+]
+
+_TEXT_CONTROL_BYTES = {0x07, 0x08, 0x09, 0x0A, 0x0B, 0x0C, 0x0D, 0x1B}
+_NON_TEXT_BYTES = bytes(b for b in range(0x20) if b not in _TEXT_CONTROL_BYTES)
+
+
+# --- Content Sniffing ---
+def sniff_text_encoding(head):
+    """
+    Classify a file from its first bytes.
+
+    Returns ``(encoding, text_start, unit_size)`` for text, where
+    ``text_start`` skips a byte order mark, or None for binary content: NUL
+    bytes without a UTF-16/32 byte order mark, or mostly control bytes.
+    """
+    for mark, encoding, unit_size in _BYTE_ORDER_MARKS:
+        if head.startswith(mark):
+            return encoding, len(mark), unit_size
+    if b"\0" in head:
+        return None
+    control_count = len(head) - len(head.translate(None, _NON_TEXT_BYTES))
+    if control_count > BINARY_CONTROL_RATIO * len(head):
+        return None
+    return "utf-8", 0, 1
+
+
+@contextlib.contextmanager
+def map_file(file_path_abs):
+    """
+    Memory-map a file read-only and yield its bytes (``b""`` when empty).
+    Files that cannot be mapped (e.g. special files) are read instead.
+    """
+    with open(file_path_abs, "rb") as f_raw:
+        try:
+            mapped = mmap.mmap(f_raw.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped
+            yield b""
+            return
+        except OSError:
+            yield f_raw.read()
+            return
+        with mapped:
+            yield mapped
+
+
+# --- Decoding ---
+def align_to_char(data, position, text_start, unit_size):
+    """
+    Move a cut position back to a character boundary, so decoding the slices
+    on either side neither splits a character nor a CRLF pair.
+    """
+    if position >= len(data):
+        return len(data)
+    if unit_size > 1:
+        return position - (position - text_start) % unit_size
+    lowest = max(text_start, position - 3)
+    while position > lowest and data[position] & 0xC0 == 0x80:
+        position -= 1
+    if position > text_start and data[position - 1:position + 1] == b"\r\n":
+        position -= 1
+    return position
+
+
+def decode_text(data, start, end, encoding):
+    """Decode ``data[start:end]`` with newlines translated like a text-mode read."""
+    text = codecs.decode(data[start:end], encoding, errors="ignore")
+    return text.replace("\r\n", "\n").replace("\r", "\n")
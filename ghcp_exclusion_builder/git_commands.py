@@ -0,0 +1,34 @@
+import subprocess
+
+# --- Configuration ---
+GIT_NOT_FOUND_MESSAGE = "git executable not found; this scan needs git on PATH."
+
+
+# --- Running Git ---
+def run_git(repo_path, args):
+    """Run ``git -C repo_path args`` and return its stdout bytes; failures raise RuntimeError."""
+    try:
+        completed = subprocess.run(
+            ["git", "-C", repo_path, *args],
+            capture_output=True,
+            check=True,
+        )
+    except FileNotFoundError:
+        raise RuntimeError(GIT_NOT_FOUND_MESSAGE)
+    except subprocess.CalledProcessError as e:
+        message = e.stderr.decode("utf-8", errors="replace").strip()
+        raise RuntimeError(f"git {' '.join(args)} failed: {message}")
+    return completed.stdout
+
+
+def popen_git(repo_path, args, **popen_kwargs):
+    """Start ``git -C repo_path args`` as a long-running process; a missing git raises RuntimeError."""
+    try:
+        return subprocess.Popen(["git", "-C", repo_path, *args], **popen_kwargs)
+    except FileNotFoundError:
+        raise RuntimeError(GIT_NOT_FOUND_MESSAGE)
+
+
+def split_nul(output):
+    """Split the NUL-separated output of a ``-z`` git command into paths."""
+    return [item for item in output.decode("utf-8", errors="surrogateescape").split("\0") if item]
@@ -0,0 +1,76 @@
+import subprocess
+import contextlib
+from .git_commands import popen_git, run_git, split_nul
+
+# --- Configuration ---
+# Tree entry modes that are not regular file content
+SYMLINK_MODE = "120000"
+
+
+# --- Trees ---
+def resolve_commit(repo_path, ref):
+    """Return the full SHA of the commit ``ref`` points to."""
+    return run_git(repo_path, ["rev-parse", "--verify", "--end-of-options", f"{ref}^{{commit}}"]).decode("ascii").strip()
+
+
+def list_tree_blobs(repo_path, ref):
+    """
+    List the files in the tree of ``ref`` as ``(path, blob_sha, size)``, with
+    paths relative to the repository root. Works on bare repositories;
+    symlinks and submodules are skipped.
+    """
+    entries = split_nul(run_git(repo_path, ["ls-tree", "-r", "-z", "--long", "--full-tree", ref]))
+    for entry in entries:
+        metadata, path = entry.split("\t", 1)
+        mode, object_type, blob_sha, size = metadata.split()
+        if object_type != "blob" or mode == SYMLINK_MODE:
+            continue
+        yield path, blob_sha, int(size)
+
+
+# --- Blob Contents ---
+class GitBlobReader:
+    """
+    Reads blob contents through one long-lived ``git cat-file --batch``
+    process instead of starting git once per file.
+
+    ``open(blob_sha)`` is a drop-in ``read_data`` for the scanner's file
+    analysis. The last blob read is kept, so analyzing it in windows after
+    preparing it does not read it twice.
+    """
+
+    def __init__(self, repo_path):
+        self._process = popen_git(repo_path, ["cat-file", "--batch"], stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        self._last_sha = None
+        self._last_data = None
+
+    def read(self, blob_sha):
+        if blob_sha == self._last_sha:
+            return self._last_data
+        self._process.stdin.write(blob_sha.encode("ascii") + b"\n")
+        self._process.stdin.flush()
+        header = self._process.stdout.readline().split()
+        if len(header) != 3:
+            raise RuntimeError(f"git cat-file could not read object {blob_sha}")
+        data = self._process.stdout.read(int(header[2]))
+        self._process.stdout.read(1)  # Newline after the contents
+        self._last_sha = blob_sha
+        self._last_data = data
+        return data
+
+    @contextlib.contextmanager
+    def open(self, blob_sha):
+        yield self.read(blob_sha)
+
+    def close(self):
+        self._last_data = None
+        if self._process.poll() is None:
+            self._process.stdin.close()
+            self._process.wait()
+        self._process.stdout.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
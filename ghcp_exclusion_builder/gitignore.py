@@ -0,0 +1,155 @@
+import os
+import re
+
+# --- Configuration ---
+GITIGNORE_FILE_NAME = ".gitignore"
+
+# Repository-local ignore rules that are not committed, relative to the root
+INFO_EXCLUDE_PATH = (".git", "info", "exclude")
+
+
+# --- Pattern Compilation ---
+def _translate_glob(glob):
+    """Regex source for a gitignore glob: ``*``, ``?`` and ``[...]`` stop at ``/``; ``**`` spans directories."""
+    regex = []
+    i = 0
+    while i < len(glob):
+        char = glob[i]
+        if glob.startswith("**/", i) and (i == 0 or glob[i - 1] == "/"):
+            # Leading "**/" or "/**/": zero or more directories
+            regex.append("(?:.*/)?")
+            i += 3
+        elif glob.startswith("**", i) and i + 2 == len(glob) and (i == 0 or glob[i - 1] == "/"):
+            # Trailing "/**": everything inside
+            regex.append(".*")
+            i += 2
+        elif char == "*":
+            # Any other "*" (or "**") stays within one path component
+            while i < len(glob) and glob[i] == "*":
+                i += 1
+            regex.append("[^/]*")
+        elif char == "?":
+            regex.append("[^/]")
+            i += 1
+        elif char == "[":
+            end = i + 1
+            if end < len(glob) and glob[end] in "!^":
+                end += 1
+            if end < len(glob) and glob[end] == "]":
+                end += 1
+            end = glob.find("]", end)
+            if end == -1:
+                regex.append(re.escape(char))
+                i += 1
+                continue
+            body = glob[i + 1:end]
+            if body[0] in "!^":
+                body = "^" + body[1:]
+            regex.append("(?!/)[" + body.replace("\\", "\\\\").replace("[", "\\[") + "]")
+            i = end + 1
+        elif char == "\\" and i + 1 < len(glob):
+            regex.append(re.escape(glob[i + 1]))
+            i += 2
+        else:
+            regex.append(re.escape(char))
+            i += 1
+    return "".join(regex)
+
+
+def parse_gitignore(lines):
+    """
+    Compile the lines of a gitignore file into ``(regex, negated, directory_only)``
+    rules, matched against paths relative to the file's directory.
+
+    Follows gitignore(5): blank lines and ``#`` comments are skipped, trailing
+    unescaped spaces dropped, ``!`` negates, a trailing ``/`` only matches
+    directories, and a pattern with a ``/`` before its end is anchored to the
+    file's directory while one without matches at any depth.
+    """
+    rules = []
+    for line in lines:
+        line = line.rstrip("\n\r")
+        if not line or line.startswith("#"):
+            continue
+        # Trailing spaces are ignored unless escaped with a backslash
+        stripped = line.rstrip(" ")
+        if stripped.endswith("\\") and len(stripped) < len(line):
+            stripped += " "
+        line = stripped
+        negated = line.startswith("!")
+        if negated:
+            line = line[1:]
+        elif line.startswith("\\!") or line.startswith("\\#"):
+            line = line[1:]
+        directory_only = line.endswith("/")
+        line = line.rstrip("/")
+        if not line:
+            continue
+        anchored = "/" in line
+        line = line.lstrip("/")
+        prefix = "" if anchored else "(?:.*/)?"
+        rules.append((re.compile(prefix + _translate_glob(line) + r"\Z"), negated, directory_only))
+    return rules
+
+
+# --- Matching ---
+class GitignoreMatcher:
+    """
+    Decides whether a path is ignored by the repository's ``.gitignore`` files
+    (at every level) and ``.git/info/exclude``, with git's precedence: a
+    deeper file overrides a shallower one, a later rule overrides an earlier
+    one, and nothing below an ignored directory can be re-included.
+
+    Paths are relative and ``/``-separated, with a trailing ``/`` for
+    directories, as in ``ExclusionMatcher``. Each directory's ``.gitignore``
+    is read once, the first time a path in that directory is checked.
+    """
+
+    def __init__(self, root_path):
+        self.root_path = root_path
+        self._sources_by_dir = {}
+        self._info_exclude_rules = self._read_rules(os.path.join(root_path, *INFO_EXCLUDE_PATH))
+
+    @staticmethod
+    def _read_rules(file_path):
+        try:
+            with open(file_path, "r", encoding="utf-8", errors="surrogateescape") as f_ignore:
+                return parse_gitignore(f_ignore)
+        except OSError:
+            return []
+
+    def _sources(self, relative_dir_normalized):
+        """``(base length, rules)`` applying in a directory, deepest .gitignore first, .git/info/exclude last."""
+        sources = self._sources_by_dir.get(relative_dir_normalized)
+        if sources is None:
+            if relative_dir_normalized:
+                parent_dir = relative_dir_normalized[:relative_dir_normalized.rstrip('/').rfind('/') + 1]
+                parent_sources = self._sources(parent_dir)
+            else:
+                parent_sources = [(0, self._info_exclude_rules)] if self._info_exclude_rules else []
+            dir_path_abs = os.path.join(self.root_path, *relative_dir_normalized.split('/'))
+            rules = self._read_rules(os.path.join(dir_path_abs, GITIGNORE_FILE_NAME))
+            sources = [(len(relative_dir_normalized), rules)] + parent_sources if rules else parent_sources
+            self._sources_by_dir[relative_dir_normalized] = sources
+        return sources
+
+    def is_ignored(self, item_path_normalized):
+        """Whether the rules ignore this path itself (its parent directories are not checked)."""
+        is_dir = item_path_normalized.endswith('/')
+        path = item_path_normalized.rstrip('/')
+        for base_length, rules in self._sources(path[:path.rfind('/') + 1]):
+            relative_path = path[base_length:]
+            for regex, negated, directory_only in reversed(rules):
+                if directory_only and not is_dir:
+                    continue
+                if regex.match(relative_path):
+                    return not negated
+        return False
+
+    def is_ignored_in_tree(self, item_path_normalized):
+        """Whether the path or any of its parent directories is ignored."""
+        parts = item_path_normalized.rstrip('/').split('/')
+        for depth in range(1, len(parts)):
+            if self.is_ignored('/'.join(parts[:depth]) + '/'):
+                return True
+        return self.is_ignored(item_path_normalized)
@@ -0,0 +1,157 @@
+import os
+import json
+import hashlib
+from .cache import DEFAULT_CACHE_DIR
+from .git_commands import run_git, split_nul
+
+# --- Configuration ---
+STATE_DIR_NAME = "incremental"
+STATE_FORMAT_VERSION = 1
+
+
+# --- Git Queries ---
+def get_head_commit(repo_path):
+    """Return the full SHA of the commit checked out in ``repo_path``."""
+    return run_git(repo_path, ["rev-parse", "HEAD"]).decode("ascii").strip()
+
+
+def get_changed_paths(repo_path, base_ref, head_ref=None):
+    """
+    List paths changed between ``base_ref`` and ``head_ref``, or between
+    ``base_ref`` and the working tree (including untracked files) when
+    ``head_ref`` is None.
+
+    Returns ``(changed, deleted)`` sets of paths relative to ``repo_path``.
+    Renames count as a deletion of the old path plus a change of the new one.
+    """
+    diff_args = ["diff", "--name-status", "-z", "-M", "--relative", base_ref]
+    if head_ref:
+        diff_args.append(head_ref)
+    fields = split_nul(run_git(repo_path, diff_args))
+
+    changed = set()
+    deleted = set()
+    idx = 0
+    while idx < len(fields):
+        status = fields[idx]
+        if status[0] in ("R", "C"):
+            old_path, new_path = fields[idx + 1], fields[idx + 2]
+            if status[0] == "R":
+                deleted.add(old_path)
+            changed.add(new_path)
+            idx += 3
+            continue
+        path = fields[idx + 1]
+        if status[0] == "D":
+            deleted.add(path)
+        else:
+            changed.add(path)
+        idx += 2
+
+    if not head_ref:
+        changed.update(
+            split_nul(run_git(repo_path, ["ls-files", "--others", "--exclude-standard", "-z"]))
+        )
+    return changed, deleted - changed
+
+
+def commit_exists(repo_path, commit):
+    """True if ``commit`` is still in the repository (it may be gone after a rebase and gc)."""
+    try:
+        run_git(repo_path, ["cat-file", "-e", f"{commit}^{{commit}}"])
+    except RuntimeError:
+        return False
+    return True
+
+
+def get_dirty_paths(repo_path):
+    """Paths whose working tree state differs from HEAD: modified, deleted, renamed or untracked."""
+    changed, deleted = get_changed_paths(repo_path, "HEAD")
+    return changed | deleted
+
+
+# --- Stored Scan State ---
+def default_state_path(directory_path, cache_dir=None):
+    """State file for a scan root, kept under the cache directory."""
+    root_hash = hashlib.sha256(os.path.abspath(directory_path).encode("utf-8")).hexdigest()
+    return os.path.join(cache_dir or DEFAULT_CACHE_DIR, STATE_DIR_NAME, f"{root_hash[:24]}.json")
+
+
+def settings_fingerprint(exclusion_patterns, entity_types, confidence_threshold, min_entities_threshold,
+                         use_gitignore=False, extract_source=False, sample_structured=False,
+                         pipeline_name=None, max_analyzed_bytes=None, deny_lists=None):
+    """
+    Settings that must match for a stored result to be merged with a new
+    scan: besides the scan options, the spaCy pipeline analyzing it, the
+    per-file byte limit and the selected deny lists' ``deny_list_fingerprint``.
+    """
+    settings = {
+        "exclusion_patterns": sorted(set(exclusion_patterns)),
+        "entity_types": sorted(entity_types),
+        "confidence_threshold": round(confidence_threshold, 6),
+        "min_entities_threshold": min_entities_threshold,
+        "pipeline": pipeline_name,
+        "max_analyzed_bytes": max_analyzed_bytes,
+    }
+    if deny_lists:
+        settings["deny_lists"] = deny_lists
+    if use_gitignore:
+        # Only set when enabled, so states stored before the option existed stay valid
+        settings["gitignore"] = True
+    if extract_source:
+        # Findings in source files differ once only comments and strings are analyzed
+        settings["source_extraction"] = True
+    if sample_structured:
+        # ... and in data files once they are sampled by column
+        settings["column_sampling"] = True
+    return settings
+
+
+def load_scan_state(state_path):
+    """Return the stored scan state, or None if it is missing or unreadable."""
+    try:
+        with open(state_path, "r", encoding="utf-8") as f_state:
+            state = json.load(f_state)
+    except (OSError, ValueError):
+        return None
+    if state.get("version") != STATE_FORMAT_VERSION:
+        return None
+    return state
+
+
+def save_scan_state(state_path, commit, settings, flagged_files, dirty_paths=()):
+    """
+    Persist the flagged files of a scan together with its commit and settings.
+    ``dirty_paths`` were scanned with uncommitted content; the next scan
+    analyzes them again even if they no longer differ from ``commit``.
+    """
+    os.makedirs(os.path.dirname(state_path) or ".", exist_ok=True)
+    state = {
+        "version": STATE_FORMAT_VERSION,
+        "commit": commit,
+        "settings": settings,
+        "files": flagged_files,
+        "dirty": sorted(dirty_paths),
+    }
+    tmp_path = state_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f_state:
+        json.dump(state, f_state, indent=1, sort_keys=True)
+    os.replace(tmp_path, state_path)
+
+
+def merge_flagged_files(previous_files, new_files, changed, deleted, exclusion_matcher, gitignore_matcher=None):
+    """
+    Combine previously flagged files with the results for changed files.
+    Stale entries (changed, deleted or now excluded or ignored paths) are dropped first.
+    """
+    merged = {}
+    for path, info in previous_files.items():
+        if path in changed or path in deleted:
+            continue
+        if exclusion_matcher.is_excluded_in_tree(path):
+            continue
+        if gitignore_matcher is not None and gitignore_matcher.is_ignored_in_tree(path):
+            continue
+        merged[path] = info
+    merged.update(new_files)
+    return merged
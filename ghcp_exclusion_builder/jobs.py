@@ -0,0 +1,340 @@
+import os
+import sys
+import json
+import time
+import uuid
+import sqlite3
+import threading
+import contextlib
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from .cache import DEFAULT_CACHE_DIR
+from .scanner import NLP_BATCH_SIZE, scan_directory_for_pii
+
+# --- Configuration ---
+JOBS_FILE_NAME = "scan_jobs.sqlite"
+
+# Repositories scanned at once; each scan runs serially in its own process,
+# so by default every CPU works on one repository
+DEFAULT_WORKER_BUDGET = os.cpu_count() or 1
+
+# Repository scan states
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+STATUS_CANCELLED = "cancelled"
+FINISHED_STATUSES = {STATUS_DONE, STATUS_FAILED, STATUS_CANCELLED}
+
+# scan_directory_for_pii settings a job can set, with their defaults
+JOB_SETTINGS_DEFAULTS = {
+    "selected_presets": [],
+    "custom_exclusions_str": "",
+    "confidence_threshold": 60,
+    "min_entities_threshold": 2,
+    "selected_entity_types": ["PERSON"],
+    "use_cache": True,
+    "incremental": False,
+    "changed_since_ref": None,
+    "max_analyzed_bytes": None,
+    "use_prefilter": True,
+    "nlp_batch_size": NLP_BATCH_SIZE,
+    "spacy_model_name": None,
+    "cache_dir": None,
+    "use_gitignore": False,
+    "file_time_budget": None,
+    "extract_source": True,
+    "sample_structured": True,
+}
+
+
+def job_settings(settings=None):
+    """Complete ``settings`` with the job defaults; unknown names are an error."""
+    settings = dict(settings or {})
+    unknown = sorted(set(settings) - set(JOB_SETTINGS_DEFAULTS))
+    if unknown:
+        raise ValueError(f"Unknown scan job settings: {', '.join(unknown)}")
+    return {**JOB_SETTINGS_DEFAULTS, **settings}
+
+
+def _scan_repository(repository_path, settings, on_finding=None, cancel_event=None):
+    """
+    Scan one repository in a pool process (or the analyzer daemon); returns
+    ``(summary, findings)``. With ``on_finding`` findings are passed on as
+    they arrive instead of being collected.
+    """
+    scan_kwargs = {name: value for name, value in settings.items() if value is not None}
+    findings = []
+    # Scanner messages are log output here; stdout may carry the caller's results
+    with contextlib.redirect_stdout(sys.stderr):
+        summary = scan_directory_for_pii(
+            repository_path,
+            scan_kwargs.pop("selected_presets", []),
+            scan_kwargs.pop("custom_exclusions_str", ""),
+            num_workers=1,
+            on_finding=on_finding or findings.append,
+            collect_rules=False,
+            cancel_event=cancel_event,
+            # Pool processes keep their own warm engines
+            use_daemon=False,
+            **scan_kwargs
+        )
+    return summary, findings
+
+
+# --- Persisted Jobs ---
+class JobStore:
+    """
+    SQLite store of scan jobs: each job's settings and, per repository, its
+    status, scan summary and findings. Safe to share between threads.
+    """
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir or DEFAULT_CACHE_DIR
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.path = os.path.join(self.cache_dir, JOBS_FILE_NAME)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " job_id TEXT PRIMARY KEY,"
+            " settings TEXT NOT NULL,"
+            " submitted REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS repositories ("
+            " job_id TEXT NOT NULL,"
+            " position INTEGER NOT NULL,"
+            " path TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " started REAL,"
+            " finished REAL,"
+            " summary TEXT,"
+            " findings TEXT,"
+            " PRIMARY KEY (job_id, position))"
+        )
+        self._conn.commit()
+
+    def create_job(self, job_id, repository_paths, settings):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO jobs (job_id, settings, submitted) VALUES (?, ?, ?)",
+                (job_id, json.dumps(settings, sort_keys=True), time.time())
+            )
+            self._conn.executemany(
+                "INSERT INTO repositories (job_id, position, path, status) VALUES (?, ?, ?, ?)",
+                [(job_id, position, path, STATUS_QUEUED) for position, path in enumerate(repository_paths)]
+            )
+
+    def job_settings(self, job_id):
+        with self._lock:
+            row = self._conn.execute("SELECT settings FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def set_status(self, job_id, position, status):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE repositories SET status = ?, started = ? WHERE job_id = ? AND position = ?",
+                (status, time.time() if status == STATUS_RUNNING else None, job_id, position)
+            )
+
+    def save_result(self, job_id, position, status, summary, findings=None):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE repositories SET status = ?, finished = ?, summary = ?, findings = ? "
+                "WHERE job_id = ? AND position = ?",
+                (status, time.time(), summary, json.dumps(findings or []), job_id, position)
+            )
+
+    def cancel_queued(self, job_id):
+        with self._lock, self._conn:
+            return self._conn.execute(
+                "UPDATE repositories SET status = ?, finished = ? WHERE job_id = ? AND status = ?",
+                (STATUS_CANCELLED, time.time(), job_id, STATUS_QUEUED)
+            ).rowcount
+
+    def unfinished_repositories(self):
+        """``(job_id, position, path)`` of repositories a previous process left queued or running."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT r.job_id, r.position, r.path FROM repositories r JOIN jobs j USING (job_id) "
+                "WHERE r.status IN (?, ?) ORDER BY j.submitted, r.position",
+                (STATUS_QUEUED, STATUS_RUNNING)
+            ).fetchall()
+
+    def job_status(self, job_id):
+        """Counts per status and the state of each repository, or None for an unknown job."""
+        with self._lock:
+            submitted = self._conn.execute("SELECT submitted FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if submitted is None:
+                return None
+            rows = self._conn.execute(
+                "SELECT path, status, started, finished, findings FROM repositories "
+                "WHERE job_id = ? ORDER BY position", (job_id,)
+            ).fetchall()
+        counts = {}
+        repositories = []
+        for path, status, started, finished, findings in rows:
+            counts[status] = counts.get(status, 0) + 1
+            flagged = None
+            if findings is not None:
+                flagged = sum(1 for finding in json.loads(findings) if "error" not in finding)
+            repositories.append({
+                "repository": path, "status": status, "started": started, "finished": finished,
+                "flagged_files": flagged,
+            })
+        return {
+            "job_id": job_id,
+            "submitted": submitted[0],
+            "finished": all(repository["status"] in FINISHED_STATUSES for repository in repositories),
+            "counts": counts,
+            "repositories": repositories,
+        }
+
+    def job_results(self, job_id):
+        """Summary and findings of every repository of a job, or None for an unknown job."""
+        settings = self.job_settings(job_id)
+        if settings is None:
+            return None
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path, status, summary, findings FROM repositories WHERE job_id = ? ORDER BY position",
+                (job_id,)
+            ).fetchall()
+        return {
+            "job_id": job_id,
+            "settings": settings,
+            "repositories": [
+                {
+                    "repository": path,
+                    "status": status,
+                    "summary": summary,
+                    "findings": json.loads(findings) if findings is not None else [],
+                }
+                for path, status, summary, findings in rows
+            ],
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# --- Scheduling ---
+class ScanScheduler:
+    """
+    Runs the repositories of submitted jobs on a fixed budget of worker
+    processes, one repository per process at a time.
+
+    Jobs are served round-robin: each free worker takes the next repository
+    of the next job with work left, so a small job submitted during a large
+    sweep does not wait for the whole sweep. Every result is persisted in the
+    ``JobStore`` as soon as its repository finishes; ``on_result(job_id,
+    result)`` is an optional callback for the same moment.
+    """
+
+    def __init__(self, worker_budget=DEFAULT_WORKER_BUDGET, store=None, on_result=None,
+                 executor_class=ProcessPoolExecutor):
+        self.worker_budget = max(1, int(worker_budget))
+        self.store = store or JobStore()
+        self.on_result = on_result
+        self._executor_class = executor_class
+        self._executor = None
+        self._queues = OrderedDict()  # job_id -> deque of (position, repository path)
+        self._settings = {}
+        self._running = 0
+        self._condition = threading.Condition()
+
+    def submit(self, repository_paths, settings=None):
+        """Queue a scan of every repository in ``repository_paths`` and return the job id."""
+        repository_paths = [os.path.abspath(path) for path in repository_paths if path]
+        if not repository_paths:
+            raise ValueError("A scan job needs at least one repository path.")
+        settings = job_settings(settings)
+        job_id = uuid.uuid4().hex
+        self.store.create_job(job_id, repository_paths, settings)
+        with self._condition:
+            self._settings[job_id] = settings
+            self._queues[job_id] = deque(enumerate(repository_paths))
+            self._dispatch()
+        return job_id
+
+    def resume(self):
+        """Queue the repositories an earlier process did not finish; returns their count."""
+        unfinished = self.store.unfinished_repositories()
+        with self._condition:
+            for job_id, position, path in unfinished:
+                if job_id not in self._settings:
+                    self._settings[job_id] = self.store.job_settings(job_id)
+                self._queues.setdefault(job_id, deque()).append((position, path))
+            self._dispatch()
+        return len(unfinished)
+
+    def cancel(self, job_id):
+        """Drop the job's queued repositories; those already running finish."""
+        with self._condition:
+            self._queues.pop(job_id, None)
+            cancelled = self.store.cancel_queued(job_id)
+            self._condition.notify_all()
+        return cancelled
+
+    def status(self, job_id):
+        return self.store.job_status(job_id)
+
+    def results(self, job_id):
+        return self.store.job_results(job_id)
+
+    def wait(self, timeout=None):
+        """Block until nothing is queued or running; returns False on timeout."""
+        with self._condition:
+            return self._condition.wait_for(lambda: not self._queues and not self._running, timeout)
+
+    def shutdown(self):
+        with self._condition:
+            self._queues.clear()
+            executor = self._executor
+            self._executor = None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _dispatch(self):
+        # Called with the condition held
+        while self._queues and self._running < self.worker_budget:
+            job_id, repositories = next(iter(self._queues.items()))
+            position, path = repositories.popleft()
+            if repositories:
+                self._queues.move_to_end(job_id)
+            else:
+                del self._queues[job_id]
+            if self._executor is None:
+                self._executor = self._executor_class(max_workers=self.worker_budget)
+            self.store.set_status(job_id, position, STATUS_RUNNING)
+            self._running += 1
+            future = self._executor.submit(_scan_repository, path, self._settings[job_id])
+            future.add_done_callback(
+                lambda future, job_id=job_id, position=position, path=path:
+                self._finish(job_id, position, path, future)
+            )
+
+    def _finish(self, job_id, position, path, future):
+        if future.cancelled():
+            # Dropped by shutdown before it started; resume() picks it up again
+            self.store.set_status(job_id, position, STATUS_QUEUED)
+            with self._condition:
+                self._running -= 1
+                self._condition.notify_all()
+            return
+        try:
+            summary, findings = future.result()
+            status = STATUS_FAILED if summary.startswith("Error") else STATUS_DONE
+        except Exception as e:
+            summary, findings = f"Error during scan: {e}", []
+            status = STATUS_FAILED
+        self.store.save_result(job_id, position, status, summary, findings)
+        if self.on_result is not None:
+            self.on_result(job_id, {"repository": path, "status": status, "summary": summary, "findings": findings})
+        with self._condition:
+            self._running -= 1
+            self._dispatch()
+            self._condition.notify_all()
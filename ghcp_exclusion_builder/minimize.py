@@ -0,0 +1,149 @@
+import posixpath
+
+# --- Configuration ---
+# Default share of flagged files above which a directory (or an extension
+# within it) is excluded with one glob
+DEFAULT_MIN_FLAGGED_RATIO = 0.8
+
+# A glob has to replace at least this many per-file rules
+MIN_FILES_PER_GLOB = 2
+
+
+def _parent_dirs(relative_path):
+    """Directories containing a path, from the root ("") down, e.g. "", "a/", "a/b/"."""
+    parts = relative_path.split('/')[:-1]
+    return [''] + ['/'.join(parts[:depth]) + '/' for depth in range(1, len(parts) + 1)]
+
+
+def _child_entry(relative_path, directory):
+    """The file or subdirectory directly in ``directory`` that contains ``relative_path``."""
+    name = relative_path[len(directory):].split('/', 1)[0]
+    return directory + name + ('/' if '/' in relative_path[len(directory):] else '')
+
+
+def _extension(relative_path):
+    return posixpath.splitext(relative_path)[1]
+
+
+# --- File Tree Counts ---
+class FileTreeCounts:
+    """
+    Number of files below every directory, overall and per extension, built
+    up file by file during a scan without keeping the paths themselves.
+
+    Per-extension counts are the files the directory's extension glob would
+    cover: everything at the root (``*.ext``), but only files in
+    subdirectories elsewhere (``/dir/**/*.ext``).
+    """
+
+    def __init__(self):
+        self.files = {}
+        self.extension_files = {}
+
+    def add(self, relative_path):
+        extension = _extension(relative_path)
+        parents = _parent_dirs(relative_path)
+        for directory in parents:
+            self.files[directory] = self.files.get(directory, 0) + 1
+            if extension and (not directory or directory != parents[-1]):
+                key = (directory, extension)
+                self.extension_files[key] = self.extension_files.get(key, 0) + 1
+
+
+# --- Rule Minimization ---
+def _glob_comment(description, flagged_paths, total_count, flagged_files):
+    pii_types = {}
+    for path in flagged_paths:
+        for pii_type, count in flagged_files[path]['pii_types'].items():
+            pii_types[pii_type] = pii_types.get(pii_type, 0) + count
+    pii_description = ", ".join(f"{count} {pii_type}" for pii_type, count in pii_types.items())
+    return (
+        f"# Ignore {description} in this repository "
+        f"({len(flagged_paths)} of {total_count} files flagged; Contains: {pii_description})."
+    )
+
+
+def minimize_rules(flagged_files, tree_counts, min_flagged_ratio=DEFAULT_MIN_FLAGGED_RATIO):
+    """
+    Replace per-file rules with directory and extension globs where most of
+    the files they would cover are flagged.
+
+    ``flagged_files`` maps relative paths to ``{'pii_count', 'pii_types'}``
+    and ``tree_counts`` is the ``FileTreeCounts`` of all scanned files.
+    Walking down from the root, a directory whose flagged share reaches
+    ``min_flagged_ratio`` becomes ``/dir/**``; otherwise an extension whose
+    flagged share below the directory reaches it becomes ``/dir/**/*.ext``
+    (``*.ext`` at the root) for the files in its subdirectories. Extensions
+    are grouped as spelled, since the glob matches them case-sensitively.
+    Every flagged file stays covered by exactly one rule, so the result
+    never excludes fewer files than the per-file list.
+
+    Returns ``(rule_lines, glob_counts)`` where ``glob_counts`` counts the
+    ``directory``, ``extension`` and ``file`` rules.
+    """
+    from .scanner import exclusion_rule_lines  # The scanner imports this module
+
+    flagged_below = {}  # directory -> flagged paths below it
+    child_dirs = {}
+    for path in sorted(flagged_files):
+        parents = _parent_dirs(path)
+        for directory in parents:
+            flagged_below.setdefault(directory, []).append(path)
+        for parent, child in zip(parents, parents[1:]):
+            child_dirs.setdefault(parent, set()).add(child)
+
+    rules = []  # (sort key, lines)
+    glob_counts = {'directory': 0, 'extension': 0, 'file': 0}
+
+    def visit(directory, covered_extensions):
+        flagged_paths = [path for path in flagged_below[directory] if _extension(path) not in covered_extensions]
+        if not flagged_paths:
+            return
+        total_count = tree_counts.files.get(directory, 0)
+        worth_a_glob = len(flagged_paths) >= max(MIN_FILES_PER_GLOB, min_flagged_ratio * total_count)
+        if directory and worth_a_glob:
+            description = f"everything under `/{directory}`"
+            rules.append((directory, [
+                _glob_comment(description, flagged_paths, total_count, flagged_files),
+                f"- \"/{directory}**\"",
+            ]))
+            glob_counts['directory'] += 1
+            return
+
+        # "/dir/**/*.ext" needs a subdirectory, so files directly in dir keep their own rule
+        by_extension = {}
+        for path in flagged_paths:
+            if not directory or _parent_dirs(path)[-1] != directory:
+                by_extension.setdefault(_extension(path), []).append(path)
+        own_files = [path for path in flagged_paths if _parent_dirs(path)[-1] == directory]
+        covered_extensions = set(covered_extensions)
+        for extension, extension_paths in sorted(by_extension.items()):
+            # Files all below one subdirectory get the narrower glob there
+            entries = {_child_entry(path, directory) for path in extension_paths}
+            extension_total = tree_counts.extension_files.get((directory, extension), 0)
+            worth_a_glob = len(extension_paths) >= max(MIN_FILES_PER_GLOB, min_flagged_ratio * extension_total)
+            if extension and len(entries) > 1 and worth_a_glob:
+                pattern = f"/{directory}**/*{extension}" if directory else f"*{extension}"
+                description = f"`*{extension}` files under `/{directory}`"
+                rules.append((directory, [
+                    _glob_comment(description, extension_paths, extension_total, flagged_files),
+                    f"- \"{pattern}\"",
+                ]))
+                glob_counts['extension'] += 1
+                covered_extensions.add(extension)
+
+        for path in own_files:
+            if directory or _extension(path) not in covered_extensions:
+                rules.append((path, exclusion_rule_lines(
+                    path, flagged_files[path]['pii_types'], flagged_files[path].get('pii_columns')
+                )))
+                glob_counts['file'] += 1
+        for child in sorted(child_dirs.get(directory, ())):
+            visit(child, covered_extensions)
+
+    if flagged_files:
+        visit('', frozenset())
+    rule_lines = []
+    for _key, lines in sorted(rules, key=lambda rule: rule[0]):
+        rule_lines.extend(lines)
+    return rule_lines, glob_counts
@@ -0,0 +1,82 @@
+import re
+from functools import lru_cache
+from itertools import islice
+
+# --- Configuration ---
+# Cheap necessary conditions per entity type. Each pattern must match any
+# text the corresponding Presidio recognizer can match (recognizer patterns
+# are applied case-insensitively), so a text failing every selected check
+# cannot produce a hit and can skip NLP entirely.
+ENTITY_PREFILTER_PATTERNS = {
+    "EMAIL_ADDRESS": r"@",
+    "CREDIT_CARD": r"\d{4}[- ]?\d{3}",
+    "US_SSN": r"\d{3}[- .]?\d{2}",
+    "US_DRIVER_LICENSE": r"[a-z]\d|\d{2}",
+    "IP_ADDRESS": r"\d\.\d|::|[0-9a-f]:[0-9a-f]",
+    "URL": r"\.[a-z]{2}",
+    "US_BANK_NUMBER": r"\d{8}",
+    "US_PASSPORT": r"\d{8}",
+    "IBAN_CODE": r"[a-z]{2}\d{2}",
+    "UK_NHS": r"\d{3}[- ]?\d{3}",
+    "CRYPTO": r"[a-z0-9]{26}",
+    "MEDICAL_LICENSE": r"\d{7}",
+}
+
+# spaCy NER types: names, places and nationalities are (almost always)
+# capitalized, so text without a capitalized word is very unlikely to hold one
+NER_CAPITALIZED_ENTITY_TYPES = {"PERSON", "LOCATION", "NRP"}
+_CAPITALIZED_WORD_PATTERN = r"[A-Z][A-Za-z]"
+
+# Phone numbers are found by the phonenumbers library, not a regex; every
+# number it accepts has at least this many digits, in any script (it reads
+# fullwidth and Arabic-Indic digits too, so count what \d matches)
+PHONE_NUMBER_MIN_DIGITS = 5
+_DIGIT_REGEX = re.compile(r"\d")
+
+
+def _has_non_ascii_capital(text):
+    return not text.isascii() and text != text.lower()
+
+
+def _has_min_digits(text, count):
+    return sum(1 for _ in islice(_DIGIT_REGEX.finditer(text), count)) >= count
+
+
+@lru_cache(maxsize=None)
+def _compile_prefilter(entity_types):
+    case_insensitive = [
+        ENTITY_PREFILTER_PATTERNS[entity_type]
+        for entity_type in entity_types
+        if entity_type in ENTITY_PREFILTER_PATTERNS
+    ]
+    regex = re.compile("|".join(f"(?:{p})" for p in case_insensitive), re.IGNORECASE) if case_insensitive else None
+    capitalized_regex = None
+    if NER_CAPITALIZED_ENTITY_TYPES.intersection(entity_types):
+        capitalized_regex = re.compile(_CAPITALIZED_WORD_PATTERN)
+    check_phone = "PHONE_NUMBER" in entity_types
+
+    def may_contain_entities(text):
+        if regex is not None and regex.search(text):
+            return True
+        if capitalized_regex is not None:
+            if capitalized_regex.search(text) or _has_non_ascii_capital(text):
+                return True
+        if check_phone and _has_min_digits(text, PHONE_NUMBER_MIN_DIGITS):
+            return True
+        return False
+
+    return may_contain_entities
+
+
+def get_prefilter(entity_types):
+    """
+    Return a function ``text -> bool`` that is False only when the text
+    cannot contain any of ``entity_types``, or None if some selected type
+    has no cheap check (e.g. DATE_TIME or a custom recognizer) and every
+    text has to go through the analyzer.
+    """
+    entity_types = tuple(sorted(set(entity_types)))
+    supported = set(ENTITY_PREFILTER_PATTERNS) | NER_CAPITALIZED_ENTITY_TYPES | {"PHONE_NUMBER"}
+    if not entity_types or not supported.issuperset(entity_types):
+        return None
+    return _compile_prefilter(entity_types)
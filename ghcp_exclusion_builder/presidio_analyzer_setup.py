@@ -1,10 +1,34 @@
-from presidio_analyzer import AnalyzerEngine
-from presidio_analyzer.nlp_engine import NlpEngineProvider
-import spacy
+import os
+import threading
+import importlib.util
+from .deny_list import deny_list_entity_types, deny_list_fingerprint
 
+# Presidio and spaCy are imported on first use: loading them (and a model)
+# takes seconds, and importing the scanner should not pay for that
 
-# Global variable to cache the Presidio analyzer engine
-_analyzer_engine = None
+
+# Analyzer engines built so far, keyed by their pipeline configuration
+_analyzer_engines = {}
+_analyzer_engines_lock = threading.Lock()
+
+# Deny list fingerprints (see deny_list_fingerprint) each engine's deny list
+# recognizers were added with, to replace them once a list changes
+_engine_deny_lists = {}
+
+# spaCy model backing the NLP engine when named entities are needed
+SPACY_MODEL_NAME = "en_core_web_lg"
+SPACY_MODEL_CHOICES = ["en_core_web_sm", "en_core_web_md", "en_core_web_lg"]
+
+# Pipeline name used when no selected entity type needs the NER model
+BLANK_PIPELINE_NAME = "blank"
+
+# Entity types that come from the spaCy NER model; everything else is found
+# by pattern/checksum recognizers that only need tokens
+NER_ENTITY_TYPES = {"PERSON", "LOCATION", "NRP", "DATE_TIME"}
+
+# Components Presidio does not use; only the tokenizer and NER are kept.
+# tok2vec is dropped as well when nothing left in the pipeline listens to it.
+UNUSED_SPACY_COMPONENTS = ["tagger", "parser", "senter", "attribute_ruler", "lemmatizer"]
 
 # List of PII entity types supported by Presidio
 PII_ENTITY_TYPES = [
@@ -27,38 +51,124 @@ PII_ENTITY_TYPES = [
     "MEDICAL_LICENSE"
 ]
 
+# Organization-specific types from the deny list directory (see deny_list.py)
+PII_ENTITY_TYPES += [entity_type for entity_type in deny_list_entity_types() if entity_type not in PII_ENTITY_TYPES]
+
+
+def _lowercase_lemma(doc):
+    # Presidio's context enhancer compares lemmas against lower-case context
+    # words; without the lemmatizer the lower-cased token text stands in
+    for token in doc:
+        token.lemma_ = token.lower_
+    return doc
+
 
-def get_presidio_analyzer():
+def needs_ner(entity_types):
+    """True if any of ``entity_types`` is detected by the spaCy NER model."""
+    return entity_types is None or bool(NER_ENTITY_TYPES.intersection(entity_types))
+
+
+def analyzer_pipeline_name(entity_types=None, model_name=SPACY_MODEL_NAME):
+    """Name of the spaCy pipeline that serves ``entity_types``."""
+    return model_name if needs_ner(entity_types) else BLANK_PIPELINE_NAME
+
+
+def _missing_model_error(pipeline_name):
+    return RuntimeError(
+        f"SpaCy model '{pipeline_name}' is required but not found. "
+        "Please build/rebuild the devcontainer or run "
+        f"'python -m spacy download {pipeline_name}'."
+    )
+
+
+def check_spacy_model(entity_types=None, model_name=SPACY_MODEL_NAME):
     """
-    Initialize and return a Presidio PII Analyzer with the default
-    supported PII recognizers.
+    Raise RuntimeError if the pipeline for ``entity_types`` needs a spaCy
+    model that is not installed, without importing spaCy or loading it; for
+    scans whose engines are built in worker processes.
     """
-    global _analyzer_engine
-    if _analyzer_engine is None:
+    pipeline_name = analyzer_pipeline_name(entity_types, model_name)
+    if pipeline_name == BLANK_PIPELINE_NAME or os.path.isdir(pipeline_name):
+        return
+    try:
+        model_spec = importlib.util.find_spec(pipeline_name)
+    except (ImportError, ValueError):
+        model_spec = None
+    if model_spec is None:
+        raise _missing_model_error(pipeline_name)
+
+
+def _load_spacy_pipeline(pipeline_name):
+    import spacy
+    from spacy.language import Language
+
+    if not Language.has_factory("lowercase_lemma"):
+        Language.component("lowercase_lemma", func=_lowercase_lemma)
+
+    if pipeline_name == BLANK_PIPELINE_NAME:
+        nlp = spacy.blank("en")
+    else:
         try:
-            spacy.load("en_core_web_lg")
+            nlp = spacy.load(pipeline_name, exclude=UNUSED_SPACY_COMPONENTS)
         except OSError:
             print(
-                "CRITICAL: SpaCy model 'en_core_web_lg' not found. Please ensure it's downloaded."
-            )
-            print("Run: python -m spacy download en_core_web_lg")
-            raise RuntimeError(
-                "SpaCy model 'en_core_web_lg' is required but not found. "
-                "Please build/rebuild the devcontainer or run "
-                "'python -m spacy download en_core_web_lg'."
+                f"CRITICAL: SpaCy model '{pipeline_name}' not found. Please ensure it's downloaded."
             )
+            print(f"Run: python -m spacy download {pipeline_name}")
+            raise _missing_model_error(pipeline_name)
+        if "tok2vec" in nlp.pipe_names and not nlp.get_pipe("tok2vec").listening_components:
+            nlp.remove_pipe("tok2vec")
+    nlp.add_pipe("lowercase_lemma")
+    return nlp
+
+
+def _deny_lists_changed(added_deny_lists, deny_lists, entity_types):
+    """True if ``deny_lists``, the selected lists now, differ from those the recognizers were added with."""
+    selected = set(added_deny_lists) if entity_types is None else set(added_deny_lists) & set(entity_types)
+    return deny_lists != {entity_type: added_deny_lists[entity_type] for entity_type in selected}
+
+
+def _replace_deny_list_recognizers(analyzer):
+    from .deny_list_recognizer import DenyListRecognizer, deny_list_recognizers
+
+    analyzer.registry.recognizers = [
+        recognizer for recognizer in analyzer.registry.recognizers if not isinstance(recognizer, DenyListRecognizer)
+    ]
+    for recognizer in deny_list_recognizers():
+        analyzer.registry.add_recognizer(recognizer)
 
-        nlp_engine_provider = NlpEngineProvider(
-            nlp_configuration={
-                "nlp_engine_name": "spacy",
-                "models": [
-                    {"lang_code": "en", "model_name": "en_core_web_lg"}
-                ]
-            }
-        )
-        _analyzer_engine = AnalyzerEngine(
-            nlp_engine=nlp_engine_provider.create_engine(),
-            supported_languages=["en"]
-        )
-        print("Presidio AnalyzerEngine initialized.")
-    return _analyzer_engine
+
+def get_presidio_analyzer(entity_types=None, model_name=SPACY_MODEL_NAME):
+    """
+    Initialize and return a Presidio PII Analyzer with the default
+    supported PII recognizers.
+
+    The spaCy pipeline is chosen from ``entity_types``: a blank (tokenizer
+    only) pipeline when none of them needs NER, otherwise ``model_name``
+    with only its NER component. Engines are cached per pipeline; None
+    means every entity type. A recognizer for every deny list is added, and
+    replaced when a selected list's terms or options have changed since.
+    """
+    pipeline_name = analyzer_pipeline_name(entity_types, model_name)
+    deny_lists = deny_list_fingerprint(deny_list_entity_types() if entity_types is None else entity_types)
+    # A scan started during the app's background warm-up waits for the same engine
+    with _analyzer_engines_lock:
+        if pipeline_name not in _analyzer_engines:
+            from presidio_analyzer import AnalyzerEngine
+            from presidio_analyzer.nlp_engine import SpacyNlpEngine
+
+            nlp_engine = SpacyNlpEngine(
+                models=[{"lang_code": "en", "model_name": pipeline_name}]
+            )
+            nlp_engine.nlp = {"en": _load_spacy_pipeline(pipeline_name)}
+            _analyzer_engines[pipeline_name] = AnalyzerEngine(
+                nlp_engine=nlp_engine,
+                supported_languages=["en"]
+            )
+            print(f"Presidio AnalyzerEngine initialized ({pipeline_name} pipeline).")
+        analyzer = _analyzer_engines[pipeline_name]
+        added_deny_lists = _engine_deny_lists.get(pipeline_name)
+        if added_deny_lists is None or _deny_lists_changed(added_deny_lists, deny_lists, entity_types):
+            _replace_deny_list_recognizers(analyzer)
+            _engine_deny_lists[pipeline_name] = deny_list_fingerprint(deny_list_entity_types())
+        return analyzer
@@ -0,0 +1,198 @@
+import os
+import json
+import time
+import heapq
+
+# --- Configuration ---
+# Slowest files kept in a scan profile
+SLOWEST_FILES_COUNT = 10
+
+# Stages in report order. walk and exclusions run in the scanning process;
+# the per-file stages run wherever the file is analyzed (possibly a worker)
+SCAN_STAGES = ["walk", "exclusions"]
+FILE_STAGES = ["read", "decode", "sample", "extract", "prefilter", "guard", "cache", "analyze"]
+
+
+# --- Per-File Spans ---
+def record_span(file_result, stage, start, duration=None):
+    """
+    Record that ``stage`` of a file started at ``start`` (``time.perf_counter``)
+    and ran until now, or for ``duration`` seconds. Does nothing unless the
+    file is profiled (its ``spans`` list is set).
+    """
+    spans = file_result['spans']
+    if spans is not None:
+        if duration is None:
+            duration = time.perf_counter() - start
+        spans.append((stage, start, duration))
+
+
+class TimedExclusionMatcher:
+    """An ExclusionMatcher that adds the time spent matching to a scan profile."""
+
+    def __init__(self, exclusion_matcher, profile):
+        self._exclusion_matcher = exclusion_matcher
+        self._profile = profile
+
+    def is_excluded(self, item_path_normalized):
+        start = time.perf_counter()
+        excluded = self._exclusion_matcher.is_excluded(item_path_normalized)
+        self._profile.add_stage_time("exclusions", time.perf_counter() - start)
+        return excluded
+
+    def is_excluded_in_tree(self, item_path_normalized):
+        start = time.perf_counter()
+        excluded = self._exclusion_matcher.is_excluded_in_tree(item_path_normalized)
+        self._profile.add_stage_time("exclusions", time.perf_counter() - start)
+        return excluded
+
+
+# --- Scan Profile ---
+class ScanProfile:
+    """
+    Timing of one scan: seconds per stage, throughput and the slowest files.
+
+    Pass an instance as ``profile`` to ``scan_directory_for_pii`` and read
+    ``as_dict()`` (or ``summary_lines()``) afterwards. ``on_span`` is an
+    optional hook ``on_span(name, start, duration, attributes)`` called for
+    every timed stage of every file and once for the whole scan, with
+    ``start`` in ``time.perf_counter`` seconds; use it to export the spans to
+    a tracing or profiling backend (see ``ChromeTraceRecorder``).
+
+    Per-file stages of a scan with worker processes are summed over the
+    workers, so they can add up to more than the elapsed time.
+    """
+
+    def __init__(self, slowest_count=SLOWEST_FILES_COUNT, on_span=None):
+        self.slowest_count = slowest_count
+        self.on_span = on_span
+        self.stage_seconds = {}
+        self.file_count = 0
+        self.byte_count = 0
+        self.started = None
+        self.elapsed = None
+        self._slowest = []  # Min-heap of (seconds, order, file record)
+
+    def start(self):
+        self.started = time.perf_counter()
+
+    def finish(self):
+        self.elapsed = time.perf_counter() - self.started
+        if self.on_span is not None:
+            self.on_span("scan", self.started, self.elapsed, {'files': self.file_count, 'bytes': self.byte_count})
+
+    def add_stage_time(self, stage, seconds):
+        self.stage_seconds[stage] = self.stage_seconds.get(stage, 0.0) + seconds
+
+    def timed_walk(self, candidate_files):
+        """Pass the walk's candidates through, timing the walk apart from exclusion matching."""
+        candidates = iter(candidate_files)
+        while True:
+            start = time.perf_counter()
+            matching_before = self.stage_seconds.get("exclusions", 0.0)
+            try:
+                candidate = next(candidates)
+            except StopIteration:
+                candidate = None
+            matching_seconds = self.stage_seconds.get("exclusions", 0.0) - matching_before
+            self.add_stage_time("walk", time.perf_counter() - start - matching_seconds)
+            if candidate is None:
+                return
+            yield candidate
+
+    def add_file(self, relative_file_path_normalized, file_result, confidence_threshold):
+        """Account for one analyzed file; ``file_result`` carries its spans and size."""
+        file_seconds = 0.0
+        stages = {}
+        for stage, start, duration in file_result['spans'] or []:
+            self.add_stage_time(stage, duration)
+            stages[stage] = stages.get(stage, 0.0) + duration
+            file_seconds += duration
+            if self.on_span is not None:
+                self.on_span(stage, start, duration, {
+                    'path': relative_file_path_normalized, 'pid': file_result['pid']
+                })
+        self.file_count += 1
+        self.byte_count += file_result['size'] or 0
+
+        if self.slowest_count <= 0:
+            return
+        if len(self._slowest) >= self.slowest_count and file_seconds <= self._slowest[0][0]:
+            return
+        results = file_result['results'] or []
+        record = {
+            'path': relative_file_path_normalized,
+            'seconds': file_seconds,
+            'size': file_result['size'],
+            'entities': len(results),
+            'significant_entities': sum(1 for result in results if result[1] >= confidence_threshold),
+            'stages': stages,
+        }
+        item = (file_seconds, self.file_count, record)
+        if len(self._slowest) < self.slowest_count:
+            heapq.heappush(self._slowest, item)
+        else:
+            heapq.heapreplace(self._slowest, item)
+
+    def slowest_files(self):
+        return [record for _seconds, _order, record in sorted(self._slowest, key=lambda item: (-item[0], item[1]))]
+
+    def as_dict(self):
+        elapsed = self.elapsed or 0.0
+        return {
+            'elapsed_seconds': elapsed,
+            'files': self.file_count,
+            'bytes': self.byte_count,
+            'files_per_second': self.file_count / elapsed if elapsed else None,
+            'mb_per_second': self.byte_count / elapsed / 1e6 if elapsed else None,
+            'stage_seconds': {
+                stage: self.stage_seconds[stage] for stage in SCAN_STAGES + FILE_STAGES
+                if stage in self.stage_seconds
+            },
+            'slowest_files': self.slowest_files(),
+        }
+
+    def summary_lines(self):
+        profile = self.as_dict()
+        lines = [
+            f"# Timing: {profile['elapsed_seconds']:.2f}s for {profile['files']} files "
+            f"({profile['files_per_second'] or 0:.1f} files/s, {profile['mb_per_second'] or 0:.2f} MB/s)",
+            "# Stage seconds: " + ", ".join(
+                f"{stage} {seconds:.3f}" for stage, seconds in profile['stage_seconds'].items()
+            ),
+        ]
+        if profile['slowest_files']:
+            lines.append(f"# Slowest {len(profile['slowest_files'])} files:")
+            lines.extend(
+                f"#   {record['seconds']:.3f}s /{record['path']} ({record['size'] or 0} bytes, "
+                f"{record['entities']} entities, {record['significant_entities']} significant)"
+                for record in profile['slowest_files']
+            )
+        return lines
+
+
+# --- Trace Export ---
+class ChromeTraceRecorder:
+    """
+    ``on_span`` hook collecting spans in the Chrome trace event format, which
+    chrome://tracing and Perfetto open locally. Worker processes get their
+    own track.
+    """
+
+    def __init__(self):
+        self.events = []
+
+    def __call__(self, name, start, duration, attributes):
+        self.events.append({
+            'name': name,
+            'ph': 'X',
+            'ts': start * 1e6,
+            'dur': duration * 1e6,
+            'pid': attributes.get('pid') or os.getpid(),
+            'tid': 0,
+            'args': {key: value for key, value in attributes.items() if key != 'pid'},
+        })
+
+    def write(self, trace_path):
+        with open(trace_path, "w", encoding="utf-8") as f_trace:
+            json.dump({'traceEvents': self.events, 'displayTimeUnit': 'ms'}, f_trace)
@@ -0,0 +1,79 @@
+import os
+import re
+
+# --- Configuration ---
+# Source languages recognized by file extension. Only their comments, string
+# literals (including docstrings) and, for data files, values are analyzed;
+# identifiers and syntax cost NER time and yield PERSON hits on class names.
+SOURCE_LANGUAGES = {
+    ".py": "python", ".pyi": "python",
+    ".js": "javascript", ".mjs": "javascript", ".cjs": "javascript", ".jsx": "javascript",
+    ".ts": "javascript", ".mts": "javascript", ".cts": "javascript", ".tsx": "javascript",
+    ".java": "java",
+    ".cs": "csharp",
+    ".go": "go",
+    ".yaml": "yaml", ".yml": "yaml",
+    ".json": "json",
+}
+
+# Extracted pieces are joined with this, so an entity never spans two of them
+SEGMENT_SEPARATOR = "\n"
+
+# Single-line quoted strings; an unterminated quote matches nothing, so a
+# stray quote character cannot swallow the rest of the file
+_DOUBLE_QUOTED = r'"(?:[^"\\\n]|\\.)*"'
+_SINGLE_QUOTED = r"'(?:[^'\\\n]|\\.)*'"
+_LINE_COMMENT = r"//[^\n]*"
+# Unterminated block comments and multi-line strings run to the end of the text
+_BLOCK_COMMENT = r"/\*[\s\S]*?(?:\*/|\Z)"
+_BACKTICK_QUOTED = r"`[\s\S]*?(?:`|\Z)"
+_TEXT_BLOCK = r'"""[\s\S]*?(?:"""|\Z)'
+
+# Per language, one regex whose matches are the analyzed pieces, except those
+# matching the "skip" group (keys of data files). Alternatives sharing a start
+# position are tried in order, and a match always begins at the leftmost
+# token, so a comment marker inside a string (or a quote inside a comment)
+# is never mistaken for the start of another token.
+_LANGUAGE_PATTERNS = {
+    "python": re.compile("|".join([
+        r"#[^\n]*", r"'''[\s\S]*?(?:'''|\Z)", _TEXT_BLOCK,
+        r'"(?:[^"\\\n]|\\[\s\S])*"', r"'(?:[^'\\\n]|\\[\s\S])*'",
+    ])),
+    "javascript": re.compile("|".join([
+        _LINE_COMMENT, _BLOCK_COMMENT, _DOUBLE_QUOTED, _SINGLE_QUOTED, _BACKTICK_QUOTED,
+    ])),
+    "java": re.compile("|".join([_LINE_COMMENT, _BLOCK_COMMENT, _TEXT_BLOCK, _DOUBLE_QUOTED, _SINGLE_QUOTED])),
+    # Verbatim strings double their quotes; raw string literals use three
+    "csharp": re.compile("|".join([
+        _LINE_COMMENT, _BLOCK_COMMENT, _TEXT_BLOCK, r'@"(?:[^"]|"")*"', _DOUBLE_QUOTED, _SINGLE_QUOTED,
+    ])),
+    "go": re.compile("|".join([_LINE_COMMENT, _BLOCK_COMMENT, _DOUBLE_QUOTED, _SINGLE_QUOTED, _BACKTICK_QUOTED])),
+    # Mapping keys are skipped; comments, values and list items are analyzed
+    "yaml": re.compile("|".join([
+        r"(?P<skip>^[ \t]*(?:-[ \t]+)*(?:\"[^\"\n]*\"|'[^'\n]*'|[^\s#'\"\-][^\n:#]*?)[ \t]*:(?=[ \t]|$))",
+        r"(?<!\S)#[^\n]*",
+        # A "#" not following whitespace (a URL fragment) is part of the value
+        r"[^\s#](?:[^\n#]|(?<!\s)#)*",
+    ]), re.MULTILINE),
+    # Object keys are skipped; string and number values are analyzed
+    "json": re.compile("|".join([
+        r"(?P<skip>" + _DOUBLE_QUOTED + r"\s*:)", _DOUBLE_QUOTED, r"-?\d[\d.eE+\-]*",
+    ])),
+}
+
+
+# --- Extraction ---
+def source_language(file_path):
+    """Source language of ``file_path`` by its extension, or None for other files."""
+    return SOURCE_LANGUAGES.get(os.path.splitext(file_path)[1].lower())
+
+
+def extract_source_text(language, text):
+    """
+    Return the comments, string literals and data values of ``text`` (source
+    code in ``language``) joined by ``SEGMENT_SEPARATOR``.
+    """
+    return SEGMENT_SEPARATOR.join(
+        match.group() for match in _LANGUAGE_PATTERNS[language].finditer(text)
+        if match.lastgroup != "skip" and match.group().strip()
+    )
@@ -0,0 +1,247 @@
+import io
+import os
+import csv
+import json
+import bisect
+from .file_reader import align_to_char, decode_text
+
+# --- Configuration ---
+# Data file formats recognized by file extension
+STRUCTURED_FORMATS = {
+    ".csv": "csv",
+    ".tsv": "tsv",
+    ".jsonl": "jsonl", ".ndjson": "jsonl",
+    ".json": "json",
+}
+_DELIMITERS = {"csv": ",", "tsv": "\t"}
+
+# Distinct values sampled per column (or JSON key); the work per file is
+# bounded by these limits, however large the file is. A value repeated in
+# the sampled rows is analyzed once but its hits count once per row.
+STRUCTURED_VALUES_PER_COLUMN = 50
+STRUCTURED_MAX_COLUMNS = 200
+STRUCTURED_MAX_VALUE_CHARS = 300
+
+# Rows are read from this many ranges at evenly spaced offsets, the first
+# at the start of the file, each of at most this many bytes
+STRUCTURED_SAMPLE_RANGES = 8
+STRUCTURED_RANGE_BYTES = 64 * 1024
+
+
+# --- Row Sampling ---
+def structured_format(file_path):
+    """Data format of ``file_path`` by its extension, or None for other files."""
+    return STRUCTURED_FORMATS.get(os.path.splitext(file_path)[1].lower())
+
+
+def _sample_range_texts(data, encoding, text_start, unit_size):
+    """Decoded ranges of whole lines at evenly spaced offsets, the first starting at ``text_start``."""
+    range_count = STRUCTURED_SAMPLE_RANGES
+    if len(data) - text_start <= STRUCTURED_RANGE_BYTES * range_count:
+        # Small enough to read it all
+        return [decode_text(data, text_start, len(data), encoding)]
+    step = (len(data) - text_start) // range_count
+    range_texts = []
+    for range_index in range(range_count):
+        start = align_to_char(data, text_start + range_index * step, text_start, unit_size)
+        end = align_to_char(data, start + STRUCTURED_RANGE_BYTES, text_start, unit_size)
+        text = decode_text(data, start, end, encoding)
+        if range_index > 0:
+            # Drop the line the range starts in
+            text = text[text.find("\n") + 1:] if "\n" in text else ""
+        if end < len(data):
+            # ... and the one it is cut in
+            text = text[:text.rfind("\n") + 1]
+        range_texts.append(text)
+    return range_texts
+
+
+def _rows_per_range(range_texts):
+    return -(-STRUCTURED_VALUES_PER_COLUMN // len(range_texts))
+
+
+def _is_header(row):
+    """A first row is taken as column names unless a field looks like a value: a number or an address."""
+    for field in row:
+        if "@" in field:
+            return False
+        try:
+            float(field)
+        except ValueError:
+            continue
+        return False
+    return True
+
+
+def _csv_records(range_texts, delimiter):
+    """Sampled CSV/TSV rows as ``{column: value}``; None if the file has no rows or most are ragged."""
+    first_rows = list(csv.reader(io.StringIO(range_texts[0]), delimiter=delimiter))
+    if not first_rows:
+        return None
+    if _is_header(first_rows[0]):
+        columns = [name.strip() or f"column {i + 1}" for i, name in enumerate(first_rows[0])]
+        first_rows = first_rows[1:]
+    else:
+        columns = [f"column {i + 1}" for i in range(len(first_rows[0]))]
+    rows_per_range = _rows_per_range(range_texts)
+    sampled_rows = first_rows[:rows_per_range]
+    for text in range_texts[1:]:
+        sampled_rows.extend(list(csv.reader(io.StringIO(text), delimiter=delimiter))[:rows_per_range])
+    # A range starting inside a quoted multi-line field yields rows of the wrong width; they are dropped
+    records = [dict(zip(columns, row)) for row in sampled_rows if len(row) == len(columns)]
+    if len(records) * 2 < len(sampled_rows):
+        # Mostly ragged rows, e.g. unquoted commas in free text: not a table to sample by column
+        return None
+    return records
+
+
+def _jsonl_records(range_texts):
+    """Sampled JSON Lines objects; None if the first line is not one."""
+    rows_per_range = _rows_per_range(range_texts)
+    records = []
+    for range_index, text in enumerate(range_texts):
+        range_records = []
+        for line in text.splitlines():
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+            if not isinstance(record, dict):
+                if range_index == 0 and not records and not range_records:
+                    return None
+                continue
+            range_records.append(record)
+            if len(range_records) >= rows_per_range:
+                break
+        records.extend(range_records)
+    return records
+
+
+def _json_array_records(text):
+    """The first objects of a JSON array of objects; None for other JSON."""
+    decoder = json.JSONDecoder()
+    position = len(text) - len(text.lstrip())
+    if not text.startswith("[", position):
+        return None
+    position += 1
+    records = []
+    while len(records) < STRUCTURED_VALUES_PER_COLUMN:
+        while position < len(text) and text[position] in " \t\n,":
+            position += 1
+        if position >= len(text) or text[position] == "]":
+            break
+        try:
+            record, position = decoder.raw_decode(text, position)
+        except ValueError:
+            # Cut off at the end of the read range, or malformed
+            break
+        if not isinstance(record, dict):
+            if not records:
+                return None
+            break
+        records.append(record)
+    return records or None
+
+
+def _flatten(value, column, columns):
+    """Add the scalar values in ``value`` to ``columns`` as ``(column, text)``; nested keys are joined with dots."""
+    if isinstance(value, dict):
+        for key, item in value.items():
+            _flatten(item, f"{column}.{key}" if column else str(key), columns)
+    elif isinstance(value, list):
+        for item in value:
+            _flatten(item, f"{column}[]", columns)
+    elif isinstance(value, (str, int, float)) and not isinstance(value, bool):
+        columns.append((column, str(value)))
+
+
+def sampling_config():
+    """The sampling limits, for cache keys of results from sampled files."""
+    return {
+        "values_per_column": STRUCTURED_VALUES_PER_COLUMN,
+        "max_columns": STRUCTURED_MAX_COLUMNS,
+        "max_value_chars": STRUCTURED_MAX_VALUE_CHARS,
+        "sample_ranges": STRUCTURED_SAMPLE_RANGES,
+        "range_bytes": STRUCTURED_RANGE_BYTES,
+    }
+
+
+def sample_columns(data, data_format, encoding, text_start, unit_size):
+    """
+    Sample ``data`` (a data file in ``data_format``) by column: returns
+    ``{column: {value: count}}`` with up to ``STRUCTURED_VALUES_PER_COLUMN``
+    distinct values each and the number of sampled rows holding them, read
+    from rows spread across the file (JSON arrays: their first objects), or
+    None when the file is not laid out as rows or records, such as a JSON
+    configuration object.
+    """
+    if data_format == "json":
+        end = align_to_char(data, text_start + STRUCTURED_RANGE_BYTES * STRUCTURED_SAMPLE_RANGES, text_start, unit_size)
+        records = _json_array_records(decode_text(data, text_start, end, encoding))
+    elif data_format == "jsonl":
+        records = _jsonl_records(_sample_range_texts(data, encoding, text_start, unit_size))
+    else:
+        try:
+            records = _csv_records(
+                _sample_range_texts(data, encoding, text_start, unit_size), _DELIMITERS[data_format]
+            )
+        except csv.Error:
+            # E.g. a field over the csv module's size limit; not a plain table
+            return None
+    if records is None:
+        return None
+    samples = {}
+    for record in records:
+        values = []
+        _flatten(record, "", values)
+        for column, value in values:
+            value = value.strip()[:STRUCTURED_MAX_VALUE_CHARS]
+            if not value:
+                continue
+            column_values = samples.get(column)
+            if column_values is None:
+                if len(samples) >= STRUCTURED_MAX_COLUMNS:
+                    continue
+                column_values = samples[column] = {}
+            if value in column_values:
+                column_values[value] += 1
+            elif len(column_values) < STRUCTURED_VALUES_PER_COLUMN:
+                column_values[value] = 1
+    return samples
+
+
+# --- Column Text ---
+def column_sample_text(samples):
+    """
+    Join column samples into one text for a single analyzer call. Returns
+    ``(text, value_starts)``, the sorted ``(offset, column, count)`` triples
+    where each value's line begins, for ``sampled_value_at``.
+    """
+    lines = []
+    value_starts = []
+    offset = 0
+    for column, values in samples.items():
+        if lines:
+            # A blank line between columns
+            lines.append("")
+            offset += 1
+        for value, count in values.items():
+            # Values are single lines, so each stays next to its column name, which
+            # gives recognizers context (e.g. "phone")
+            line = f"{column}: {' '.join(value.split())}"
+            value_starts.append((offset, column, count))
+            lines.append(line)
+            offset += len(line) + 1
+    return "\n".join(lines), value_starts
+
+
+def sampled_value_at(value_starts, offset):
+    """
+    ``(column, count)`` of the sampled value at ``offset`` of a
+    ``column_sample_text`` text: its column and the sampled rows holding it.
+    """
+    index = bisect.bisect_right(value_starts, offset, key=lambda value_start: value_start[0]) - 1
+    _offset, column, count = value_starts[max(index, 0)]
+    return column, count
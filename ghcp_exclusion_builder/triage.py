@@ -0,0 +1,382 @@
+import os
+import math
+import time
+import random
+import contextlib
+from .exclusions import ExclusionMatcher
+from .file_reader import SNIFF_BYTES, align_to_char, map_file, sniff_text_encoding
+from .gitignore import GitignoreMatcher
+from .presidio_analyzer_setup import get_presidio_analyzer, SPACY_MODEL_NAME
+from .daemon import connect_analyzer_daemon
+from .scanner import NLP_BATCH_SIZE, _exclusion_patterns, _flagged_file_info, _ignore_progress, _iter_analyzed_files
+from .walker import walk_directory
+
+# --- Configuration ---
+# Default wall-clock budget of a triage run, including the walk
+TRIAGE_TIME_BUDGET_SECONDS = 300
+
+# Share of the time budget the directory walk may use; the rest is for sampling
+TRIAGE_WALK_SHARE = 0.5
+
+# Files sampled at most per directory (its own files, not its subdirectories)
+TRIAGE_SAMPLES_PER_DIRECTORY = 5
+
+# Bytes analyzed at most per sampled file, split over this many line ranges
+# of larger files (the first one at the start of the file)
+TRIAGE_SAMPLE_BYTES = 64_000
+TRIAGE_RANGES_PER_FILE = 4
+
+# z value of the reported intervals (95%)
+TRIAGE_CONFIDENCE_Z = 1.96
+
+# Provisional /dir/** rules are suggested where the interval's lower bound reaches this density
+TRIAGE_RULE_DENSITY = 0.5
+
+# Directories listed in the text report
+TRIAGE_REPORTED_DIRECTORIES = 20
+
+
+# --- Content Sampling ---
+def sampled_reader(sample_bytes=TRIAGE_SAMPLE_BYTES, ranges_per_file=TRIAGE_RANGES_PER_FILE, rng=None,
+                   read_data=map_file, stats=None):
+    """
+    A ``read_data`` for the scanner's file analysis that yields at most about
+    ``sample_bytes`` of each file: the whole file when it is small enough,
+    otherwise its start plus ranges at random offsets in evenly spaced
+    segments, cut to whole lines and joined with newlines. Bytes handed out
+    are added to ``stats['bytes']``.
+    """
+    rng = rng or random.Random()
+    ranges_per_file = max(1, ranges_per_file)
+
+    @contextlib.contextmanager
+    def read_sample(file_path_abs):
+        with read_data(file_path_abs) as data:
+            if len(data) <= sample_bytes:
+                sample = data
+            else:
+                sample = _sample_ranges(data, sample_bytes // ranges_per_file, ranges_per_file, rng)
+            if stats is not None:
+                stats['bytes'] = stats.get('bytes', 0) + len(sample)
+            yield sample
+
+    return read_sample
+
+
+def _sample_ranges(data, range_bytes, ranges_per_file, rng):
+    text_encoding = sniff_text_encoding(data[:SNIFF_BYTES])
+    if text_encoding is None:
+        # Binary; the analysis skips it on the sniffed head alone
+        return data[:SNIFF_BYTES]
+    encoding, text_start, unit_size = text_encoding
+    parts = [data[:align_to_char(data, range_bytes, text_start, unit_size)]]
+    segment_bytes = (len(data) - range_bytes) // max(1, ranges_per_file - 1)
+    for segment in range(ranges_per_file - 1):
+        segment_start = range_bytes + segment * segment_bytes
+        start = rng.randrange(segment_start, segment_start + max(1, segment_bytes - range_bytes))
+        end = min(len(data), start + range_bytes)
+        if unit_size == 1:
+            # Whole lines only, so no entity is cut in half at the edges
+            line_start = data.find(b"\n", start, end)
+            line_end = data.rfind(b"\n", start, end)
+            if line_start != -1 and line_end > line_start:
+                start, end = line_start + 1, line_end
+        parts.append(data[
+            align_to_char(data, start, text_start, unit_size):align_to_char(data, end, text_start, unit_size)
+        ])
+    return "\n".encode(encoding).join(parts)
+
+
+# --- Density Estimates ---
+def _parent_dirs(relative_dir_normalized):
+    """The directory and every directory above it, e.g. "a/b/", "a/", ""."""
+    parents = [relative_dir_normalized]
+    while relative_dir_normalized:
+        relative_dir_normalized = relative_dir_normalized[:relative_dir_normalized.rstrip('/').rfind('/') + 1]
+        parents.append(relative_dir_normalized)
+    return parents
+
+
+def estimate_directory_densities(strata, z=TRIAGE_CONFIDENCE_Z):
+    """
+    Estimate the share of files with PII below every directory.
+
+    ``strata`` maps each directory to the counts of its own files: ``files``,
+    ``bytes``, ``analyzed`` (sampled files analyzed) and ``flagged`` (of
+    those, files that would be flagged). The estimate for a directory is
+    stratified over the directories below it that have samples, weighted by
+    their file counts; its interval adds up the strata's variances with a
+    finite population correction, using add-z² (Agresti-Coull) shares so a
+    handful of all-clean or all-flagged samples does not give a zero-width
+    interval. ``coverage`` is the share of files in directories with samples.
+
+    Returns one dict per directory, ranked by ``estimated_flagged_files``.
+    """
+    nodes = {}
+    for directory, stratum in strata.items():
+        for parent in _parent_dirs(directory):
+            node = nodes.setdefault(parent, {
+                'files': 0, 'bytes': 0, 'sampled_files': 0, 'flagged_samples': 0, 'strata': []
+            })
+            node['files'] += stratum['files']
+            node['bytes'] += stratum['bytes']
+            node['sampled_files'] += stratum['analyzed']
+            node['flagged_samples'] += stratum['flagged']
+            if stratum['analyzed']:
+                node['strata'].append(stratum)
+
+    estimates = []
+    for directory, node in nodes.items():
+        covered_files = sum(stratum['files'] for stratum in node['strata'])
+        density = low = high = None
+        if covered_files:
+            density = 0.0
+            variance = 0.0
+            for stratum in node['strata']:
+                weight = stratum['files'] / covered_files
+                analyzed = stratum['analyzed']
+                density += weight * stratum['flagged'] / analyzed
+                adjusted = (stratum['flagged'] + z * z / 2) / (analyzed + z * z)
+                finite_population = max(0.0, 1 - analyzed / stratum['files'])
+                variance += weight * weight * adjusted * (1 - adjusted) / (analyzed + z * z) * finite_population
+            margin = z * math.sqrt(variance)
+            low, high = max(0.0, density - margin), min(1.0, density + margin)
+        estimates.append({
+            'directory': directory,
+            'files': node['files'],
+            'bytes': node['bytes'],
+            'sampled_files': node['sampled_files'],
+            'flagged_samples': node['flagged_samples'],
+            'coverage': covered_files / node['files'] if node['files'] else 0.0,
+            'density': density,
+            'low': low,
+            'high': high,
+            'estimated_flagged_files': density * node['files'] if density is not None else None,
+        })
+    estimates.sort(key=lambda estimate: (
+        -(estimate['estimated_flagged_files'] or 0), -(estimate['density'] or 0), estimate['directory']
+    ))
+    return estimates
+
+
+def provisional_rules(estimates, rule_density=TRIAGE_RULE_DENSITY):
+    """``/dir/**`` rule lines for the topmost directories whose density is at least ``rule_density``."""
+    chosen = []
+    for estimate in sorted(estimates, key=lambda estimate: estimate['directory']):
+        directory = estimate['directory']
+        if not directory or estimate['low'] is None or estimate['low'] < rule_density:
+            continue
+        if any(directory.startswith(parent) for parent in chosen):
+            continue
+        chosen.append(directory)
+    by_directory = {estimate['directory']: estimate for estimate in estimates}
+    rule_lines = []
+    for directory in chosen:
+        estimate = by_directory[directory]
+        rule_lines.extend([
+            f"# Ignore everything under `/{directory}` in this repository (estimated "
+            f"{estimate['density']:.0%} of {estimate['files']} files contain PII, "
+            f"{estimate['low']:.0%}-{estimate['high']:.0%}; {estimate['sampled_files']} sampled).",
+            f"- \"/{directory}**\"",
+        ])
+    return rule_lines
+
+
+# --- Triage Scan ---
+def triage_directory_for_pii(
+    directory_path: str,
+    selected_presets: list[str] | None,
+    custom_exclusions_str: str,
+    confidence_threshold: float = 60,
+    min_entities_threshold: int = 2,
+    selected_entity_types: list[str] = ["PERSON"],
+    time_budget_seconds: float = TRIAGE_TIME_BUDGET_SECONDS,
+    byte_budget: int | None = None,
+    samples_per_directory: int = TRIAGE_SAMPLES_PER_DIRECTORY,
+    sample_bytes: int = TRIAGE_SAMPLE_BYTES,
+    ranges_per_file: int = TRIAGE_RANGES_PER_FILE,
+    rule_density: float = TRIAGE_RULE_DENSITY,
+    use_prefilter: bool = True,
+    use_gitignore: bool = False,
+    spacy_model_name: str = SPACY_MODEL_NAME,
+    nlp_batch_size: int = NLP_BATCH_SIZE,
+    seed: int | None = None,
+    on_directory=None,
+    cancel_event=None,
+    use_daemon: bool = True,
+    progress=None
+):
+    """
+    Estimate where PII lives under ``directory_path`` from a sample, within
+    a fixed time (and optionally byte) budget, instead of analyzing every file.
+
+    The walk keeps a uniform random sample of up to ``samples_per_directory``
+    files per directory (reservoir sampling) and may use ``TRIAGE_WALK_SHARE``
+    of the time budget. The samples are then analyzed round by round, one
+    file per directory and round in random order, so every directory gets a
+    first sample before any gets a second; files larger than ``sample_bytes``
+    are analyzed from sampled line ranges only, and up to ``nlp_batch_size``
+    of them share one NLP pass. No file is read once the time or byte budget
+    is spent.
+
+    Returns a text report with the estimated PII density (and interval) of
+    the riskiest directories and provisional ``/dir/**`` rules for
+    directories whose density is at least ``rule_density``; a full scan then
+    only needs the rest. ``on_directory`` is called with every directory's
+    estimate (see ``estimate_directory_densities``), riskiest first. Large
+    files are only partly analyzed, so densities tend to be underestimated.
+    """
+    if progress is None:
+        progress = _ignore_progress
+    if not directory_path or not os.path.isdir(directory_path):
+        return (
+            "Error: Provided path is not a valid directory. "
+            "Please enter a valid directory path."
+        )
+    if not selected_entity_types:
+        return "Error: At least one PII entity type must be selected for scanning."
+    try:
+        analyzer = connect_analyzer_daemon(selected_entity_types, spacy_model_name) if use_daemon else None
+        analyzer = analyzer or get_presidio_analyzer(selected_entity_types, spacy_model_name)
+    except RuntimeError as e:
+        return f"Error initializing PII analyzer: {e}"
+
+    started = time.monotonic()
+    deadline = started + time_budget_seconds
+    if confidence_threshold > 1:
+        confidence_threshold = confidence_threshold / 100.0
+    min_entities_threshold = max(1, int(min_entities_threshold))
+    samples_per_directory = max(1, int(samples_per_directory))
+    rng = random.Random(seed)
+
+    normalized_directory_path = os.path.normpath(directory_path)
+    exclusion_matcher = ExclusionMatcher(_exclusion_patterns(selected_presets, custom_exclusions_str))
+    gitignore_matcher = GitignoreMatcher(normalized_directory_path) if use_gitignore else None
+
+    # Per directory: its own files' counts and reservoir of sampled files
+    strata = {}
+    walk_deadline = started + time_budget_seconds * TRIAGE_WALK_SHARE
+    walk_complete = True
+    cancelled = False
+    progress(0, None, "Listing files for triage...")
+    candidate_files = walk_directory(normalized_directory_path, exclusion_matcher, None, gitignore_matcher)
+    for walked_count, (relative_file_path_normalized, file_path_abs, file_size) in enumerate(candidate_files, 1):
+        directory = relative_file_path_normalized[:relative_file_path_normalized.rfind('/') + 1]
+        stratum = strata.get(directory)
+        if stratum is None:
+            stratum = strata[directory] = {'files': 0, 'bytes': 0, 'sample': [], 'analyzed': 0, 'flagged': 0}
+        stratum['files'] += 1
+        stratum['bytes'] += file_size or 0
+        if len(stratum['sample']) < samples_per_directory:
+            stratum['sample'].append((file_path_abs, file_size))
+        else:
+            slot = rng.randrange(stratum['files'])
+            if slot < samples_per_directory:
+                stratum['sample'][slot] = (file_path_abs, file_size)
+        if walked_count % 1000 == 0:
+            progress(walked_count, None, f"Listing files for triage... {walked_count} files")
+            if time.monotonic() > walk_deadline:
+                walk_complete = False
+                break
+            if cancel_event is not None and cancel_event.is_set():
+                cancelled = True
+                break
+    candidate_files.close()
+
+    analysis_options = {
+        'entity_types': selected_entity_types,
+        'confidence_threshold': confidence_threshold,
+        'min_entities_threshold': min_entities_threshold,
+        'max_analyzed_bytes': None,
+        'cache_config_key': None,
+        'use_prefilter': use_prefilter,
+        'nlp_batch_size': max(1, int(nlp_batch_size or 1)),
+        'spacy_model_name': spacy_model_name,
+        'profile': False,
+    }
+    read_stats = {'bytes': 0}
+    read_sample = sampled_reader(sample_bytes, ranges_per_file, rng, stats=read_stats)
+    sample_count = sum(len(stratum['sample']) for stratum in strata.values())
+    sampled_count = 0
+    budget_spent = False
+    directories = list(strata)
+
+    def round_samples(round_index):
+        # Checked as each file is about to be read, so a pending NLP batch never overspends
+        nonlocal budget_spent, cancelled
+        for directory in directories:
+            stratum = strata[directory]
+            if round_index >= len(stratum['sample']):
+                continue
+            if time.monotonic() > deadline or (byte_budget and read_stats['bytes'] >= byte_budget):
+                budget_spent = True
+                return
+            if cancel_event is not None and cancel_event.is_set():
+                cancelled = True
+                return
+            file_path_abs, file_size = stratum['sample'][round_index]
+            yield stratum, file_path_abs, file_size
+
+    for round_index in range(samples_per_directory):
+        if budget_spent or cancelled:
+            break
+        rng.shuffle(directories)
+        analyzed_files = _iter_analyzed_files(
+            analyzer, round_samples(round_index), analysis_options, read_data=read_sample
+        )
+        for stratum, file_result in analyzed_files:
+            sampled_count += 1
+            progress(sampled_count, sample_count, f"Sampling files: {sampled_count}/{sample_count}")
+            if file_result['error'] is not None:
+                continue
+            stratum['analyzed'] += 1
+            if _flagged_file_info(file_result['results'], confidence_threshold, min_entities_threshold):
+                stratum['flagged'] += 1
+
+    estimates = estimate_directory_densities(strata)
+    if on_directory is not None:
+        for estimate in estimates:
+            on_directory(estimate)
+
+    elapsed = time.monotonic() - started
+    file_count = sum(stratum['files'] for stratum in strata.values())
+    byte_count = sum(stratum['bytes'] for stratum in strata.values())
+    summary = (
+        f"# {'Triage cancelled' if cancelled else 'Triage complete'}: sampled {sampled_count} of {file_count} files "
+        f"({read_stats['bytes'] / 1e6:.1f} of {byte_count / 1e6:.1f} MB) in {len(strata)} directories "
+        f"in {elapsed:.1f}s\n"
+        f"# Settings: {min_entities_threshold}+ PII entities with confidence >= {confidence_threshold*100:.0f}%, "
+        f"up to {samples_per_directory} files per directory\n"
+        f"# PII types scanned: {', '.join(selected_entity_types)}\n"
+    )
+    if not walk_complete:
+        summary += "# Walk stopped at its share of the time budget: unlisted directories have no estimate\n"
+    if budget_spent:
+        summary += f"# Budget spent after {sampled_count} of {sample_count} sampled files\n"
+    if not estimates:
+        return summary + "\n# No files to sample after applying exclusions."
+
+    summary += (
+        f"# Estimated share of files with PII (interval at z = {TRIAGE_CONFIDENCE_Z:g}), "
+        f"riskiest {min(len(estimates), TRIAGE_REPORTED_DIRECTORIES)} directories:\n"
+    )
+    for estimate in estimates[:TRIAGE_REPORTED_DIRECTORIES]:
+        if estimate['density'] is None:
+            summary += f"#   /{estimate['directory']}: not sampled ({estimate['files']} files)\n"
+            continue
+        summary += (
+            f"#   /{estimate['directory']}: {estimate['density']:.0%} ({estimate['low']:.0%}-{estimate['high']:.0%}), "
+            f"~{estimate['estimated_flagged_files']:.0f} of {estimate['files']} files, "
+            f"{estimate['flagged_samples']} of {estimate['sampled_files']} samples flagged"
+        )
+        if estimate['coverage'] < 1:
+            summary += f", {estimate['coverage']:.0%} of files in sampled directories"
+        summary += "\n"
+
+    rule_lines = provisional_rules(estimates, rule_density)
+    if not rule_lines:
+        return summary + f"\n# No directory reaches an estimated PII density of {rule_density:.0%}."
+    return summary + (
+        f"\n# Provisional rules from sampling (density interval at or above {rule_density:.0%}); "
+        "confirm with a full scan:\n" + "\n".join(rule_lines)
+    )
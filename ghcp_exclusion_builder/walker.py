@@ -0,0 +1,71 @@
+import os
+from collections import deque
+
+
+# --- Directory Walking ---
+def walk_directory(root_path, exclusion_matcher, stats=None, gitignore_matcher=None):
+    """
+    Stream the files under ``root_path`` that survive the exclusion patterns.
+
+    Each directory is listed exactly once with ``os.scandir`` and excluded
+    directories are pruned before they are listed. Directories are visited
+    breadth-first and entries keep their listing order. Symlinked directories
+    are not followed.
+
+    Yields ``(relative_path_normalized, file_path_abs, file_size)`` tuples,
+    where ``file_size`` comes from the entry's stat data (None if it cannot
+    be stat'ed, e.g. a broken symlink). If a ``stats`` dict is given it is
+    updated in place with running counts and ``complete`` once the walk ends.
+
+    With a ``gitignore_matcher`` (a ``GitignoreMatcher`` for ``root_path``),
+    paths the repository's ignore files cover are skipped as well, and
+    ignored directories are never listed.
+    """
+    if stats is None:
+        stats = {}
+    stats.update({'directories': 0, 'files': 0, 'excluded': 0, 'gitignored': 0, 'complete': False})
+
+    pending_dirs = deque([("", root_path)])
+    while pending_dirs:
+        relative_dir_normalized, dir_path_abs = pending_dirs.popleft()
+        try:
+            with os.scandir(dir_path_abs) as dir_entries:
+                entries = list(dir_entries)
+        except OSError as e:
+            print(f"Error listing directory {dir_path_abs}: {e}")
+            continue
+        stats['directories'] += 1
+
+        file_entries = []
+        for entry in entries:
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+            except OSError:
+                is_dir = False
+            if is_dir:
+                dir_item_path_normalized = relative_dir_normalized + entry.name + '/'
+                if exclusion_matcher.is_excluded(dir_item_path_normalized):
+                    stats['excluded'] += 1
+                elif gitignore_matcher is not None and gitignore_matcher.is_ignored(dir_item_path_normalized):
+                    stats['gitignored'] += 1
+                else:
+                    pending_dirs.append((dir_item_path_normalized, entry.path))
+            elif not entry.is_symlink() or not os.path.isdir(entry.path):
+                file_entries.append(entry)
+
+        for entry in file_entries:
+            relative_file_path_normalized = relative_dir_normalized + entry.name
+            if exclusion_matcher.is_excluded(relative_file_path_normalized):
+                stats['excluded'] += 1
+                continue
+            if gitignore_matcher is not None and gitignore_matcher.is_ignored(relative_file_path_normalized):
+                stats['gitignored'] += 1
+                continue
+            try:
+                file_size = entry.stat().st_size
+            except OSError:
+                file_size = None
+            stats['files'] += 1
+            yield relative_file_path_normalized, entry.path, file_size
+
+    stats['complete'] = True
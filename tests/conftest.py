@@ -0,0 +1,43 @@
+import os
+import subprocess
+from unittest.mock import MagicMock
+
+
+# --- Shared Test Helpers ---
+def git(repo, *args):
+    """Run a git command in ``repo`` with a fixed committer and return its stdout."""
+    return subprocess.run(
+        ["git", "-C", str(repo), "-c", "user.name=test", "-c", "user.email=test@example.com", *args],
+        check=True, capture_output=True
+    ).stdout
+
+
+def write_file(repo, relative_path, content):
+    """Write ``content`` to ``relative_path`` under ``repo``, creating parent directories."""
+    full_path = os.path.join(repo, relative_path)
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+    with open(full_path, 'w') as f:
+        f.write(content)
+
+
+def fake_analyze(text, language, entities, nlp_artifacts=None):
+    """Return one PERSON hit per known name in the text."""
+    return [
+        MagicMock(entity_type="PERSON", score=0.9)
+        for name in ("Doe", "Smith", "Jane", "John")
+        if name in text
+    ]
+
+
+def fake_process_batch(texts, language, batch_size, n_process):
+    """Stand in for the NLP engine's batch pass: no artifacts, so analyze() is called per text."""
+    for text in texts:
+        yield text, None
+
+
+def fake_presidio_analyzer(analyze=fake_analyze):
+    """A mock AnalyzerEngine whose per-file and batched calls both go through ``analyze``."""
+    analyzer = MagicMock()
+    analyzer.analyze.side_effect = analyze
+    analyzer.nlp_engine.process_batch.side_effect = fake_process_batch
+    return analyzer
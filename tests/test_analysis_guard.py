@@ -0,0 +1,71 @@
+import os
+import time
+from collections import namedtuple
+import pytest
+from ghcp_exclusion_builder.analysis_guard import (
+    GUARD_MAX_LINE_CHARS, GUARD_MAX_RUN_CHARS, AnalysisAbandoned, AnalyzerHit, TimeBudgetAnalyzer, guard_text
+)
+
+Hit = namedtuple("Hit", ["entity_type", "start", "end", "score"])
+
+
+class SlowAnalyzer:
+    """Finds "@", and takes its time with texts that say "slow"."""
+
+    def analyze(self, text, language, entities, nlp_artifacts=None):
+        if "slow" in text:
+            time.sleep(30)
+        if "fail" in text:
+            raise ValueError("cannot analyze")
+        return [Hit("EMAIL_ADDRESS", i, i + 1, 1.0) for i, char in enumerate(text) if char == "@"]
+
+
+def test_guard_leaves_ordinary_text_alone():
+    text = "Dear Jane Smith,\n" + "lorem ipsum dolor " * 500
+    assert guard_text(text) == (text, False, False)
+
+
+def test_guard_splits_long_runs_and_blanks_unsplittable_ones():
+    csv_line = ",".join(f"user{i}@example.com" for i in range(200))
+    blob = "QUJD" * 1000
+    text = f"id {csv_line}\ndata {blob}\nend"
+
+    guarded, runs_split, lines_split = guard_text(text)
+    assert runs_split and not lines_split
+    assert len(guarded) == len(text)
+    assert "user7@example.com user8@example.com" in guarded
+    assert guarded.split("\n")[1].strip() == "data"
+    assert max(len(run) for run in guarded.split()) <= GUARD_MAX_RUN_CHARS
+
+
+def test_guard_breaks_long_lines_at_whitespace():
+    dump = " ".join(f"user{i}@example.com" for i in range(2000))
+    text = f"header\n{dump}\nfooter"
+
+    guarded, runs_split, lines_split = guard_text(text)
+    assert lines_split and not runs_split
+    assert guarded.replace("\n", " ") == text.replace("\n", " ")
+    assert max(len(line) for line in guarded.split("\n")) <= GUARD_MAX_LINE_CHARS
+    assert guarded.split("\n")[0] == "header" and guarded.split("\n")[-1] == "footer"
+
+
+@pytest.mark.skipif(not TimeBudgetAnalyzer.is_supported(), reason="Calls are abandoned by killing a forked child")
+def test_time_budget_analyzer_abandons_slow_calls():
+    analyzer = TimeBudgetAnalyzer(SlowAnalyzer())
+    assert analyzer.analyze("a@b", entities=["EMAIL_ADDRESS"], timeout=10) == [AnalyzerHit("EMAIL_ADDRESS", 1, 2, 1.0)]
+    first_child = analyzer._process.pid
+
+    started = time.monotonic()
+    with pytest.raises(AnalysisAbandoned, match="ran out of time"):
+        analyzer.analyze("slow", timeout=0.5)
+    assert time.monotonic() - started < 5
+    with pytest.raises(OSError):
+        os.kill(first_child, 0)
+
+    # The next call runs in a new child
+    assert analyzer.analyze_batch(["@", "x"], timeout=10) == [[AnalyzerHit("EMAIL_ADDRESS", 0, 1, 1.0)], []]
+    with pytest.raises(AnalysisAbandoned):
+        analyzer.analyze("@", timeout=0)
+    with pytest.raises(RuntimeError, match="ValueError: cannot analyze"):
+        analyzer.analyze("fail")
+    analyzer.close()
@@ -0,0 +1,68 @@
+import pytest
+from ghcp_exclusion_builder.cache import (
+    AnalysisCache, analyzer_config_key, content_cache_key
+)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    """Create an analysis cache in a temporary directory."""
+    analysis_cache = AnalysisCache(str(tmp_path))
+    yield analysis_cache
+    analysis_cache.close()
+
+
+def test_cache_round_trip(cache):
+    """Test that stored results come back as (entity_type, score) tuples."""
+    cache.put_many([("key1", [("PERSON", 0.85), ("EMAIL_ADDRESS", 1.0)])])
+    assert cache.get("key1") == [("PERSON", 0.85), ("EMAIL_ADDRESS", 1.0)]
+    assert cache.get("missing") is None
+
+    # Results of data files sampled by column also carry the column
+    cache.put_many([("key2", [("EMAIL_ADDRESS", 1.0, "user.email")])])
+    assert cache.get("key2") == [("EMAIL_ADDRESS", 1.0, "user.email")]
+
+
+def test_cache_persists_across_instances(tmp_path):
+    """Test that results survive reopening the cache directory."""
+    first = AnalysisCache(str(tmp_path))
+    first.put_many([("key1", [])])
+    first.close()
+
+    second = AnalysisCache(str(tmp_path))
+    assert second.get("key1") == []
+    second.close()
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    """Test that eviction drops the oldest rows first to fit the size bound."""
+    cache = AnalysisCache(str(tmp_path), max_size_bytes=100)
+    cache.put_many([("old", [("PERSON", 0.5)] * 3)])
+    cache.put_many([("new", [("PERSON", 0.5)] * 3)])
+    cache.touch_many(["new"])
+
+    assert cache.evict() >= 1
+    assert cache.get("old") is None
+    assert cache.get("new") is not None
+    cache.close()
+
+
+def test_cache_clear(cache):
+    """Test that clearing removes every stored row."""
+    cache.put_many([("key1", []), ("key2", [("PERSON", 0.9)])])
+    assert len(cache) == 2
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_cache_keys_depend_on_content_and_config():
+    """Test that keys change with the content and the analyzer configuration."""
+    config_person = analyzer_config_key("en_core_web_lg", ["PERSON"])
+    config_email = analyzer_config_key("en_core_web_lg", ["EMAIL_ADDRESS"])
+
+    assert analyzer_config_key("en_core_web_lg", ["PERSON", "URL"]) == \
+        analyzer_config_key("en_core_web_lg", ["URL", "PERSON"])
+    assert config_person != config_email
+    assert config_person != analyzer_config_key("en_core_web_sm", ["PERSON"])
+    assert content_cache_key(b"text", config_person) != content_cache_key(b"text", config_email)
+    assert content_cache_key(b"text", config_person) != content_cache_key(b"other", config_person)
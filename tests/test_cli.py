@@ -0,0 +1,131 @@
+import io
+import json
+import pytest
+from ghcp_exclusion_builder.cli import build_parser, main, run, EXIT_CLEAN, EXIT_PII_FOUND, EXIT_ERROR
+from .conftest import git
+
+
+@pytest.fixture
+def repo_dir(tmp_path):
+    """Files with e-mail addresses, detectable without a spaCy model."""
+    (tmp_path / "contacts.txt").write_text("Mail jane@example.com or john@example.org")
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "team.md").write_text("Owners: a@example.com, b@example.com, c@example.com")
+    (tmp_path / "src" / "main.py").write_text("print('hello')")
+    return tmp_path
+
+
+def _run_cli(*argv):
+    args = build_parser().parse_args([*argv, "--entity-types", "EMAIL_ADDRESS"])
+    stream = io.StringIO()
+    return run(args, stream), stream.getvalue()
+
+
+def test_jsonl_output(repo_dir):
+    """Test that every flagged file is one JSON line, followed by the summary."""
+    exit_code, output = _run_cli(str(repo_dir), "--format", "jsonl")
+    records = [json.loads(line) for line in output.splitlines()]
+
+    assert exit_code == EXIT_PII_FOUND
+    assert [r["type"] for r in records] == ["finding", "finding", "summary"]
+    findings = {r["path"]: r for r in records[:2]}
+    assert findings["/contacts.txt"]["pii_types"] == {"EMAIL_ADDRESS": 2}
+    assert findings["/src/team.md"]["pii_count"] == 3
+    assert "Found significant PII in 2 of 3 files" in records[-1]["report"]
+
+
+def test_sarif_output(repo_dir):
+    exit_code, output = _run_cli(str(repo_dir), "--format", "sarif")
+    log = json.loads(output)
+
+    assert exit_code == EXIT_PII_FOUND
+    assert log["version"] == "2.1.0"
+    results = log["runs"][0]["results"]
+    assert sorted(r["locations"][0]["physicalLocation"]["artifactLocation"]["uri"] for r in results) == [
+        "contacts.txt", "src/team.md"
+    ]
+    assert all(r["ruleId"] == "pii-detected" for r in results)
+
+
+def test_yaml_output(repo_dir):
+    exit_code, output = _run_cli(str(repo_dir), "--format", "yaml", "--min-entities", "3")
+
+    assert exit_code == EXIT_PII_FOUND
+    assert '- "/src/team.md"' in output
+    assert '- "/contacts.txt"' not in output
+    assert output.rstrip().splitlines()[-1].startswith("#")
+
+
+def test_exit_code_without_pii(repo_dir):
+    exit_code, output = _run_cli(str(repo_dir), "--exclude", "*.txt,*.md")
+    assert exit_code == EXIT_CLEAN
+    assert [json.loads(line)["type"] for line in output.splitlines()] == ["summary"]
+
+
+def test_exit_code_on_scan_error(tmp_path):
+    exit_code, output = _run_cli(str(tmp_path / "missing"), "--format", "sarif")
+    assert exit_code == EXIT_ERROR
+    assert output == ""
+
+
+def test_profile_in_jsonl_summary_and_trace_file(repo_dir, tmp_path):
+    trace_path = tmp_path / "trace.json"
+    exit_code, output = _run_cli(str(repo_dir), "--profile", "--slowest", "1", "--trace-file", str(trace_path))
+    summary = json.loads(output.splitlines()[-1])
+
+    assert exit_code == EXIT_PII_FOUND
+    assert summary["profile"]["files"] == 3
+    assert len(summary["profile"]["slowest_files"]) == 1
+    assert "# Timing: " in summary["report"]
+    assert json.loads(trace_path.read_text())["traceEvents"][-1]["name"] == "scan"
+
+
+def test_repo_list_sweep(repo_dir, tmp_path, capsys):
+    (tmp_path / "repos.txt").write_text(f"{repo_dir}\n# skipped\n{tmp_path / 'missing'}\n")
+    exit_code = main([
+        "--repo-list", str(tmp_path / "repos.txt"), "--entity-types", "EMAIL_ADDRESS",
+        "--job-workers", "2", "--cache-dir", str(tmp_path / "cache"),
+    ])
+    records = {r["repository"]: r for r in map(json.loads, capsys.readouterr().out.splitlines())}
+
+    assert exit_code == EXIT_ERROR
+    assert records[str(repo_dir)]["status"] == "done"
+    assert records[str(repo_dir)]["flagged_files"] == 2
+    assert records[str(tmp_path / "missing")]["status"] == "failed"
+
+
+def test_git_refs_yaml_output(repo_dir):
+    git(repo_dir, "init", "-q", "-b", "main")
+    git(repo_dir, "add", "-A")
+    git(repo_dir, "commit", "-q", "-m", "x")
+    (repo_dir / "uncommitted.txt").write_text("x@example.com y@example.com")
+
+    exit_code, output = _run_cli(str(repo_dir), "--git-refs", "main", "--format", "yaml")
+    assert exit_code == EXIT_PII_FOUND
+    assert output.startswith("# --- Ref: main ---\n")
+    assert '- "/src/team.md"' in output
+    assert "uncommitted.txt" not in output
+
+
+@pytest.mark.parametrize("option", [
+    ["--workers", "2"], ["--incremental"], ["--profile"], ["--trace-file", "t.json"],
+    ["--clear-cache"], ["--changed-since", "HEAD~1"], ["--state-path", "state.json"],
+])
+def test_git_refs_rejects_working_tree_options(repo_dir, option):
+    with pytest.raises(SystemExit):
+        main([str(repo_dir), "--git-refs", "main", *option])
+
+
+def test_minimized_yaml_output(repo_dir):
+    (repo_dir / "src" / "owners.md").write_text("Leads: d@example.com, e@example.com")
+
+    exit_code, output = _run_cli(str(repo_dir), "--format", "yaml", "--minimize", "--minimize-ratio", "0.6")
+    assert exit_code == EXIT_PII_FOUND
+    assert "# Ignore everything under `/src/` in this repository (2 of 3 files flagged" in output
+    assert '- "/src/**"' in output and '- "/contacts.txt"' in output
+    assert '- "/src/team.md"' not in output
+    assert "# Minimized rules: 3 per-file rules -> 2 rules (1 saved" in output
+    assert output.rstrip().splitlines()[-1].startswith("#")
+
+    with pytest.raises(SystemExit):
+        main([str(repo_dir), "--minimize"])
@@ -0,0 +1,165 @@
+import os
+import json
+import tempfile
+import threading
+import pytest
+from unittest.mock import MagicMock, patch
+from ghcp_exclusion_builder import cli
+from ghcp_exclusion_builder.analysis_guard import AnalysisAbandoned
+from ghcp_exclusion_builder.daemon import (
+    AnalyzerDaemon, RemoteAnalyzer, connect_analyzer_daemon, daemon_request, daemon_scan
+)
+from ghcp_exclusion_builder.scanner import scan_directory_for_pii
+
+
+@pytest.fixture
+def socket_path():
+    # Unix socket paths are limited to about 100 characters, too few for pytest's tmp_path
+    with tempfile.TemporaryDirectory(prefix="ghcp-daemon-") as socket_dir:
+        yield os.path.join(socket_dir, "analyzer.sock")
+
+
+@pytest.fixture
+def daemon(socket_path):
+    analyzer_daemon = AnalyzerDaemon(socket_path, queue_size=1)
+    analyzer_daemon.start()
+    yield analyzer_daemon
+    analyzer_daemon.shutdown()
+
+
+@pytest.fixture
+def repository(tmp_path):
+    (tmp_path / "contacts.txt").write_text("Write to alice@example.com or bob@example.org.\n")
+    (tmp_path / "readme.md").write_text("Nothing to see here.\n")
+    return str(tmp_path)
+
+
+def test_health_and_stats(daemon, socket_path):
+    assert daemon_request({"op": "health"}, socket_path)["status"] == "ok"
+    assert oct(os.stat(socket_path).st_mode & 0o777) == oct(0o600)
+
+    stats = daemon_request({"op": "stats"}, socket_path)
+    assert stats["pid"] == os.getpid()
+    assert stats["queue_size"] == 1 and stats["queued"] == 0
+    assert stats["requests"] == {"health": 1, "stats": 1}
+
+    with pytest.raises(RuntimeError, match="already listening"):
+        AnalyzerDaemon(socket_path).start()
+
+
+def test_no_daemon(socket_path):
+    assert connect_analyzer_daemon(["EMAIL_ADDRESS"], socket_path=socket_path) is None
+    assert daemon_request({"op": "health"}, socket_path) is None
+    assert daemon_scan("/tmp", {}, socket_path=socket_path).startswith("Error: No analyzer daemon")
+
+
+def test_scanner_analyzes_through_daemon(daemon, socket_path, repository):
+    def remote_analyzer(entity_types, model_name):
+        return connect_analyzer_daemon(entity_types, model_name, socket_path=socket_path)
+
+    for nlp_batch_size in (1, 8):
+        with patch("ghcp_exclusion_builder.scanner.connect_analyzer_daemon", side_effect=remote_analyzer), \
+                patch("ghcp_exclusion_builder.scanner.get_presidio_analyzer") as local_analyzer:
+            findings = []
+            summary = scan_directory_for_pii(
+                repository, [], "", selected_entity_types=["EMAIL_ADDRESS"],
+                nlp_batch_size=nlp_batch_size, on_finding=findings.append
+            )
+        local_analyzer.assert_not_called()
+        assert "Error" not in summary
+        assert [(finding["path"], finding["pii_count"]) for finding in findings] == [("contacts.txt", 2)]
+
+    stats = daemon_request({"op": "stats"}, socket_path)
+    # readme.md is prefiltered in the client
+    assert stats["requests"]["texts_analyzed"] == 2
+    assert stats["engines"] == ["blank"]
+
+
+def test_remote_analyzer_falls_back_in_process(daemon, socket_path):
+    remote = connect_analyzer_daemon(["EMAIL_ADDRESS"], "en_core_web_lg", socket_path=socket_path)
+    assert isinstance(remote, RemoteAnalyzer)
+    results = remote.analyze("mail carol@example.com", entities=["EMAIL_ADDRESS"])
+    assert [(r.entity_type, r.start, r.end) for r in results] == [("EMAIL_ADDRESS", 5, 22)]
+
+    daemon.shutdown()
+    local_analyzer = MagicMock()
+    local_analyzer.analyze.return_value = []
+    with patch("ghcp_exclusion_builder.daemon.get_presidio_analyzer", return_value=local_analyzer) as get_local:
+        assert remote.analyze("mail carol@example.com") == []
+        assert remote.analyze("again") == []
+    get_local.assert_called_once_with(["EMAIL_ADDRESS"], "en_core_web_lg")
+
+
+def test_daemon_enforces_time_budget(daemon, socket_path):
+    slow_analyzer = MagicMock()
+    slow_analyzer.analyze.side_effect = lambda text, language, entities, nlp_artifacts=None: threading.Event().wait(30) or []
+    with patch("ghcp_exclusion_builder.daemon.get_presidio_analyzer", return_value=slow_analyzer):
+        remote = connect_analyzer_daemon(["PERSON"], socket_path=socket_path)
+        with pytest.raises(AnalysisAbandoned, match="ran out of time"):
+            remote.analyze("Jane", entities=["PERSON"], timeout=0.3)
+    assert daemon_request({"op": "stats"}, socket_path)["requests"]["abandoned"] == 1
+
+
+def test_daemon_time_budget_child_follows_replaced_recognizers(daemon, socket_path):
+    def hits(term):
+        return lambda text, language, entities, nlp_artifacts=None: [
+            MagicMock(entity_type="STAFF_NAME", start=text.index(term), end=text.index(term) + len(term), score=0.85)
+        ] if term in text else []
+
+    engine = MagicMock()
+    engine.analyze.side_effect = hits("Ada")
+    with patch("ghcp_exclusion_builder.daemon.get_presidio_analyzer", return_value=engine):
+        remote = connect_analyzer_daemon(["STAFF_NAME"], socket_path=socket_path)
+        assert len(remote.analyze("Ada and Grace", entities=["STAFF_NAME"], timeout=10)) == 1
+        # As after a deny list changed: the running child still has the old recognizers
+        engine.analyze.side_effect = hits("Grace")
+        assert remote.analyze("Grace", entities=["STAFF_NAME"], timeout=10) == []
+        engine.registry.recognizers = []
+        assert len(remote.analyze("Grace", entities=["STAFF_NAME"], timeout=10)) == 1
+
+
+def test_bounded_queue_rejects_requests(daemon, socket_path):
+    release = threading.Event()
+    started = threading.Event()
+
+    def slow_analyze(analyzer, texts, entities, batch_size=1):
+        started.set()
+        release.wait(10)
+        return [[] for _ in texts]
+
+    def analyze_request(replies):
+        replies.append(daemon_request({"op": "analyze", "texts": ["x"], "entities": ["EMAIL_ADDRESS"]}, socket_path))
+
+    replies = []
+    with patch("ghcp_exclusion_builder.daemon.analyze_texts", side_effect=slow_analyze):
+        running = threading.Thread(target=analyze_request, args=(replies,))
+        running.start()
+        assert started.wait(10)
+        waiting = threading.Thread(target=analyze_request, args=(replies,))
+        waiting.start()
+        while daemon_request({"op": "stats"}, socket_path)["queued"] < 1:
+            pass
+        # The worker is busy and the one queue slot is taken
+        assert daemon_request({"op": "analyze", "texts": ["x"]}, socket_path) is None
+        release.set()
+        running.join(10)
+        waiting.join(10)
+    assert replies == [{"type": "result", "results": [[]]}] * 2
+    assert daemon_request({"op": "stats"}, socket_path)["requests"]["rejected"] == 1
+
+
+def test_thin_client_scan(daemon, socket_path, repository, capsys):
+    findings = []
+    summary = daemon_scan(
+        repository, {"selected_entity_types": ["EMAIL_ADDRESS"], "use_cache": False},
+        on_finding=findings.append, socket_path=socket_path
+    )
+    assert "Scan complete" in summary
+    assert [finding["path"] for finding in findings] == ["contacts.txt"]
+    assert daemon_scan(repository, {"no_such_setting": 1}, socket_path=socket_path).startswith("Error")
+
+    with patch("ghcp_exclusion_builder.daemon.DAEMON_SOCKET_PATH", socket_path):
+        exit_code = cli.main([repository, "--thin-client", "--entity-types", "EMAIL_ADDRESS"])
+    assert exit_code == cli.EXIT_PII_FOUND
+    records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [record["type"] for record in records] == ["finding", "summary"]
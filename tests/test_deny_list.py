@@ -0,0 +1,99 @@
+import os
+import re
+import random
+import pytest
+from unittest.mock import patch
+from ghcp_exclusion_builder import presidio_analyzer_setup
+from ghcp_exclusion_builder.cache import analyzer_config_key
+from ghcp_exclusion_builder.deny_list import (
+    DenyListMatcher, deny_list_entity_types, deny_list_specs, load_deny_list_matcher
+)
+
+
+@pytest.fixture
+def deny_list_dir(tmp_path):
+    """Deny lists for staff names (default options) and case-sensitive employee IDs."""
+    (tmp_path / "STAFF_NAME.txt").write_text("# Staff directory\nAda Lovelace\nGrace Hopper\n\nAlan Turing\n")
+    (tmp_path / "EMPLOYEE_ID.txt").write_text("EMP-0042\nEMP-1337\n")
+    (tmp_path / "notes.txt").write_text("not an entity type\n")
+    (tmp_path / "deny_lists.json").write_text('{"EMPLOYEE_ID": {"ignore_case": false, "score": 0.95}}')
+    return str(tmp_path)
+
+
+def test_matcher_finds_overlapping_terms():
+    matcher = DenyListMatcher(["he", "she", "his", "hers"], ignore_case=False, word_boundaries=False)
+    assert sorted(matcher.find("ushers")) == [(1, 4), (2, 4), (2, 6)]
+
+
+def test_matcher_folds_case_and_checks_word_boundaries():
+    matcher = DenyListMatcher(["Ada Lovelace", "ACME-7"])
+    text = "ada lovelace, Ada Lovelaces, xAda Lovelace, id ACME-7."
+    assert [text[start:end] for start, end in matcher.find(text)] == ["ada lovelace", "ACME-7"]
+    assert DenyListMatcher(["Ada"], ignore_case=False).find("ada Ada") == [(4, 7)]
+    # Lower-casing "İ" takes two characters; offsets still point into the original text
+    assert DenyListMatcher(["bob"]).find("İ Bob") == [(2, 5)]
+
+
+def test_matcher_agrees_with_regex_alternation():
+    rng = random.Random(5)
+    terms = {"".join(rng.choice("abc ") for _ in range(rng.randint(1, 5))).strip() or "a" for _ in range(200)}
+    text = "".join(rng.choice("abc .") for _ in range(2000))
+    matcher = DenyListMatcher(terms, ignore_case=False, word_boundaries=False)
+    expected = sorted(
+        (match.start(), match.start() + len(term))
+        for term in terms for match in re.finditer(f"(?={re.escape(term)})", text)
+    )
+    assert sorted(matcher.find(text)) == expected
+
+
+def test_deny_list_specs(deny_list_dir):
+    specs = deny_list_specs(deny_list_dir)
+    assert list(specs) == ["EMPLOYEE_ID", "STAFF_NAME"]
+    assert specs["EMPLOYEE_ID"]["ignore_case"] is False and specs["EMPLOYEE_ID"]["score"] == 0.95
+    assert specs["STAFF_NAME"]["ignore_case"] is True and specs["STAFF_NAME"]["word_boundaries"] is True
+    assert deny_list_entity_types(str(os.path.join(deny_list_dir, "missing"))) == []
+
+
+def test_automaton_is_cached_on_disk(deny_list_dir, tmp_path):
+    spec = deny_list_specs(deny_list_dir)["STAFF_NAME"]
+    cache_dir = str(tmp_path / "cache")
+    built = load_deny_list_matcher("STAFF_NAME", spec, cache_dir)
+    assert built.term_count == 3
+
+    with patch("ghcp_exclusion_builder.deny_list._read_terms") as read_terms:
+        loaded = load_deny_list_matcher("STAFF_NAME", spec, cache_dir)
+    read_terms.assert_not_called()
+    assert loaded.find("Grace Hopper") == [(0, 12)]
+
+    with open(spec["path"], "a") as f_terms:
+        f_terms.write("Katherine Johnson\n")
+    rebuilt = load_deny_list_matcher("STAFF_NAME", spec, cache_dir)
+    assert rebuilt.term_count == 4
+    assert len(os.listdir(os.path.join(cache_dir, "deny_lists"))) == 1
+
+
+def test_deny_list_types_in_presidio_engine(deny_list_dir, tmp_path):
+    with patch("ghcp_exclusion_builder.deny_list.DENY_LIST_DIR", deny_list_dir), \
+            patch("ghcp_exclusion_builder.deny_list.DEFAULT_CACHE_DIR", str(tmp_path / "cache")), \
+            patch.dict(presidio_analyzer_setup._analyzer_engines, clear=True), \
+            patch.dict(presidio_analyzer_setup._engine_deny_lists, clear=True):
+        analyzer = presidio_analyzer_setup.get_presidio_analyzer(["STAFF_NAME", "EMPLOYEE_ID"])
+        results = analyzer.analyze(
+            text="Grace Hopper (EMP-1337, not emp-0042) reviewed it.",
+            language="en", entities=["STAFF_NAME", "EMPLOYEE_ID"]
+        )
+        assert sorted((r.entity_type, r.start, r.end, r.score) for r in results) == [
+            ("EMPLOYEE_ID", 14, 22, 0.95), ("STAFF_NAME", 0, 12, 0.85)
+        ]
+
+        key = analyzer_config_key("blank", ["STAFF_NAME"])
+        with open(os.path.join(deny_list_dir, "STAFF_NAME.txt"), "a") as f_terms:
+            f_terms.write("Katherine Johnson\n")
+        assert analyzer_config_key("blank", ["STAFF_NAME"]) != key
+
+        # The cached engine is kept, with its deny list recognizers rebuilt from the changed list
+        assert presidio_analyzer_setup.get_presidio_analyzer(["STAFF_NAME"]) is analyzer
+        results = analyzer.analyze(text="Ask Katherine Johnson.", language="en", entities=["STAFF_NAME"])
+        assert [(r.entity_type, r.start, r.end) for r in results] == [("STAFF_NAME", 4, 21)]
+        assert sum(recognizer.name == "DenyList_STAFF_NAME" for recognizer in analyzer.registry.recognizers) == 1
+        assert analyzer_config_key("blank", ["EMAIL_ADDRESS"]) == analyzer_config_key("blank", ["EMAIL_ADDRESS"])
@@ -1,5 +1,9 @@
+import os
+import random
 import pytest
-from ghcp_exclusion_builder.exclusions import is_excluded
+from ghcp_exclusion_builder.exclusions import (
+    COMMON_NON_TEXT_EXCLUSIONS, EXCLUSION_PRESETS, ExclusionMatcher, is_excluded
+)
 
 # Test cases for is_excluded function
 # Each tuple: (item_path, patterns, expected_result, description)
@@ -48,6 +52,12 @@ EXCLUSION_TEST_CASES = [
      "Exact absolute path match"),
     ("settings.ini", ["/config/settings.ini"], False,
      "Root file not matching absolute path"),
+    ("data/x/a.csv", ["/data/**/*.csv"], True,
+     "Absolute glob matches a nested file"),
+    ("other/data/x/a.csv", ["/data/**/*.csv"], False,
+     "Absolute glob is anchored at the root"),
+    ("data/x/A.CSV", ["/data/**/*.csv"], os.path.normcase("A.CSV") == "a.csv",
+     "Absolute glob compares extensions like fnmatch"),
 
     # Mixed and multiple patterns
     ("node_modules/lib/file.js", ["/node_modules/**", "*.log"], True,
@@ -92,3 +102,46 @@ EXCLUSION_TEST_CASES = [
 )
 def test_is_excluded(item_path, patterns, expected, description):
     assert is_excluded(item_path, patterns) == expected, description
+
+
+# --- ExclusionMatcher equivalence ---
+MATCHER_PATTERN_SETS = [
+    COMMON_NON_TEXT_EXCLUSIONS,
+    COMMON_NON_TEXT_EXCLUSIONS + [p for preset in EXCLUSION_PRESETS.values() for p in preset],
+    sorted({p for _, patterns, _, _ in EXCLUSION_TEST_CASES for p in patterns}),
+    ["*b", "/**", "a/**", "/a/b/**", "[ab].txt", "*.t?t", "b/*", "  /c/  ", "*.DCM*", "d[0-9]/**"],
+    ["/a/**/*.txt", "/b*", "/c/?/*.PNG", "/d1/**"],
+]
+
+PATH_COMPONENTS = [
+    "a", "b", "c", "d1", "foo", "bar", "src", "build", "node_modules", ".git", "__pycache__",
+    "target", "config", "docs", "LICENSE", "README.md", "bar.txt", "x.pyc", "image.PNG", "image.png",
+    "app.log", "settings.ini", "file.tmp", "yarn.lock", "b.txt", "tat.tzt", "scan.DCM01", "pkg.egg-info",
+]
+
+
+def _generated_paths(count=3000, seed=1234):
+    rng = random.Random(seed)
+    paths = [entry[0] for entry in EXCLUSION_TEST_CASES]
+    for _ in range(count):
+        depth = rng.randint(1, 5)
+        path = "/".join(rng.choice(PATH_COMPONENTS) for _ in range(depth))
+        if rng.random() < 0.3:
+            path += "/"
+        paths.append(path)
+    return paths
+
+
+@pytest.mark.parametrize("patterns", MATCHER_PATTERN_SETS)
+def test_exclusion_matcher_matches_is_excluded(patterns):
+    matcher = ExclusionMatcher(patterns)
+    for path in _generated_paths():
+        assert matcher.is_excluded(path) == is_excluded(path, patterns), (path, patterns)
+
+
+@pytest.mark.parametrize(
+    "item_path, patterns, expected, description",
+    EXCLUSION_TEST_CASES
+)
+def test_exclusion_matcher_cases(item_path, patterns, expected, description):
+    assert ExclusionMatcher(patterns).is_excluded(item_path) == expected, description
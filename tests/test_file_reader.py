@@ -0,0 +1,43 @@
+import codecs
+import pytest
+from ghcp_exclusion_builder.file_reader import align_to_char, decode_text, map_file, sniff_text_encoding
+
+
+@pytest.mark.parametrize("head, expected", [
+    (b"plain ascii text\n", ("utf-8", 0, 1)),
+    ("Grüße, Zoë".encode("utf-8"), ("utf-8", 0, 1)),
+    (codecs.BOM_UTF8 + b"with bom", ("utf-8", 3, 1)),
+    (codecs.BOM_UTF16_LE + "hi".encode("utf-16-le"), ("utf-16-le", 2, 2)),
+    (codecs.BOM_UTF16_BE + "hi".encode("utf-16-be"), ("utf-16-be", 2, 2)),
+    (codecs.BOM_UTF32_LE + "hi".encode("utf-32-le"), ("utf-32-le", 4, 4)),
+    (b"PAR1\x15\x04\x15\x00\x15", None),
+    (b"\x89PNG\r\n\x1a\n", ("utf-8", 0, 1)),
+    (bytes(range(1, 32)) * 4, None),
+    (b"", ("utf-8", 0, 1)),
+])
+def test_sniff_text_encoding(head, expected):
+    assert sniff_text_encoding(head) == expected
+
+
+def test_align_to_char_keeps_characters_whole():
+    data = "aé€😀b\r\nc".encode("utf-8")
+    for position in range(len(data) + 1):
+        aligned = align_to_char(data, position, 0, 1)
+        assert aligned <= position
+        assert decode_text(data, 0, aligned, "utf-8") + decode_text(data, aligned, len(data), "utf-8") == "aé€😀b\nc"
+
+
+def test_align_to_char_code_units():
+    data = codecs.BOM_UTF16_LE + "abc".encode("utf-16-le")
+    assert align_to_char(data, 5, 2, 2) == 4
+    assert decode_text(data, 2, 6, "utf-16-le") == "ab"
+
+
+def test_map_file(tmp_path):
+    (tmp_path / "empty.txt").write_bytes(b"")
+    (tmp_path / "data.txt").write_bytes(b"line one\r\nline two")
+    with map_file(str(tmp_path / "empty.txt")) as data:
+        assert data == b""
+    with map_file(str(tmp_path / "data.txt")) as data:
+        assert len(data) == 18
+        assert decode_text(data, 0, len(data), "utf-8") == "line one\nline two"
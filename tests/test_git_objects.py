@@ -0,0 +1,141 @@
+import os
+import subprocess
+import pytest
+from unittest.mock import patch
+from ghcp_exclusion_builder.git_objects import GitBlobReader, list_tree_blobs, resolve_commit
+from ghcp_exclusion_builder.scanner import scan_git_refs_for_pii
+from .conftest import fake_presidio_analyzer, git, write_file
+
+
+@pytest.fixture
+def bare_repo(tmp_path):
+    """A bare mirror with a main branch and a feature branch that copies and changes files."""
+    repo = str(tmp_path / "work")
+    os.makedirs(repo)
+    git(repo, "init", "-q", "-b", "main")
+    write_file(repo, 'people.txt', 'John Doe and Jane Smith')
+    write_file(repo, 'notes.txt', 'Nothing to see here.')
+    write_file(repo, 'node_modules/lib.js', 'John Doe and Jane Smith')
+    os.symlink('people.txt', os.path.join(repo, 'link.txt'))
+    git(repo, "add", "-A")
+    git(repo, "commit", "-q", "-m", "initial")
+    git(repo, "checkout", "-q", "-b", "feature")
+    write_file(repo, 'copy_of_people.txt', 'John Doe and Jane Smith')
+    write_file(repo, 'notes.txt', 'Jane Smith and John Doe took notes.')
+    git(repo, "add", "-A")
+    git(repo, "commit", "-q", "-m", "feature")
+    bare = str(tmp_path / "mirror.git")
+    subprocess.run(["git", "clone", "-q", "--mirror", repo, bare], check=True)
+    return bare
+
+
+def test_list_tree_blobs_skips_symlinks(bare_repo):
+    entries = {path: (blob_sha, size) for path, blob_sha, size in list_tree_blobs(bare_repo, "main")}
+    assert sorted(entries) == ['node_modules/lib.js', 'notes.txt', 'people.txt']
+    assert entries['people.txt'][1] == len('John Doe and Jane Smith')
+    assert entries['people.txt'][0] == entries['node_modules/lib.js'][0]
+
+
+def test_blob_reader(bare_repo):
+    blobs = {path: blob_sha for path, blob_sha, _size in list_tree_blobs(bare_repo, "feature")}
+    with GitBlobReader(bare_repo) as blob_reader:
+        assert blob_reader.read(blobs['notes.txt']) == b'Jane Smith and John Doe took notes.'
+        with blob_reader.open(blobs['people.txt']) as data:
+            assert data == b'John Doe and Jane Smith'
+        with pytest.raises(RuntimeError, match="could not read object"):
+            blob_reader.read("0" * 40)
+        # The reader keeps working after a missing object
+        assert blob_reader.read(blobs['notes.txt']).startswith(b'Jane')
+
+
+def test_resolve_commit_rejects_unknown_ref(bare_repo):
+    assert len(resolve_commit(bare_repo, "main")) == 40
+    with pytest.raises(RuntimeError):
+        resolve_commit(bare_repo, "no-such-branch")
+
+
+def test_scan_git_refs_analyzes_each_blob_once(bare_repo):
+    """Test that identical blobs are analyzed once across paths and refs, with one list per ref."""
+    findings = []
+    with patch('ghcp_exclusion_builder.scanner.get_presidio_analyzer') as mock_get_analyzer:
+        mock_get_analyzer.return_value = fake_presidio_analyzer()
+        result = scan_git_refs_for_pii(
+            bare_repo, ["main", "feature"], ["Node.js"], "", on_finding=findings.append
+        )
+        analyzed_texts = [call[1]['text'] for call in mock_get_analyzer.return_value.analyze.call_args_list]
+
+    # people.txt, notes.txt on main and the changed notes.txt on feature; the copy reuses people.txt's result
+    assert sorted(analyzed_texts) == sorted([
+        'John Doe and Jane Smith', 'Nothing to see here.', 'Jane Smith and John Doe took notes.'
+    ])
+    assert [(f['ref'], f['path']) for f in findings] == [
+        ("main", "people.txt"),
+        ("feature", "copy_of_people.txt"), ("feature", "notes.txt"), ("feature", "people.txt"),
+    ]
+    main_section, feature_section = result.split("# --- Ref: ")[1:]
+    assert main_section.startswith("main (") and '- "/people.txt"' in main_section
+    assert '- "/notes.txt"' not in main_section
+    assert '- "/notes.txt"' in feature_section and '- "/copy_of_people.txt"' in feature_section
+    assert "node_modules" not in result
+    assert "3 unique blobs analyzed for 5 files" in result
+
+
+def test_scan_git_refs_errors(bare_repo, tmp_path):
+    assert scan_git_refs_for_pii(bare_repo, [], None, "").startswith("Error")
+    assert scan_git_refs_for_pii(bare_repo, ["missing"], None, "").startswith("Error resolving git refs")
+    assert scan_git_refs_for_pii(str(tmp_path / "nowhere"), ["main"], None, "").startswith("Error")
+
+
+def test_missing_git_is_reported_without_naming_a_scan_mode(bare_repo, tmp_path):
+    with patch.dict(os.environ, {"PATH": str(tmp_path)}):
+        with pytest.raises(RuntimeError, match="^git executable not found; this scan needs git on PATH"):
+            resolve_commit(bare_repo, "main")
+        with pytest.raises(RuntimeError, match="^git executable not found"):
+            GitBlobReader(bare_repo)
+
+
+def test_scan_git_refs_extracts_source_text_by_path(tmp_path):
+    """Test that blobs are read under their tree path, which decides their source language."""
+    repo = str(tmp_path / "work")
+    os.makedirs(repo)
+    git(repo, "init", "-q", "-b", "main")
+    write_file(repo, 'src/models.py', 'class JohnDoe:\n    """Owned by Jane Smith."""\n')
+    git(repo, "add", "-A")
+    git(repo, "commit", "-q", "-m", "initial")
+    with patch('ghcp_exclusion_builder.scanner.get_presidio_analyzer') as mock_get_analyzer:
+        mock_get_analyzer.return_value = fake_presidio_analyzer()
+        result = scan_git_refs_for_pii(repo, ["main"], None, "", min_entities_threshold=1)
+        analyzed_texts = [call[1]['text'] for call in mock_get_analyzer.return_value.analyze.call_args_list]
+
+    assert analyzed_texts == ['"""Owned by Jane Smith."""']
+    assert '- "/src/models.py"' in result
+
+
+def test_scan_git_refs_reanalyzes_a_blob_read_another_way(tmp_path):
+    """Test that a blob seen as source code is still analyzed as full text under a text path."""
+    repo = str(tmp_path / "work")
+    os.makedirs(repo)
+    git(repo, "init", "-q", "-b", "main")
+    write_file(repo, 'a.py', 'owner = JohnDoe\n')
+    write_file(repo, 'b.txt', 'owner = JohnDoe\n')
+    git(repo, "add", "-A")
+    git(repo, "commit", "-q", "-m", "initial")
+    with patch('ghcp_exclusion_builder.scanner.get_presidio_analyzer') as mock_get_analyzer:
+        mock_get_analyzer.return_value = fake_presidio_analyzer()
+        result = scan_git_refs_for_pii(repo, ["main"], None, "", min_entities_threshold=1)
+
+    assert '- "/b.txt"' in result
+    assert '- "/a.py"' not in result
+
+
+def test_scan_git_refs_goes_on_without_an_unusable_cache(bare_repo, tmp_path):
+    blocked_dir = tmp_path / "not_a_directory"
+    blocked_dir.write_text("")
+    with patch('ghcp_exclusion_builder.scanner.get_presidio_analyzer') as mock_get_analyzer:
+        mock_get_analyzer.return_value = fake_presidio_analyzer()
+        result = scan_git_refs_for_pii(
+            bare_repo, ["main"], None, "", use_cache=True, cache_dir=str(blocked_dir / "cache")
+        )
+
+    assert "# Warning: analysis cache unavailable, scanned without it" in result
+    assert '- "/people.txt"' in result
@@ -0,0 +1,87 @@
+import os
+import subprocess
+import pytest
+from ghcp_exclusion_builder.exclusions import ExclusionMatcher
+from ghcp_exclusion_builder.gitignore import GitignoreMatcher, parse_gitignore
+from ghcp_exclusion_builder.walker import walk_directory
+
+ROOT_GITIGNORE = """\
+# Build output
+*.log
+!keep.log
+build/
+/dist
+docs/**/*.tmp
+**/cache
+a/**/z
+secret?.txt
+[Tt]emp*
+\\#hash
+""" + "trail\\ \n" + """vendor/*
+!vendor/ok/
+"""
+
+FILES = [
+    'x.log', 'keep.log', 'sub/keep.log', 'sub/y.log', 'build/o', 'sub/build/o', 'dist/a', 'sub/dist/a',
+    'docs/x/y/f.tmp', 'docs/f.tmp', 'docs/x/f.tmp', 'a/b/c/z', 'a/z', 'a/b/z/q', 'cache/f', 'sub/cache/f',
+    'secret1.txt', 'secret12.txt', 'Temp1', 'temp2', 'sub/Temp3', '#hash', 'trail ', 'trail',
+    'vendor/ok/f', 'vendor/bad/f', 'vendor/f', 'local.txt', 'sub/local.txt', 'sub/a.md', 'sub/README.md',
+    'sub/deep/b.md', 'sub/only_here', 'sub/deep/only_here', 'only_here', 'sub/deep/x.txt',
+]
+
+
+@pytest.fixture
+def ignore_tree(tmp_path):
+    """A tree with nested .gitignore files and .git/info/exclude."""
+    for relative_path in FILES:
+        full_path = tmp_path / relative_path
+        full_path.parent.mkdir(parents=True, exist_ok=True)
+        full_path.write_text("hi")
+    (tmp_path / '.gitignore').write_text(ROOT_GITIGNORE)
+    (tmp_path / 'sub' / '.gitignore').write_text("*.md\n!README.md\n/only_here\n")
+    subprocess.run(["git", "init", "-q", str(tmp_path)], check=True)
+    (tmp_path / '.git' / 'info' / 'exclude').write_text("local.txt\n")
+    return str(tmp_path)
+
+
+def _ignored(matcher):
+    return {path for path in FILES if matcher.is_ignored_in_tree(path)}
+
+
+def test_parse_gitignore_skips_comments_and_blank_lines():
+    assert parse_gitignore(["# comment\n", "\n", "   \n"]) == []
+    (regex, negated, directory_only), = parse_gitignore(["!build/\n"])
+    assert negated and directory_only
+    assert regex.match("build") and regex.match("src/build")
+
+
+def test_gitignore_semantics(ignore_tree):
+    assert _ignored(GitignoreMatcher(ignore_tree)) == {
+        'x.log', 'sub/y.log', 'build/o', 'sub/build/o', 'dist/a',
+        'docs/x/y/f.tmp', 'docs/f.tmp', 'docs/x/f.tmp', 'a/b/c/z', 'a/z', 'a/b/z/q', 'cache/f', 'sub/cache/f',
+        'secret1.txt', 'Temp1', 'temp2', 'sub/Temp3', '#hash', 'trail ',
+        'vendor/bad/f', 'vendor/f', 'local.txt', 'sub/local.txt', 'sub/a.md', 'sub/deep/b.md', 'sub/only_here',
+    }
+
+
+def test_gitignore_matches_git_check_ignore(ignore_tree):
+    result = subprocess.run(
+        ["git", "-C", ignore_tree, "check-ignore", "--no-index", "--stdin"],
+        input="\n".join(FILES), capture_output=True, text=True
+    )
+    if result.returncode not in (0, 1):
+        pytest.skip(f"git check-ignore unavailable: {result.stderr}")
+    assert _ignored(GitignoreMatcher(ignore_tree)) == set(filter(None, result.stdout.split("\n")))
+
+
+def test_walk_directory_skips_ignored_subtrees(ignore_tree):
+    stats = {}
+    walked = {
+        rel for rel, _, _ in walk_directory(
+            ignore_tree, ExclusionMatcher(["/.git/**"]), stats, GitignoreMatcher(ignore_tree)
+        )
+    }
+    assert walked == (set(FILES) - _ignored(GitignoreMatcher(ignore_tree))) | {'.gitignore', 'sub/.gitignore'}
+    assert not any(os.path.basename(os.path.dirname(rel)) == 'build' for rel in walked)
+    # build/, sub/build/, dist/, cache/, sub/cache/, a/b/z/ and vendor/bad/ are never listed
+    assert stats['directories'] == 12
@@ -0,0 +1,195 @@
+import os
+import pytest
+from unittest.mock import MagicMock, patch
+from ghcp_exclusion_builder.exclusions import ExclusionMatcher
+from ghcp_exclusion_builder.incremental import (
+    get_changed_paths, get_head_commit, merge_flagged_files, settings_fingerprint
+)
+from ghcp_exclusion_builder.scanner import scan_directory_for_pii
+from .conftest import fake_presidio_analyzer, git, write_file
+
+
+@pytest.fixture
+def git_repo(tmp_path):
+    """Create a git repository with one commit of test files."""
+    repo = str(tmp_path / "repo")
+    os.makedirs(repo)
+    git(repo, "init", "-q")
+    write_file(repo, 'people.txt', 'John Doe and Jane Smith')
+    write_file(repo, 'notes.txt', 'Nothing to see here.')
+    write_file(repo, 'docs/old_name.txt', 'Jane Smith wrote this.')
+    git(repo, "add", "-A")
+    git(repo, "commit", "-q", "-m", "initial")
+    return repo
+
+
+def test_get_changed_paths_working_tree(git_repo):
+    """Test that modified, renamed, deleted and untracked files are reported."""
+    base = get_head_commit(git_repo)
+    write_file(git_repo, 'notes.txt', 'Changed notes.')
+    git(git_repo, "mv", "docs/old_name.txt", "docs/new_name.txt")
+    os.remove(os.path.join(git_repo, 'people.txt'))
+    write_file(git_repo, 'untracked.txt', 'New file.')
+
+    changed, deleted = get_changed_paths(git_repo, base)
+
+    assert changed == {'notes.txt', 'docs/new_name.txt', 'untracked.txt'}
+    assert deleted == {'docs/old_name.txt', 'people.txt'}
+
+
+def test_get_changed_paths_between_refs(git_repo):
+    """Test that two refs are compared without looking at the working tree."""
+    base = get_head_commit(git_repo)
+    write_file(git_repo, 'notes.txt', 'Changed notes.')
+    git(git_repo, "commit", "-q", "-am", "second")
+    write_file(git_repo, 'untracked.txt', 'New file.')
+
+    changed, deleted = get_changed_paths(git_repo, base, "HEAD")
+
+    assert changed == {'notes.txt'}
+    assert deleted == set()
+
+
+def test_get_changed_paths_outside_repo(tmp_path):
+    """Test that git failures surface as RuntimeError."""
+    with pytest.raises(RuntimeError):
+        get_changed_paths(str(tmp_path), "HEAD")
+
+
+def test_merge_flagged_files_drops_stale_entries():
+    """Test that changed, deleted and newly excluded paths are not carried over."""
+    previous = {
+        'keep.txt': {'pii_count': 2, 'pii_types': {'PERSON': 2}},
+        'changed.txt': {'pii_count': 2, 'pii_types': {'PERSON': 2}},
+        'gone.txt': {'pii_count': 2, 'pii_types': {'PERSON': 2}},
+        'build/out.txt': {'pii_count': 2, 'pii_types': {'PERSON': 2}},
+    }
+    new = {'new.txt': {'pii_count': 3, 'pii_types': {'PERSON': 3}}}
+
+    merged = merge_flagged_files(
+        previous, new, {'changed.txt', 'new.txt'}, {'gone.txt'},
+        ExclusionMatcher(["/build/**"])
+    )
+
+    assert sorted(merged) == ['keep.txt', 'new.txt']
+
+
+def test_incremental_scan_merges_stored_results(git_repo, tmp_path):
+    """Test that a re-scan analyzes only changed files but reports the whole repo."""
+    state_path = str(tmp_path / "state.json")
+    progress_mock = MagicMock()
+    scan_kwargs = dict(
+        selected_presets=None,
+        custom_exclusions_str="",
+        incremental=True,
+        state_path=state_path,
+        progress=progress_mock
+    )
+
+    with patch('ghcp_exclusion_builder.scanner.get_presidio_analyzer') as mock_get_analyzer:
+        mock_analyzer = mock_get_analyzer.return_value = fake_presidio_analyzer()
+
+        full_result = scan_directory_for_pii(git_repo, **scan_kwargs)
+        assert "no compatible stored results" in full_result
+        assert '- "/people.txt"' in full_result
+        assert mock_analyzer.analyze.call_count == 3
+
+        write_file(git_repo, 'notes.txt', 'Now John Doe is here too.')
+        git(git_repo, "commit", "-q", "-am", "second")
+
+        incremental_result = scan_directory_for_pii(git_repo, **scan_kwargs)
+        assert mock_analyzer.analyze.call_count == 4
+        assert "analyzed 1 changed files" in incremental_result
+        assert '- "/people.txt"' in incremental_result
+        assert '- "/notes.txt"' in incremental_result
+
+        changed_settings_result = scan_directory_for_pii(
+            git_repo, **dict(scan_kwargs, min_entities_threshold=3)
+        )
+        assert "no compatible stored results" in changed_settings_result
+
+
+def test_incremental_scan_since_other_ref_does_not_merge(git_repo, tmp_path):
+    """Test that a ref other than the stored commit neither merges stale findings nor replaces the state."""
+    state_path = str(tmp_path / "state.json")
+    scan_kwargs = dict(
+        selected_presets=None,
+        custom_exclusions_str="",
+        incremental=True,
+        state_path=state_path,
+        progress=MagicMock()
+    )
+
+    with patch('ghcp_exclusion_builder.scanner.get_presidio_analyzer') as mock_get_analyzer:
+        mock_get_analyzer.return_value = fake_presidio_analyzer()
+        scan_directory_for_pii(git_repo, **scan_kwargs)
+
+        write_file(git_repo, 'people.txt', 'Nobody here any more.')
+        git(git_repo, "commit", "-q", "-am", "clean people")
+        cleaned_commit = get_head_commit(git_repo)
+        write_file(git_repo, 'notes.txt', 'Now John Doe is here too.')
+        git(git_repo, "commit", "-q", "-am", "add notes")
+
+        since_ref_result = scan_directory_for_pii(git_repo, **dict(scan_kwargs, changed_since_ref=cleaned_commit))
+        assert "not merged" in since_ref_result
+        assert '- "/notes.txt"' in since_ref_result
+        assert '- "/people.txt"' not in since_ref_result
+
+        # The stored state is still the first scan's, so a plain re-scan diffs from it
+        merged_result = scan_directory_for_pii(git_repo, **scan_kwargs)
+        assert "analyzed 2 changed files" in merged_result
+        assert "Merged with stored results" in merged_result
+        assert '- "/people.txt"' not in merged_result
+        assert '- "/docs/old_name.txt"' in merged_result
+
+
+def test_incremental_scan_rescans_reverted_uncommitted_changes(git_repo, tmp_path):
+    """Test that a file scanned with uncommitted edits is analyzed again once they are reverted."""
+    scan_kwargs = dict(
+        selected_presets=None,
+        custom_exclusions_str="",
+        incremental=True,
+        state_path=str(tmp_path / "state.json"),
+    )
+
+    with patch('ghcp_exclusion_builder.scanner.get_presidio_analyzer') as mock_get_analyzer:
+        mock_get_analyzer.return_value = fake_presidio_analyzer()
+        assert '- "/people.txt"' in scan_directory_for_pii(git_repo, **scan_kwargs)
+
+        write_file(git_repo, 'people.txt', 'Nobody here any more.')
+        assert '- "/people.txt"' not in scan_directory_for_pii(git_repo, **scan_kwargs)
+
+        git(git_repo, "checkout", "--", "people.txt")
+        reverted_result = scan_directory_for_pii(git_repo, **scan_kwargs)
+        assert "analyzed 1 changed files" in reverted_result
+        assert '- "/people.txt"' in reverted_result
+
+
+def test_settings_fingerprint_covers_model_byte_limit_and_deny_lists():
+    """Test that stored results are not merged across analyzer pipelines, byte limits or deny lists."""
+    base = settings_fingerprint(["*.log"], ["PERSON"], 0.6, 2, pipeline_name="en_core_web_lg", max_analyzed_bytes=1000)
+    assert settings_fingerprint(
+        ["*.log"], ["PERSON"], 0.6, 2, pipeline_name="en_core_web_sm", max_analyzed_bytes=1000
+    ) != base
+    assert settings_fingerprint(["*.log"], ["PERSON"], 0.6, 2, pipeline_name="en_core_web_lg") != base
+    assert settings_fingerprint(
+        ["*.log"], ["PERSON"], 0.6, 2, pipeline_name="en_core_web_lg", max_analyzed_bytes=1000,
+        deny_lists={"STAFF_NAME": ["0123abcd", 0.85]}
+    ) != base
+
+
+def test_incremental_scan_without_stored_commit_scans_everything(git_repo, tmp_path):
+    """Test that a stored commit lost to a rebase falls back to a full scan, with the state under cache_dir."""
+    scan_kwargs = dict(selected_presets=None, custom_exclusions_str="", incremental=True, cache_dir=str(tmp_path))
+
+    with patch('ghcp_exclusion_builder.scanner.get_presidio_analyzer') as mock_get_analyzer:
+        mock_get_analyzer.return_value = fake_presidio_analyzer()
+        scan_directory_for_pii(git_repo, **scan_kwargs)
+        state_files = os.listdir(tmp_path / "incremental")
+        assert len(state_files) == 1
+
+        state_path = tmp_path / "incremental" / state_files[0]
+        state_path.write_text(state_path.read_text().replace(get_head_commit(git_repo), "0" * 40))
+        result = scan_directory_for_pii(git_repo, **scan_kwargs)
+    assert f"stored commit {'0' * 12} no longer exists, scanned the full tree" in result
+    assert '- "/people.txt"' in result
@@ -0,0 +1,116 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+import pytest
+from ghcp_exclusion_builder.jobs import (
+    JobStore, ScanScheduler, job_settings, STATUS_CANCELLED, STATUS_DONE, STATUS_FAILED, STATUS_QUEUED
+)
+
+
+@pytest.fixture
+def store(tmp_path):
+    job_store = JobStore(str(tmp_path / "jobs"))
+    yield job_store
+    job_store.close()
+
+
+@pytest.fixture
+def repositories(tmp_path):
+    paths = []
+    for name in ["alpha", "beta", "gamma"]:
+        repo = tmp_path / name
+        repo.mkdir()
+        (repo / "contacts.txt").write_text(f"Mail {name}@example.com or owner@example.org")
+        paths.append(str(repo))
+    return paths
+
+
+def _scheduler(store, worker_budget=1, **kwargs):
+    return ScanScheduler(worker_budget=worker_budget, store=store, executor_class=ThreadPoolExecutor, **kwargs)
+
+
+def test_job_settings_rejects_unknown_names():
+    assert job_settings({"min_entities_threshold": 1})["min_entities_threshold"] == 1
+    with pytest.raises(ValueError, match="Unknown scan job settings: num_workers"):
+        job_settings({"num_workers": 4})
+
+
+def test_scheduler_persists_results(store, repositories, tmp_path):
+    results = []
+    scheduler = _scheduler(store, worker_budget=2, on_result=lambda job_id, result: results.append(result))
+    job_id = scheduler.submit(repositories + [str(tmp_path / "missing")], {
+        "selected_entity_types": ["EMAIL_ADDRESS"], "min_entities_threshold": 1, "use_cache": False,
+    })
+    assert scheduler.wait(timeout=60)
+    scheduler.shutdown()
+
+    status = scheduler.status(job_id)
+    assert status["finished"]
+    assert status["counts"] == {STATUS_DONE: 3, STATUS_FAILED: 1}
+    assert [repository["flagged_files"] for repository in status["repositories"]] == [1, 1, 1, 0]
+    assert len(results) == 4
+
+    # Results and settings survive in the store
+    reopened = JobStore(store.cache_dir)
+    job_results = reopened.job_results(job_id)
+    reopened.close()
+    assert job_results["settings"]["selected_entity_types"] == ["EMAIL_ADDRESS"]
+    assert job_results["repositories"][0]["findings"] == [
+        {"path": "contacts.txt", "pii_count": 2, "pii_types": {"EMAIL_ADDRESS": 2}}
+    ]
+    assert job_results["repositories"][3]["summary"].startswith("Error")
+
+
+def test_scheduler_serves_jobs_round_robin(store, repositories):
+    """Test that a job submitted behind a large one does not wait for all of it."""
+    started = []
+    release = threading.Event()
+
+    def fake_scan(repository_path, settings):
+        started.append((settings["min_entities_threshold"], repository_path))
+        release.wait(10)
+        return "# Scan complete", []
+
+    with patch("ghcp_exclusion_builder.jobs._scan_repository", side_effect=fake_scan):
+        scheduler = _scheduler(store, worker_budget=1)
+        large_job = scheduler.submit(repositories * 2, {"min_entities_threshold": 1})
+        small_job = scheduler.submit(repositories[:1], {"min_entities_threshold": 2})
+        release.set()
+        assert scheduler.wait(timeout=10)
+        scheduler.shutdown()
+
+    order = [threshold for threshold, _path in started]
+    assert order[:3] == [1, 1, 2]
+    assert scheduler.status(large_job)["finished"] and scheduler.status(small_job)["finished"]
+
+
+def test_cancel_and_resume(store, repositories):
+    release = threading.Event()
+
+    def fake_scan(repository_path, settings):
+        release.wait(10)
+        return "# Scan complete", []
+
+    with patch("ghcp_exclusion_builder.jobs._scan_repository", side_effect=fake_scan):
+        scheduler = _scheduler(store)
+        cancelled_job = scheduler.submit(repositories)
+        assert scheduler.cancel(cancelled_job) == 2
+        release.set()
+        assert scheduler.wait(timeout=10)
+        scheduler.shutdown()
+    assert scheduler.status(cancelled_job)["counts"] == {STATUS_DONE: 1, STATUS_CANCELLED: 2}
+
+    # A job left queued by an earlier process is picked up again
+    store.create_job("left-over", repositories[:2], job_settings())
+    with patch("ghcp_exclusion_builder.jobs._scan_repository", return_value=("# Scan complete", [])):
+        scheduler = _scheduler(store)
+        assert scheduler.resume() == 2
+        assert scheduler.wait(timeout=10)
+        scheduler.shutdown()
+    assert scheduler.status("left-over")["counts"] == {STATUS_DONE: 2}
+    assert STATUS_QUEUED not in scheduler.status(cancelled_job)["counts"]
+
+
+def test_submit_requires_repositories(store):
+    with pytest.raises(ValueError):
+        _scheduler(store).submit([])
@@ -0,0 +1,105 @@
+from ghcp_exclusion_builder.exclusions import is_excluded
+from ghcp_exclusion_builder.minimize import FileTreeCounts, minimize_rules
+
+
+def _flagged(*paths):
+    return {path: {'pii_count': 2, 'pii_types': {'PERSON': 2}} for path in paths}
+
+
+def _tree(*paths):
+    tree_counts = FileTreeCounts()
+    for path in paths:
+        tree_counts.add(path)
+    return tree_counts
+
+
+def _patterns(rule_lines):
+    return [line[3:-1] for line in rule_lines if line.startswith('- "')]
+
+
+def test_file_tree_counts():
+    tree_counts = _tree("a.txt", "data/x.csv", "data/sub/y.CSV", "data/README")
+    assert tree_counts.files == {'': 4, 'data/': 3, 'data/sub/': 1}
+    assert tree_counts.extension_files[('', '.csv')] == 1
+    assert tree_counts.extension_files[('', '.CSV')] == 1
+    assert tree_counts.extension_files[('data/', '.CSV')] == 1
+    assert ('data/', '.csv') not in tree_counts.extension_files
+    assert ('data/sub/', '.CSV') not in tree_counts.extension_files
+    assert ('data/', '') not in tree_counts.extension_files
+
+
+def test_mostly_flagged_directory_becomes_one_glob():
+    flagged = _flagged("data/a.json", "data/b.json", "data/sub/c.txt", "src/app.py")
+    tree_counts = _tree(*flagged, "data/clean.json", "src/main.py", "src/util.py")
+
+    rule_lines, glob_counts = minimize_rules(flagged, tree_counts, 0.75)
+    assert _patterns(rule_lines) == ["/data/**", "/src/app.py"]
+    assert glob_counts == {'directory': 1, 'extension': 0, 'file': 1}
+    assert "(3 of 4 files flagged; Contains: 6 PERSON)" in rule_lines[0]
+
+
+def test_directory_below_ratio_keeps_file_rules():
+    flagged = _flagged("data/a.json", "data/b.json")
+    tree_counts = _tree(*flagged, "data/c.json", "data/d.json")
+
+    rule_lines, glob_counts = minimize_rules(flagged, tree_counts, 0.8)
+    assert _patterns(rule_lines) == ["/data/a.json", "/data/b.json"]
+    assert glob_counts == {'directory': 0, 'extension': 0, 'file': 2}
+
+
+def test_extension_glob_when_directory_is_mixed():
+    flagged = _flagged("fixtures/a/a.csv", "fixtures/deep/b.csv", "fixtures/c.py", "fixtures/d.csv")
+    tree_counts = _tree(*flagged, *(f"fixtures/test_{i}.py" for i in range(5)))
+
+    rule_lines, glob_counts = minimize_rules(flagged, tree_counts, 0.8)
+    # The glob needs a subdirectory, so the csv directly in fixtures/ keeps its own rule
+    assert _patterns(rule_lines) == ["/fixtures/**/*.csv", "/fixtures/c.py", "/fixtures/d.csv"]
+    assert glob_counts == {'directory': 0, 'extension': 1, 'file': 2}
+    for path in flagged:
+        assert is_excluded(path, _patterns(rule_lines)), path
+
+
+def test_root_extension_glob_and_single_files_stay():
+    flagged = _flagged("a.sql", "x/b.sql", "x/y/c.sql", "notes.txt")
+    tree_counts = _tree(*flagged, "x/main.py", "x/y/lib.py", "readme.txt", "x/y/z.txt")
+
+    rule_lines, _glob_counts = minimize_rules(flagged, tree_counts, 0.9)
+    assert _patterns(rule_lines) == ["*.sql", "/notes.txt"]
+
+
+def test_every_flagged_file_is_covered_once():
+    flagged = _flagged(*(f"d{i % 3}/s{i % 2}/f{i}.{'csv' if i % 4 else 'txt'}" for i in range(40)))
+    tree_counts = _tree(*flagged, *(f"d{i % 3}/s{i % 2}/clean{i}.txt" for i in range(12)))
+
+    rule_lines, glob_counts = minimize_rules(flagged, tree_counts, 0.7)
+    patterns = _patterns(rule_lines)
+    assert len(patterns) == sum(glob_counts.values()) < len(flagged)
+
+    def covers(pattern, path):
+        if pattern.endswith("/**"):
+            return path.startswith(pattern[1:-2])
+        if "/**/*." in pattern:
+            directory, extension = pattern[1:].split("**/*")
+            return path.startswith(directory) and "/" in path[len(directory):] and path.endswith(extension)
+        if pattern.startswith("*."):
+            return path.endswith(pattern[1:])
+        return pattern == "/" + path
+
+    for path in flagged:
+        assert sum(covers(pattern, path) for pattern in patterns) == 1, path
+        assert is_excluded(path, patterns), path
+
+
+def test_extension_globs_keep_the_observed_spelling():
+    flagged = _flagged("d/x/A.CSV", "d/y/b.CSV", "d/y/c.csv", "d/z/e.csv")
+    tree_counts = _tree(*flagged, *(f"d/notes{i}.txt" for i in range(6)))
+
+    rule_lines, _ = minimize_rules(flagged, tree_counts, 0.7)
+    patterns = _patterns(rule_lines)
+    assert "/d/**/*.CSV" in patterns and "/d/**/*.csv" in patterns
+    for path in flagged:
+        assert is_excluded(path, patterns), path
+
+
+def test_no_flagged_files():
+    assert minimize_rules({}, _tree("a.txt"), 0.8) == ([], {'directory': 0, 'extension': 0, 'file': 0})
@@ -0,0 +1,92 @@
+import pytest
+from ghcp_exclusion_builder.prefilter import ENTITY_PREFILTER_PATTERNS, get_prefilter
+
+# Reference corpus: realistic snippets with and without PII
+REFERENCE_CORPUS = [
+    "Contact john.doe@example.com for details.",
+    "Call me at (425) 555-0100 or +44 20 7946 0958.",
+    "Phone: 425.555.0100",
+    "Tel: +1 ２０２ ５５５ ０１２３",
+    "電話 ０３-１２３４-５６７８, SSN ０７８-０５-１１２０, card ４１１１ １１１１ １１１１ １１１１",
+    "رقم الهاتف ٠٥٠١٢٣٤٥٦٧",
+    "SSN 078-05-1120 and 123456789 and 078 05 1120",
+    "Card 4111 1111 1111 1111 or 5555-5555-5555-4444, amex 378282246310005",
+    "IBAN DE89 3704 0044 0532 0130 00 and gb82 west 1234 5698 7654 32",
+    "Servers at 192.168.0.1, ::1 and fe80::1ff:fe23:4567:890a",
+    "See https://foo.org/x, www.example.com or example.net",
+    "btc 1BoatSLRHtKNngkdXEeobR76b53LETtpyT and bc1qar0srrr7xfkvy5l643lydnw9re59gtzzwf5mdq",
+    "DEA BB1388568 issued",
+    "NHS 401 023 2137",
+    "Passport 912803456, bank 945456787654",
+    "License H12345678, A1, a1b2c, 12abc34567",
+    "John Smith met Jane in Paris with the Germans.",
+    "JOHN SMITH, LONDON",
+    "Émile Zola",
+    "key: value\nother_key: 3\nlist: [a, b, c]",
+    "0,0,0,0\n1,2,3,4\n",
+    "def f(x):\n    return x + 1\n",
+    "plain lowercase prose without names or numbers",
+    "",
+]
+
+
+def _pattern_recognizers():
+    """Instantiate Presidio's regex/phonenumbers recognizers (no NLP model needed)."""
+    predefined = pytest.importorskip("presidio_analyzer.predefined_recognizers")
+    return [
+        predefined.CreditCardRecognizer(), predefined.CryptoRecognizer(),
+        predefined.EmailRecognizer(), predefined.IbanRecognizer(), predefined.IpRecognizer(),
+        predefined.MedicalLicenseRecognizer(), predefined.NhsRecognizer(),
+        predefined.PhoneRecognizer(), predefined.UrlRecognizer(), predefined.UsBankRecognizer(),
+        predefined.UsLicenseRecognizer(), predefined.UsPassportRecognizer(),
+        predefined.UsSsnRecognizer(),
+    ]
+
+
+def test_prefilter_never_drops_pattern_recognizer_hits():
+    """Test that every text a pattern recognizer matches passes that type's prefilter."""
+    for recognizer in _pattern_recognizers():
+        for entity_type in recognizer.supported_entities:
+            prefilter = get_prefilter([entity_type])
+            assert prefilter is not None, entity_type
+            for text in REFERENCE_CORPUS:
+                if recognizer.analyze(text, [entity_type], None):
+                    assert prefilter(text), (entity_type, text)
+
+
+def test_prefilter_skips_texts_without_candidates():
+    """Test that obviously empty texts are rejected for the selected types."""
+    assert not get_prefilter(["EMAIL_ADDRESS"])("no at sign here")
+    assert not get_prefilter(["CREDIT_CARD", "PHONE_NUMBER"])("a1 b2 c3")
+    assert get_prefilter(["PHONE_NUMBER"])("Tel: +1 ２０２ ５５５ ０１２３")
+    assert not get_prefilter(["PERSON"])("lowercase config: value\n")
+    assert get_prefilter(["PERSON"])("written by Jane")
+    assert get_prefilter(["PERSON", "EMAIL_ADDRESS"])("mail a@b.c")
+
+
+def test_prefilter_disabled_for_unfilterable_types():
+    """Test that types without a cheap check disable the cascade."""
+    assert get_prefilter(["DATE_TIME"]) is None
+    assert get_prefilter(["PERSON", "CUSTOM_EMPLOYEE_ID"]) is None
+    assert get_prefilter([]) is None
+    assert set(ENTITY_PREFILTER_PATTERNS) <= {
+        "EMAIL_ADDRESS", "CREDIT_CARD", "US_SSN", "US_DRIVER_LICENSE", "IP_ADDRESS", "URL",
+        "US_BANK_NUMBER", "US_PASSPORT", "IBAN_CODE", "UK_NHS", "CRYPTO", "MEDICAL_LICENSE",
+    }
+
+
+def test_prefilter_never_drops_full_analyzer_hits():
+    """Test the cascade against the full analyzer (needs the spaCy model)."""
+    spacy = pytest.importorskip("spacy")
+    if not spacy.util.is_package("en_core_web_lg"):
+        pytest.skip("spaCy model en_core_web_lg is not installed")
+    from ghcp_exclusion_builder.presidio_analyzer_setup import get_presidio_analyzer, PII_ENTITY_TYPES
+
+    analyzer = get_presidio_analyzer()
+    for entity_type in PII_ENTITY_TYPES:
+        prefilter = get_prefilter([entity_type])
+        if prefilter is None:
+            continue
+        for text in REFERENCE_CORPUS:
+            if analyzer.analyze(text=text, language='en', entities=[entity_type]):
+                assert prefilter(text), (entity_type, text)
@@ -0,0 +1,67 @@
+import pytest
+import spacy
+from ghcp_exclusion_builder import presidio_analyzer_setup
+from ghcp_exclusion_builder.presidio_analyzer_setup import (
+    get_presidio_analyzer, analyzer_pipeline_name, needs_ner, BLANK_PIPELINE_NAME
+)
+
+
+@pytest.fixture
+def fresh_engines(monkeypatch):
+    """Start every test with an empty engine cache."""
+    monkeypatch.setattr(presidio_analyzer_setup, "_analyzer_engines", {})
+
+
+@pytest.fixture
+def tiny_model_path(tmp_path):
+    """A small untrained pipeline with the component layout of the en_core_web models."""
+    nlp = spacy.blank("en")
+    nlp.add_pipe("tok2vec")
+    nlp.add_pipe("tagger").add_label("NN")
+    nlp.add_pipe("attribute_ruler")
+    nlp.add_pipe("ner").add_label("PERSON")
+    nlp.initialize()
+    nlp.to_disk(tmp_path / "tiny_en")
+    return str(tmp_path / "tiny_en")
+
+
+@pytest.mark.parametrize("entity_types, expected", [
+    (["PERSON"], True),
+    (["EMAIL_ADDRESS", "LOCATION"], True),
+    (["DATE_TIME"], True),
+    (["EMAIL_ADDRESS", "IP_ADDRESS", "CREDIT_CARD", "IBAN_CODE"], False),
+    (None, True),
+])
+def test_needs_ner(entity_types, expected):
+    assert needs_ner(entity_types) == expected
+    expected_pipeline = "en_core_web_sm" if expected else BLANK_PIPELINE_NAME
+    assert analyzer_pipeline_name(entity_types, "en_core_web_sm") == expected_pipeline
+
+
+def test_pattern_entities_use_blank_pipeline(fresh_engines):
+    """Test that pattern-only entity types are served without a spaCy model."""
+    analyzer = get_presidio_analyzer(["EMAIL_ADDRESS", "US_SSN"], model_name="not_an_installed_model")
+    assert analyzer.nlp_engine.nlp["en"].pipe_names == ["lowercase_lemma"]
+    assert get_presidio_analyzer(["CREDIT_CARD"]) is analyzer
+
+    results = analyzer.analyze(
+        text="Mail jane@example.com, my ssn is 536-90-4399", language="en",
+        entities=["EMAIL_ADDRESS", "US_SSN"]
+    )
+    scores = {r.entity_type: r.score for r in results}
+    assert scores["EMAIL_ADDRESS"] == 1.0
+    # The "ssn" context word still boosts the weak SSN pattern
+    assert scores["US_SSN"] > 0.5
+
+
+def test_ner_pipeline_is_trimmed(fresh_engines, tiny_model_path):
+    """Test that only NER (plus the lemma stand-in) is kept from a full model."""
+    analyzer = get_presidio_analyzer(["PERSON"], model_name=tiny_model_path)
+    assert analyzer.nlp_engine.nlp["en"].pipe_names == ["ner", "lowercase_lemma"]
+    assert get_presidio_analyzer(["PERSON", "EMAIL_ADDRESS"], model_name=tiny_model_path) is analyzer
+    assert get_presidio_analyzer(["EMAIL_ADDRESS"], model_name=tiny_model_path) is not analyzer
+
+
+def test_missing_model_raises(fresh_engines, tmp_path):
+    with pytest.raises(RuntimeError, match="is required but not found"):
+        get_presidio_analyzer(["PERSON"], model_name=str(tmp_path / "missing_model"))
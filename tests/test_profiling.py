@@ -0,0 +1,62 @@
+import json
+import time
+from ghcp_exclusion_builder.profiling import ChromeTraceRecorder, ScanProfile, record_span
+
+
+def _file_result(analyze_seconds, results=(), size=100, pid=123):
+    file_result = {'spans': [], 'size': size, 'pid': pid, 'results': list(results)}
+    record_span(file_result, 'read', 10.0, 0.001)
+    record_span(file_result, 'analyze', 10.001, analyze_seconds)
+    return file_result
+
+
+def test_record_span_skips_unprofiled_files():
+    file_result = {'spans': None}
+    record_span(file_result, 'read', 0.0)
+    assert file_result['spans'] is None
+
+
+def test_scan_profile_keeps_slowest_files():
+    profile = ScanProfile(slowest_count=2)
+    profile.start()
+    for i, seconds in enumerate([0.5, 0.1, 0.9, 0.3]):
+        profile.add_file(f"f{i}.txt", _file_result(seconds, [("PERSON", 0.9), ("PERSON", 0.4)]), 0.6)
+    profile.finish()
+
+    profile_dict = profile.as_dict()
+    assert [record['path'] for record in profile_dict['slowest_files']] == ["f2.txt", "f0.txt"]
+    assert profile_dict['slowest_files'][0]['entities'] == 2
+    assert profile_dict['slowest_files'][0]['significant_entities'] == 1
+    assert profile_dict['files'] == 4 and profile_dict['bytes'] == 400
+    assert abs(profile_dict['stage_seconds']['analyze'] - 1.8) < 1e-9
+    assert list(profile_dict['stage_seconds']) == ['read', 'analyze']
+
+
+def test_timed_walk_separates_exclusion_matching():
+    profile = ScanProfile()
+
+    def walk():
+        # Matching that took 50ms of the walk's time
+        time.sleep(0.05)
+        profile.add_stage_time("exclusions", 0.05)
+        yield "a"
+        yield "b"
+
+    assert list(profile.timed_walk(walk())) == ["a", "b"]
+    assert profile.stage_seconds["exclusions"] == 0.05
+    assert 0 <= profile.stage_seconds["walk"] < 0.05
+
+
+def test_chrome_trace_recorder(tmp_path):
+    recorder = ChromeTraceRecorder()
+    profile = ScanProfile(on_span=recorder)
+    profile.start()
+    profile.add_file("a.txt", _file_result(0.25), 0.6)
+    profile.finish()
+    recorder.write(str(tmp_path / "trace.json"))
+
+    events = json.loads((tmp_path / "trace.json").read_text())['traceEvents']
+    assert [event['name'] for event in events] == ['read', 'analyze', 'scan']
+    assert events[1] == {
+        'name': 'analyze', 'ph': 'X', 'ts': 10.001e6, 'dur': 0.25e6, 'pid': 123, 'tid': 0, 'args': {'path': 'a.txt'}
+    }
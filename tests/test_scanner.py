@@ -1,9 +1,19 @@
 import os
+import re
+import codecs
+import sys
+import sqlite3
+import subprocess
+import threading
+import multiprocessing
 import pytest
 import tempfile
 from unittest.mock import MagicMock, patch
 import gradio as gr
-from ghcp_exclusion_builder.scanner import scan_directory_for_pii
+from ghcp_exclusion_builder import scanner
+from ghcp_exclusion_builder.scanner import scan_directory_for_pii, _size_balanced_batches
+from ghcp_exclusion_builder.profiling import ScanProfile
+from .conftest import fake_analyze, fake_process_batch
 
 
 @pytest.fixture
@@ -11,6 +21,7 @@ def mock_analyzer():
     """Fixture to mock the presidio analyzer."""
     with patch('ghcp_exclusion_builder.scanner.get_presidio_analyzer') as mock_get_analyzer:
         mock_analyzer = MagicMock()
+        mock_analyzer.nlp_engine.process_batch.side_effect = fake_process_batch
         mock_get_analyzer.return_value = mock_analyzer
         yield mock_analyzer
 
@@ -104,3 +115,582 @@ def test_scan_directory_with_presets(temp_test_dir, mock_analyzer):
         # The first arg would be the text content
         content = call_args[1]['text']
         assert "library.js" not in content  # From node_modules
+
+
+@pytest.mark.skipif(
+    multiprocessing.get_start_method() != "fork",
+    reason="The patched analyzer only reaches workers through fork"
+)
+def test_scan_directory_parallel_matches_serial(temp_test_dir, mock_analyzer):
+    """Test that a multi-process scan produces exactly the serial output."""
+    mock_analyzer.analyze.side_effect = fake_analyze
+    for i in range(20):
+        with open(os.path.join(temp_test_dir, f"extra_{i}.txt"), 'w') as f:
+            f.write("John Doe " * i)
+
+    progress_mock = MagicMock(spec=gr.Progress)
+    serial_result = scan_directory_for_pii(
+        temp_test_dir,
+        selected_presets=None,
+        custom_exclusions_str="",
+        num_workers=1,
+        progress=progress_mock
+    )
+    with patch('ghcp_exclusion_builder.scanner.check_spacy_model') as check_model, \
+            patch.object(scanner, 'get_presidio_analyzer', wraps=scanner.get_presidio_analyzer) as get_analyzer:
+        parallel_result = scan_directory_for_pii(
+            temp_test_dir,
+            selected_presets=None,
+            custom_exclusions_str="",
+            num_workers=3,
+            progress=progress_mock
+        )
+
+    assert "Found significant PII in" in serial_result
+    assert parallel_result == serial_result
+    # Only the workers build engines
+    check_model.assert_called_once()
+    get_analyzer.assert_not_called()
+
+
+def test_size_balanced_batches():
+    """Test that batching keeps every file exactly once and balances sizes."""
+    indexed_files = [
+        (0, 'a.txt', 100), (1, 'b.txt', 60), (2, 'c.txt', 50), (3, 'd.txt', None), (4, 'e.txt', 40)
+    ]
+    batches = _size_balanced_batches(indexed_files, 2)
+
+    assert len(batches) == 2
+    assigned = sorted(index for batch in batches for index, _path, _size in batch)
+    assert assigned == [0, 1, 2, 3, 4]
+    for batch in batches:
+        assert batch == sorted(batch)
+    sizes = {index: size or 0 for index, _, size in indexed_files}
+    batch_totals = sorted(sum(sizes[index] for index, _path, _size in batch) for batch in batches)
+    assert batch_totals == [110, 140]
+
+
+def test_scan_directory_uses_cache(temp_test_dir, mock_analyzer, tmp_path):
+    """Test that a re-scan serves unchanged files from the analysis cache."""
+    mock_analyzer.analyze.side_effect = fake_analyze
+    progress_mock = MagicMock(spec=gr.Progress)
+    scan_kwargs = dict(
+        selected_presets=None,
+        custom_exclusions_str="",
+        use_cache=True,
+        cache_dir=str(tmp_path),
+        progress=progress_mock
+    )
+
+    first_result = scan_directory_for_pii(temp_test_dir, **scan_kwargs)
+    first_call_count = mock_analyzer.analyze.call_count
+    assert "0 hits" in first_result
+
+    second_result = scan_directory_for_pii(temp_test_dir, **scan_kwargs)
+    assert mock_analyzer.analyze.call_count == first_call_count
+    assert "0 misses" in second_result
+    assert second_result.split("# Analysis cache")[1].count("\n") == \
+        first_result.split("# Analysis cache")[1].count("\n")
+
+    with open(os.path.join(temp_test_dir, 'file1.txt'), 'w') as f:
+        f.write('Changed content mentioning John Doe.')
+    third_result = scan_directory_for_pii(temp_test_dir, **scan_kwargs)
+    assert mock_analyzer.analyze.call_count == first_call_count + 1
+    assert "1 misses" in third_result
+
+    scan_directory_for_pii(temp_test_dir, clear_cache=True, **scan_kwargs)
+    assert mock_analyzer.analyze.call_count == 2 * first_call_count + 1
+
+
+def test_scan_goes_on_without_an_unusable_cache(temp_test_dir, mock_analyzer, tmp_path):
+    """Test that a cache directory that cannot be created only costs the cache."""
+    mock_analyzer.analyze.side_effect = fake_analyze
+    blocked_dir = tmp_path / "not_a_directory"
+    blocked_dir.write_text("")
+
+    result = scan_directory_for_pii(
+        temp_test_dir, None, "", selected_entity_types=["PERSON"], use_cache=True,
+        cache_dir=str(blocked_dir / "cache")
+    )
+    assert "# Warning: analysis cache unavailable, scanned without it" in result
+    assert "# Analysis cache:" not in result
+    assert '- "/file2.txt"' in result
+
+
+def test_scan_goes_on_when_the_cache_cannot_be_written(temp_test_dir, mock_analyzer, tmp_path):
+    """Test that a failing cache write is reported after a complete scan."""
+    mock_analyzer.analyze.side_effect = fake_analyze
+    with patch('ghcp_exclusion_builder.cache.AnalysisCache.put_many', side_effect=sqlite3.OperationalError("locked")):
+        result = scan_directory_for_pii(
+            temp_test_dir, None, "", selected_entity_types=["PERSON"], use_cache=True, cache_dir=str(tmp_path)
+        )
+    assert '- "/file2.txt"' in result
+    assert "# Warning: analysis cache not updated: locked" in result
+
+
+def _fake_analyze_with_offsets(text, language, entities, nlp_artifacts=None):
+    """Return one PERSON hit with offsets per 'John Doe' in the text."""
+    return [
+        MagicMock(entity_type="PERSON", score=0.9, start=match.start(), end=match.end())
+        for match in re.finditer("John Doe", text)
+    ]
+
+
+@pytest.fixture
+def small_windows():
+    """Shrink the analysis windows so test files are streamed in several windows."""
+    with patch('ghcp_exclusion_builder.scanner.ANALYSIS_WINDOW_BYTES', 100), \
+            patch('ghcp_exclusion_builder.scanner.WINDOW_OVERLAP_BYTES', 20):
+        yield
+
+
+def test_windowed_analysis_counts_boundary_entities_once(tmp_path, mock_analyzer, small_windows):
+    """Test that entities crossing a window boundary are found exactly once."""
+    mock_analyzer.analyze.side_effect = _fake_analyze_with_offsets
+    # 'John Doe' straddles the 100-character window boundary
+    (tmp_path / "big.txt").write_text("x" * 96 + " John Doe " + "y" * 300 + " John Doe")
+
+    result = scan_directory_for_pii(
+        str(tmp_path), None, "", min_entities_threshold=3,
+        confidence_threshold=50, progress=MagicMock(spec=gr.Progress)
+    )
+    assert "No significant PII found" in result
+
+    result = scan_directory_for_pii(
+        str(tmp_path), None, "", min_entities_threshold=2,
+        progress=MagicMock(spec=gr.Progress)
+    )
+    assert "(Contains: 2 PERSON)" in result
+
+
+def test_windowed_analysis_stops_at_entity_threshold(tmp_path, mock_analyzer, small_windows):
+    """Test that analysis stops once the file has enough significant entities."""
+    mock_analyzer.analyze.side_effect = _fake_analyze_with_offsets
+    (tmp_path / "big.txt").write_text(("John Doe " + "z" * 91) * 50)
+
+    result = scan_directory_for_pii(
+        str(tmp_path), None, "", min_entities_threshold=2,
+        progress=MagicMock(spec=gr.Progress)
+    )
+
+    assert '- "/big.txt"' in result
+    assert "Stopped early after reaching the entity threshold: 1 large files" in result
+    assert mock_analyzer.analyze.call_count == 2
+
+
+def test_early_exit_results_are_cached_per_threshold(tmp_path, mock_analyzer, small_windows):
+    """Test that a large file stopped early is served from the cache while the thresholds stay the same."""
+    mock_analyzer.analyze.side_effect = _fake_analyze_with_offsets
+    scan_root = tmp_path / "repo"
+    scan_root.mkdir()
+    (scan_root / "big.txt").write_text(("John Doe " + "z" * 91) * 50)
+    scan_kwargs = dict(use_cache=True, cache_dir=str(tmp_path / "cache"), min_entities_threshold=2)
+
+    scan_directory_for_pii(str(scan_root), None, "", **scan_kwargs)
+    assert mock_analyzer.analyze.call_count == 2
+
+    result = scan_directory_for_pii(str(scan_root), None, "", **scan_kwargs)
+    assert mock_analyzer.analyze.call_count == 2
+    assert '- "/big.txt"' in result
+    assert "Stopped early after reaching the entity threshold: 1 large files" in result
+    assert "1 hits" in result
+
+    # A higher threshold needs more of the file than the stored partial result covers
+    scan_directory_for_pii(str(scan_root), None, "", **{**scan_kwargs, 'min_entities_threshold': 3})
+    assert mock_analyzer.analyze.call_count == 5
+
+
+def test_analysis_byte_limit(tmp_path, mock_analyzer, small_windows):
+    """Test that the byte limit is reported and can be turned off."""
+    mock_analyzer.analyze.side_effect = _fake_analyze_with_offsets
+    (tmp_path / "big.txt").write_text("a" * 500 + " John Doe " + "John Doe")
+
+    limited_result = scan_directory_for_pii(
+        str(tmp_path), None, "", max_analyzed_bytes=300,
+        progress=MagicMock(spec=gr.Progress)
+    )
+    assert "Partially analyzed (only the first 300 bytes): 1 files" in limited_result
+    assert "#   /big.txt" in limited_result
+    assert "No significant PII found" in limited_result
+
+    unlimited_result = scan_directory_for_pii(
+        str(tmp_path), None, "", max_analyzed_bytes=0,
+        progress=MagicMock(spec=gr.Progress)
+    )
+    assert "Partially analyzed" not in unlimited_result
+    assert '- "/big.txt"' in unlimited_result
+
+
+def test_scan_directory_prefilter_skips_nlp(tmp_path, mock_analyzer):
+    """Test that files failing the prefilter never reach the analyzer."""
+    mock_analyzer.analyze.side_effect = fake_analyze
+    (tmp_path / "table.csv").write_text("0,1,2\n3,4,5\n")
+    (tmp_path / "people.txt").write_text("John Doe and Jane Smith")
+
+    result = scan_directory_for_pii(
+        str(tmp_path), None, "", selected_entity_types=["PERSON"],
+        progress=MagicMock(spec=gr.Progress)
+    )
+    assert "skipped NLP for 1 files" in result
+    assert mock_analyzer.analyze.call_count == 1
+    assert '- "/people.txt"' in result
+
+    scan_directory_for_pii(
+        str(tmp_path), None, "", selected_entity_types=["PERSON"], use_prefilter=False,
+        progress=MagicMock(spec=gr.Progress)
+    )
+    assert mock_analyzer.analyze.call_count == 3
+
+
+def test_scan_directory_batched_nlp_matches_per_file(temp_test_dir, mock_analyzer):
+    """Test that batching small files through the NLP engine keeps the output."""
+    mock_analyzer.analyze.side_effect = fake_analyze
+    for i in range(10):
+        with open(os.path.join(temp_test_dir, f"extra_{i}.txt"), 'w') as f:
+            f.write("John Doe " * i)
+
+    per_file_result = scan_directory_for_pii(
+        temp_test_dir, None, "", nlp_batch_size=1, progress=MagicMock(spec=gr.Progress)
+    )
+    assert mock_analyzer.nlp_engine.process_batch.call_count == 0
+
+    batched_result = scan_directory_for_pii(
+        temp_test_dir, None, "", nlp_batch_size=4, progress=MagicMock(spec=gr.Progress)
+    )
+    # 12 files reach the analyzer in batches of 4 (library.js has no comments or strings)
+    assert mock_analyzer.nlp_engine.process_batch.call_count == 3
+    assert all(
+        call_args[1]['batch_size'] == 4
+        for call_args in mock_analyzer.nlp_engine.process_batch.call_args_list
+    )
+    assert batched_result == per_file_result
+
+
+def test_scanner_import_does_not_load_ui_or_nlp():
+    """Test that the core scanner imports without Gradio, spaCy or Presidio."""
+    script = (
+        "import sys, ghcp_exclusion_builder.scanner; "
+        "print(','.join(m for m in ('gradio', 'spacy', 'presidio_analyzer') if m in sys.modules))"
+    )
+    completed = subprocess.run(
+        [sys.executable, "-c", script], capture_output=True, text=True, check=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    )
+    assert completed.stdout.strip() == ""
+
+
+def test_scan_directory_reports_progress_to_callback(temp_test_dir, mock_analyzer):
+    """Test that progress goes to a plain callback as (done, total, desc)."""
+    mock_analyzer.analyze.return_value = []
+    reports = []
+    scan_directory_for_pii(
+        temp_test_dir, None, "",
+        progress=lambda done, total, desc: reports.append((done, total, desc))
+    )
+    assert [done for done, _total, _desc in reports] == [1, 2, 3, 4]
+    assert all(total in (None, 4) for _done, total, _desc in reports)
+
+    assert "Scan complete" in scan_directory_for_pii(temp_test_dir, None, "")
+
+
+def test_scan_directory_streams_findings_without_collecting_rules(temp_test_dir, mock_analyzer):
+    """Test that findings reach the callback and are not kept when rules are not collected."""
+    mock_analyzer.analyze.side_effect = fake_analyze
+    findings = []
+    result = scan_directory_for_pii(
+        temp_test_dir, None, "", min_entities_threshold=1,
+        on_finding=findings.append, collect_rules=False
+    )
+    assert sorted(f['path'] for f in findings) == ['file2.txt', 'subdir/file3.txt']
+    assert all(f['pii_types'] == {'PERSON': f['pii_count']} for f in findings)
+    assert "Found significant PII in 2 of 4 files" in result
+    assert '- "' not in result
+
+
+def test_scan_directory_skips_binary_and_empty_files(tmp_path, mock_analyzer):
+    """Test that binary and empty files never reach the analyzer and are reported."""
+    mock_analyzer.analyze.side_effect = fake_analyze
+    (tmp_path / "weights.bin").write_bytes(b"\x00\x01John Doe\x00" * 100)
+    (tmp_path / "empty.txt").write_bytes(b"")
+    (tmp_path / "blank.txt").write_text("   \n\n")
+    (tmp_path / "people.txt").write_bytes(codecs.BOM_UTF16_LE + "John Doe, Jane Smith".encode("utf-16-le"))
+
+    result = scan_directory_for_pii(str(tmp_path), None, "", progress=MagicMock(spec=gr.Progress))
+    assert "# Skipped without analysis: 1 binary, 2 empty files" in result
+    assert '- "/people.txt"' in result
+    assert mock_analyzer.analyze.call_count == 1
+    assert mock_analyzer.analyze.call_args[1]['text'] == "John Doe, Jane Smith"
+
+
+def test_windowed_analysis_keeps_multibyte_text_whole(tmp_path, mock_analyzer, small_windows):
+    """Test that byte-based windows never split a character."""
+    seen_texts = []
+
+    def record_analyze(text, language, entities, nlp_artifacts=None):
+        seen_texts.append(text)
+        return []
+
+    mock_analyzer.analyze.side_effect = record_analyze
+    text = "Zoë Ångström 😀 " * 40
+    (tmp_path / "names.txt").write_text(text, encoding="utf-8")
+
+    scan_directory_for_pii(str(tmp_path), None, "", use_prefilter=False, progress=MagicMock(spec=gr.Progress))
+    assert len(seen_texts) > 1
+    assert all("�" not in window for window in seen_texts)
+    assert all(window in text for window in seen_texts)
+
+
+def test_scan_directory_cancel_event(temp_test_dir, mock_analyzer):
+    """Test that setting the cancel event stops the scan with partial results."""
+    mock_analyzer.analyze.side_effect = fake_analyze
+    cancel_event = threading.Event()
+    findings = []
+
+    def on_finding(finding):
+        findings.append(finding)
+        cancel_event.set()
+
+    result = scan_directory_for_pii(
+        temp_test_dir, None, "", min_entities_threshold=1,
+        on_finding=on_finding, cancel_event=cancel_event
+    )
+    assert len(findings) == 1
+    assert result.startswith("# Scan cancelled: Found significant PII in 1 of ")
+    assert "only the files analyzed before the scan was cancelled" in result
+    assert f'- "/{findings[0]["path"]}"' in result
+
+
+def test_scan_directory_profile(temp_test_dir, mock_analyzer):
+    """Test that a profile collects stage and per-file timing and is added to the summary."""
+    mock_analyzer.analyze.side_effect = fake_analyze
+    spans = []
+    profile = ScanProfile(slowest_count=2, on_span=lambda name, start, duration, attributes: spans.append(name))
+
+    result = scan_directory_for_pii(temp_test_dir, None, "", min_entities_threshold=1, profile=profile)
+    profile_dict = profile.as_dict()
+    assert profile_dict['files'] == 4
+    assert profile_dict['bytes'] == sum(
+        os.path.getsize(os.path.join(root, name)) for root, _dirs, names in os.walk(temp_test_dir)
+        for name in names if not name.endswith('.pyc')
+    )
+    assert {'walk', 'exclusions', 'read', 'decode', 'extract', 'prefilter', 'analyze'} <= set(
+        profile_dict['stage_seconds']
+    )
+    assert len(profile_dict['slowest_files']) == 2
+    assert profile_dict['slowest_files'][0]['seconds'] >= profile_dict['slowest_files'][1]['seconds']
+    # library.js has no comments or strings to analyze
+    assert spans.count('extract') == 1 and spans.count('analyze') == 3 and spans[-1] == 'scan'
+    assert "# Timing: " in result
+    assert "# Slowest 2 files:" in result
+
+
+def test_scan_directory_without_profile_records_no_spans(temp_test_dir, mock_analyzer):
+    """Test that files are not timed unless a profile is given."""
+    mock_analyzer.analyze.side_effect = fake_analyze
+    with patch('ghcp_exclusion_builder.profiling.ScanProfile.add_file') as add_file:
+        result = scan_directory_for_pii(temp_test_dir, None, "", min_entities_threshold=1)
+    add_file.assert_not_called()
+    assert "# Timing" not in result
+
+
+def test_scan_directory_minimizes_rules(tmp_path, mock_analyzer):
+    """Test that a mostly flagged directory collapses into one glob and the saving is reported."""
+    mock_analyzer.analyze.side_effect = fake_analyze
+    for i in range(4):
+        (tmp_path / "people" / f"p{i}.txt").parent.mkdir(exist_ok=True)
+        (tmp_path / "people" / f"p{i}.txt").write_text("John Doe and Jane Smith")
+    (tmp_path / "people" / "index.txt").write_text("Directory of contacts")
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "main.txt").write_text("John Doe wrote this")
+    (tmp_path / "src" / "util.txt").write_text("Nothing here")
+
+    result = scan_directory_for_pii(str(tmp_path), None, "", min_entities_threshold=1, minimize_ratio=0.8)
+    assert '- "/people/**"' in result
+    assert '- "/src/main.txt"' in result
+    assert '- "/people/p0.txt"' not in result
+    assert "# Minimized rules: 5 per-file rules -> 2 rules (3 saved; 1 directory and 0 extension globs" in result
+
+    unminimized = scan_directory_for_pii(str(tmp_path), None, "", min_entities_threshold=1)
+    assert '- "/people/p0.txt"' in unminimized
+    assert "Minimized rules" not in unminimized
+
+
+def test_scan_directory_respects_gitignore(tmp_path, mock_analyzer):
+    """Test that ignored files are only skipped when use_gitignore is set."""
+    mock_analyzer.analyze.side_effect = fake_analyze
+    (tmp_path / ".gitignore").write_text("generated/\n")
+    (tmp_path / "generated").mkdir()
+    (tmp_path / "generated" / "fixtures.txt").write_text("John Doe and Jane Smith")
+    (tmp_path / "people.txt").write_text("John Doe and Jane Smith")
+
+    result = scan_directory_for_pii(str(tmp_path), None, "", use_gitignore=True)
+    assert '- "/people.txt"' in result
+    assert "generated" not in result.split("\n\n", 1)[1]
+    assert "# Ignored by .gitignore: 1 files and directories (not walked)" in result
+
+    result = scan_directory_for_pii(str(tmp_path), None, "")
+    assert '- "/generated/fixtures.txt"' in result
+
+
+def test_scan_directory_guards_long_runs_and_lines(mock_analyzer):
+    """Whitespace-free runs and long lines are split before analysis; files with nothing left are skipped."""
+    mock_analyzer.analyze.return_value = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        with open(os.path.join(tmp_dir, 'people.txt'), 'w') as f:
+            f.write("names " + ",".join(f"Person{i}" for i in range(300)) + "\n")
+        with open(os.path.join(tmp_dir, 'blob.txt'), 'w') as f:
+            f.write("QUJD" * 2000)
+        with open(os.path.join(tmp_dir, 'dump.txt'), 'w') as f:
+            f.write("Jane Doe lives here " * 1000)
+        result = scan_directory_for_pii(tmp_dir, None, "", selected_entity_types=["PERSON"])
+
+    analyzed_texts = [call.kwargs['text'] for call in mock_analyzer.analyze.call_args_list]
+    assert len(analyzed_texts) == 2
+    assert any("Person1 Person2" in text for text in analyzed_texts)
+    assert all(len(line) <= 10_000 for text in analyzed_texts for line in text.split("\n"))
+    assert "Guard: split whitespace-free runs over 1000 characters before analysis in 2 files" in result
+    assert "Guard: split lines over 10000 characters before analysis in 1 files" in result
+    assert "Skipped without analysis: 1 no-whitespace files" in result
+
+
+@pytest.mark.skipif(
+    "fork" not in multiprocessing.get_all_start_methods(),
+    reason="Analysis is abandoned by killing a forked process"
+)
+def test_scan_directory_abandons_files_over_time_budget(temp_test_dir, mock_analyzer):
+    """A file whose analysis overruns the budget is reported instead of holding up the scan."""
+    mock_result = MagicMock(entity_type="PERSON", start=0, end=4, score=0.9)
+
+    def analyze(text, language, entities, nlp_artifacts=None):
+        if "John Doe" in text:
+            threading.Event().wait(30)
+        return [mock_result] * 2 if "Jane" in text else []
+
+    mock_analyzer.analyze.side_effect = analyze
+    findings = []
+    result = scan_directory_for_pii(
+        temp_test_dir, None, "", file_time_budget=0.5, nlp_batch_size=8, on_finding=findings.append
+    )
+
+    assert "Abandoned after the per-file time budget of 0.5 s (review or exclude): 1 files\n#   /file2.txt\n" in result
+    assert "Found significant PII in 1 of 4 files" in result
+    assert [finding['path'] for finding in findings if 'error' in finding] == ['file2.txt']
+    assert findings[0]['error'] == "Analysis abandoned: ran out of time (per-file time budget 0.5 s)"
+
+
+def test_scan_directory_analyzes_comments_and_strings_of_source_files(mock_analyzer, tmp_path):
+    """Only comments and string literals of source files reach the analyzer; other files keep their text."""
+    mock_analyzer.analyze.side_effect = fake_analyze
+    (tmp_path / 'models.py').write_text('class JohnDoe:\n    """Owned by Jane Smith."""\n')
+    (tmp_path / 'handlers.py').write_text('def JaneSmith(x):\n    return x\n')
+    (tmp_path / 'notes.txt').write_text('class JohnDoe: pass\n')
+
+    result = scan_directory_for_pii(str(tmp_path), None, "", min_entities_threshold=1)
+    analyzed_texts = sorted(call.kwargs['text'] for call in mock_analyzer.analyze.call_args_list)
+    assert analyzed_texts == ['"""Owned by Jane Smith."""', 'class JohnDoe: pass\n']
+    assert "Skipped without analysis: 1 code-only files" in result
+    assert "Source extraction: analyzed only comments, strings and values of 2 source files (26 of 77 characters)" \
+        in result
+
+    mock_analyzer.analyze.reset_mock()
+    scan_directory_for_pii(str(tmp_path), None, "", min_entities_threshold=1, extract_source=False)
+    assert mock_analyzer.analyze.call_count == 3
+
+
+def test_scan_directory_samples_data_files_by_column(mock_analyzer, tmp_path):
+    """Data files are analyzed from samples per column, and findings name the columns holding PII."""
+    def analyze(text, language, entities, nlp_artifacts=None):
+        return [
+            MagicMock(entity_type="EMAIL_ADDRESS", score=1.0, start=match.start(), end=match.end())
+            for match in re.finditer(r"\S+@\S+", text)
+        ]
+
+    mock_analyzer.analyze.side_effect = analyze
+    with open(tmp_path / 'users.csv', 'w') as f:
+        f.write("id,contact,notes\n")
+        f.writelines(f"{i},user{i}@example.com,note {i}\n" for i in range(5000))
+    (tmp_path / 'settings.json').write_text('{"owner": "ops@example.com", "admin": "root@example.com"}')
+    findings = []
+    result = scan_directory_for_pii(
+        str(tmp_path), None, "", selected_entity_types=["EMAIL_ADDRESS"], max_analyzed_bytes=1000,
+        on_finding=findings.append
+    )
+
+    users_text = next(
+        call.kwargs['text'] for call in mock_analyzer.analyze.call_args_list if "contact: " in call.kwargs['text']
+    )
+    assert users_text.count("contact: user") == 50 and "notes: note 0\n" in users_text
+    assert {finding['path']: finding.get('pii_columns') for finding in findings} == {
+        'users.csv': {'contact': ['EMAIL_ADDRESS']}, 'settings.json': None
+    }
+    assert "(Contains: 50 EMAIL_ADDRESS; columns: contact (EMAIL_ADDRESS))." in result
+    assert "Column sampling: analyzed up to 50 values per column in 1 data files" in result
+    # Sampled files are not cut at the byte limit
+    assert "Partially analyzed" not in result
+
+
+def test_scan_directory_profile_with_sampled_data_file(mock_analyzer, tmp_path):
+    """Profiled scans account for data files, whose results also name the column."""
+    mock_analyzer.analyze.side_effect = lambda text, language, entities, nlp_artifacts=None: [
+        MagicMock(entity_type="EMAIL_ADDRESS", score=1.0, start=match.start(), end=match.end())
+        for match in re.finditer(r"\S+@\S+", text)
+    ]
+    (tmp_path / 'users.csv').write_text("id,contact\n" + "".join(f"{i},user{i}@example.com\n" for i in range(10)))
+    profile = ScanProfile(slowest_count=1)
+
+    result = scan_directory_for_pii(
+        str(tmp_path), None, "", selected_entity_types=["EMAIL_ADDRESS"], min_entities_threshold=1, profile=profile
+    )
+    assert '- "/users.csv"' in result
+    assert profile.slowest_files()[0]['significant_entities'] == 10
+
+
+def test_sampled_data_files_count_repeated_values_and_cache_by_sample(mock_analyzer, tmp_path):
+    """A value repeated across rows counts once per row, and cache keys cover the sample, not the whole file."""
+    mock_analyzer.analyze.side_effect = lambda text, language, entities, nlp_artifacts=None: [
+        MagicMock(entity_type="EMAIL_ADDRESS", score=1.0, start=match.start(), end=match.end())
+        for match in re.finditer(r"\S+@\S+", text)
+    ]
+    (tmp_path / 'owners.csv').write_text("id,owner\n" + "".join(f"{i},ops@example.com\n" for i in range(20)))
+    scan_kwargs = dict(selected_entity_types=["EMAIL_ADDRESS"], use_cache=True, cache_dir=str(tmp_path / "cache"))
+
+    result = scan_directory_for_pii(str(tmp_path), None, "", **scan_kwargs)
+    assert "(Contains: 20 EMAIL_ADDRESS; columns: owner (EMAIL_ADDRESS))." in result
+
+    with patch("ghcp_exclusion_builder.structured_data.STRUCTURED_RANGE_BYTES", 64):
+        (tmp_path / 'big.csv').write_text("id,owner\n" + "".join(f"{i},user{i}@example.com\n" for i in range(1000)))
+        scan_directory_for_pii(str(tmp_path), None, "", **scan_kwargs)
+        # Rows between the sampled ranges are not part of the key
+        with open(tmp_path / 'big.csv', 'r+') as f:
+            f.seek(f.read().index("\n500,") + 1)
+            f.write("999")
+        rescan_result = scan_directory_for_pii(str(tmp_path), None, "", **scan_kwargs)
+    assert "# Analysis cache: 2 hits, 0 misses" in rescan_result
+
+
+def test_parallel_scan_reports_missing_model_before_starting_workers(temp_test_dir):
+    """A parallel scan checks for the spaCy model without loading it in the parent process."""
+    with patch('ghcp_exclusion_builder.scanner.get_presidio_analyzer') as get_analyzer:
+        result = scan_directory_for_pii(
+            temp_test_dir, None, "", selected_entity_types=["PERSON"], num_workers=2,
+            spacy_model_name="en_core_web_missing"
+        )
+    assert result.startswith("Error initializing PII analyzer: SpaCy model 'en_core_web_missing' is required")
+    get_analyzer.assert_not_called()
+
+
+def test_ragged_and_header_only_data_files_are_analyzed_as_text(mock_analyzer, tmp_path):
+    """Data files that cannot be sampled by column fall back to the full text."""
+    mock_analyzer.analyze.side_effect = lambda text, language, entities, nlp_artifacts=None: [
+        MagicMock(entity_type="EMAIL_ADDRESS", score=1.0, start=match.start(), end=match.end())
+        for match in re.finditer(r"\S+@\S+", text)
+    ]
+    (tmp_path / 'people.csv').write_text(
+        "name,email,notes\nJane,jane@example.com,tea, no sugar\nBob,bob@example.com,ok\n"
+        "Ann,ann@example.com,yes, no, maybe\n"
+    )
+    (tmp_path / 'header.csv').write_text("name,email\n")
+    result = scan_directory_for_pii(str(tmp_path), None, "", selected_entity_types=["EMAIL_ADDRESS"])
+    assert '- "/people.csv"' in result
+    # The header-only file goes to the prefilter like any text file, rather than counting as empty
+    assert "empty files" not in result
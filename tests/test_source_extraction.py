@@ -0,0 +1,47 @@
+import pytest
+from ghcp_exclusion_builder.source_extraction import extract_source_text, source_language
+
+
+def test_source_language_by_extension():
+    assert source_language("src/app/Main.JAVA") == "java"
+    assert source_language("web/App.tsx") == "javascript"
+    assert source_language("deploy/values.yml") == "yaml"
+    assert source_language("README.md") is None
+    assert source_language("Makefile") is None
+
+
+def test_python_keeps_comments_docstrings_and_strings():
+    text = (
+        "class JaneSmith(Base):\n"
+        '    """Maintained by Jane Smith."""\n'
+        "    # don't remove: \"owner\" is Bob\n"
+        "    owner = 'it\\'s ' + \"x # not a comment\"\n"
+    )
+    extracted = extract_source_text("python", text)
+    assert extracted.split("\n") == [
+        '"""Maintained by Jane Smith."""',
+        "# don't remove: \"owner\" is Bob",
+        "'it\\'s '",
+        '"x # not a comment"',
+    ]
+    assert "class" not in extracted and "owner =" not in extracted
+
+
+@pytest.mark.parametrize("language, text, expected", [
+    ("javascript", 'const RobertJones = f("a // b"); // Robert\'s code\n/* mail "x@y.io" */ let t = `two\nlines`;',
+     ['"a // b"', "// Robert's code", '/* mail "x@y.io" */', "`two\nlines`"]),
+    ("java", 'String s = """\n  Jane Doe\n  """; char c = \'x\'; /* unterminated',
+     ['"""\n  Jane Doe\n  """', "'x'", "/* unterminated"]),
+    ("csharp", 'var p = @"C:\\dir ""quoted"""; // Tom', ['@"C:\\dir ""quoted"""', "// Tom"]),
+    ("go", "func SendMail() { s := `raw\nstring` } // by Ann", ["`raw\nstring`", "// by Ann"]),
+    ("yaml", '# Owner: Jane\nname: Jane Doe\n- email: a@b.com  # work\n"quoted key": v: x\nurl: http://x.y/#top\n',
+     ["# Owner: Jane", "Jane Doe", "a@b.com  ", "# work", "v: x", "http://x.y/#top"]),
+    ("json", '{"name": "Jane Doe", "phone": 5551234567, "tags": ["Bob"], "nested": {"key" : "v"}}',
+     ['"Jane Doe"', "5551234567", '"Bob"', '"v"']),
+])
+def test_extracts_comments_strings_and_values(language, text, expected):
+    assert extract_source_text(language, text) == "\n".join(expected)
+
+
+def test_code_without_comments_or_strings_extracts_nothing():
+    assert extract_source_text("python", "def f(x):\n    return x + 1\n") == ""
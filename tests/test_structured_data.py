@@ -0,0 +1,67 @@
+import json
+from unittest.mock import patch
+from ghcp_exclusion_builder.structured_data import (
+    STRUCTURED_VALUES_PER_COLUMN, column_sample_text, sample_columns, sampled_value_at, structured_format
+)
+
+
+def _sample(text, data_format):
+    return sample_columns(text.encode("utf-8"), data_format, "utf-8", 0, 1)
+
+
+def test_structured_format_by_extension():
+    assert structured_format("fixtures/Users.CSV") == "csv"
+    assert structured_format("export.ndjson") == "jsonl"
+    assert structured_format("notes.txt") is None
+
+
+def test_csv_columns_with_header():
+    text = "id,email,comment\n" + "".join(
+        f'{i},user{i % 3}@example.com,"Call me, {i}"\n' for i in range(10)
+    )
+    samples = _sample(text, "csv")
+    assert list(samples) == ["id", "email", "comment"]
+    # Repeated values are sampled once, with the number of rows holding them
+    assert samples["email"] == {"user0@example.com": 4, "user1@example.com": 3, "user2@example.com": 3}
+    assert list(samples["comment"])[0] == "Call me, 0"
+
+
+def test_tsv_without_header_gets_numbered_columns():
+    text = "".join(f"{i}\t{i * 7}\tJane Doe {i}\n" for i in range(20))
+    samples = _sample(text, "tsv")
+    assert list(samples) == ["column 1", "column 2", "column 3"]
+
+
+def test_rows_are_sampled_across_large_files():
+    text = "name,email\n" + "".join(f"Person {i},p{i}@example.com\n" for i in range(200_000))
+    with patch("ghcp_exclusion_builder.structured_data.STRUCTURED_RANGE_BYTES", 4096):
+        samples = _sample(text, "csv")
+    assert len(samples["email"]) == STRUCTURED_VALUES_PER_COLUMN
+    row_numbers = [int(value.split()[1]) for value in samples["name"]]
+    assert row_numbers[0] == 0 and row_numbers[-1] > 150_000
+
+
+def test_jsonl_and_json_records_are_flattened():
+    records = [{"id": i, "user": {"email": f"u{i}@example.com"}, "tags": ["x"], "active": True} for i in range(5)]
+    jsonl_samples = _sample("".join(json.dumps(record) + "\n" for record in records), "jsonl")
+    assert jsonl_samples == _sample(json.dumps(records, indent=2), "json")
+    assert list(jsonl_samples) == ["id", "user.email", "tags[]"]
+    assert list(jsonl_samples["user.email"])[4] == "u4@example.com"
+    assert jsonl_samples["tags[]"] == {"x": 5}
+
+    assert _sample('{"name": "config"}', "json") is None
+    assert _sample('["a", "b"]', "jsonl") is None
+
+
+def test_column_sample_text_maps_offsets_to_values():
+    text, value_starts = column_sample_text({"email": {"a@b.com": 1, "c@d.com": 3}, "notes": {"line one\nline two": 1}})
+    assert text == "email: a@b.com\nemail: c@d.com\n\nnotes: line one line two"
+    assert sampled_value_at(value_starts, text.index("c@d.com")) == ("email", 3)
+    assert sampled_value_at(value_starts, text.index("line two")) == ("notes", 1)
+
+
+def test_ragged_csv_is_not_sampled():
+    text = "name,email,notes\nJane,jane@example.com,tea, no sugar\nBob,bob@example.com,ok\nAnn,ann@example.com,yes, no, maybe\n"
+    assert _sample(text, "csv") is None
+    # A few ragged rows among regular ones are only dropped
+    assert list(_sample("a,b\n1,2\n3,4\n5,6,7\n", "csv")["a"]) == ["1", "3"]
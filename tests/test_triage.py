@@ -0,0 +1,127 @@
+import io
+import json
+import random
+import pytest
+from unittest.mock import MagicMock, patch
+from ghcp_exclusion_builder.cli import build_parser, run_triage, EXIT_PII_FOUND
+from .conftest import fake_presidio_analyzer
+from ghcp_exclusion_builder.triage import (
+    estimate_directory_densities, provisional_rules, sampled_reader, triage_directory_for_pii
+)
+
+
+def _fake_analyze(text, language, entities, nlp_artifacts=None):
+    """One PERSON hit per "Doe" in the text."""
+    return [MagicMock(entity_type="PERSON", score=0.9) for _ in range(text.count("Doe"))]
+
+
+@pytest.fixture
+def mock_analyzer():
+    with patch('ghcp_exclusion_builder.triage.get_presidio_analyzer') as mock_get_analyzer:
+        analyzer = fake_presidio_analyzer(_fake_analyze)
+        mock_get_analyzer.return_value = analyzer
+        yield analyzer
+
+
+@pytest.fixture
+def share(tmp_path):
+    """A hot directory of customer exports next to a mostly clean source tree."""
+    for i in range(40):
+        (tmp_path / "exports" / "2024").mkdir(parents=True, exist_ok=True)
+        (tmp_path / "exports" / "2024" / f"customers_{i}.csv").write_text("John Doe,Jane Doe\n")
+        (tmp_path / "src" / "lib").mkdir(parents=True, exist_ok=True)
+        (tmp_path / "src" / "lib" / f"module_{i}.py").write_text("print('hello')\n")
+    (tmp_path / "src" / "AUTHORS").write_text("John Doe and Jane Doe\n")
+    return tmp_path
+
+
+def _stratum(files, analyzed, flagged):
+    return {'files': files, 'bytes': files * 10, 'analyzed': analyzed, 'flagged': flagged}
+
+
+def test_sampled_reader_keeps_small_files_whole(tmp_path):
+    (tmp_path / "small.txt").write_bytes(b"John Doe\n")
+    stats = {}
+    with sampled_reader(sample_bytes=100, stats=stats)(str(tmp_path / "small.txt")) as data:
+        assert data[:] == b"John Doe\n"
+    assert stats['bytes'] == 9
+
+
+def test_sampled_reader_samples_whole_lines(tmp_path):
+    lines = [f"line {i:05d} John Doe\n".encode() for i in range(10000)]
+    (tmp_path / "big.txt").write_bytes(b"".join(lines))
+    stats = {}
+    reader = sampled_reader(sample_bytes=4000, ranges_per_file=4, rng=random.Random(3), stats=stats)
+    with reader(str(tmp_path / "big.txt")) as data:
+        sample = bytes(data)
+    assert sample.startswith(lines[0])
+    assert 3000 < len(sample) <= 4003 and stats['bytes'] == len(sample)
+    sampled_lines = sample.split(b"\n")
+    # Apart from the end of the head range, every sampled line is complete
+    assert sum(line + b"\n" not in lines for line in sampled_lines) <= 1
+    assert max(int(line[5:10]) for line in sampled_lines if line + b"\n" in lines) > 7500
+
+
+def test_estimates_are_stratified_over_subdirectories():
+    estimates = {
+        estimate['directory']: estimate for estimate in estimate_directory_densities({
+            'a/': _stratum(100, 10, 10),
+            'b/': _stratum(300, 10, 0),
+            'c/': _stratum(50, 0, 0),
+        })
+    }
+    root = estimates['']
+    assert root['files'] == 450 and root['sampled_files'] == 20
+    assert root['density'] == pytest.approx(0.25)
+    assert root['estimated_flagged_files'] == pytest.approx(112.5)
+    assert root['coverage'] == pytest.approx(400 / 450)
+    assert 0 < root['low'] < 0.25 < root['high'] < 1
+    assert estimates['c/']['density'] is None
+    assert estimates['a/']['low'] > 0.7
+
+
+def test_fully_sampled_directory_has_an_exact_estimate():
+    estimate, = estimate_directory_densities({'': _stratum(4, 4, 1)})
+    assert estimate['density'] == estimate['low'] == estimate['high'] == 0.25
+
+
+def test_provisional_rules_use_topmost_hot_directories():
+    estimates = estimate_directory_densities({
+        'data/': _stratum(40, 10, 10), 'data/raw/': _stratum(40, 10, 10), 'src/': _stratum(40, 10, 1),
+    })
+    rule_lines = provisional_rules(estimates, 0.5)
+    assert [line for line in rule_lines if line.startswith("- ")] == ['- "/data/**"']
+
+
+def test_triage_finds_hot_directory(share, mock_analyzer):
+    directories = []
+    report = triage_directory_for_pii(str(share), None, "", seed=7, on_directory=directories.append)
+    assert report.startswith("# Triage complete: sampled 11 of 81 files")
+    assert mock_analyzer.analyze.call_count == 5 + 1  # Prefilter skips the clean modules
+    assert directories[0]['directory'] == "" and directories[1]['directory'] == "exports/"
+    assert '- "/exports/**"' in report
+    assert '- "/src/**"' not in report
+
+
+def test_triage_stops_at_byte_budget(share, mock_analyzer):
+    report = triage_directory_for_pii(str(share), None, "", byte_budget=50, seed=7)
+    assert "# Budget spent after" in report
+    assert "of 11 sampled files" in report
+
+
+def test_triage_batches_sampled_files(share, mock_analyzer):
+    batched = triage_directory_for_pii(str(share), None, "", seed=7)
+    assert mock_analyzer.nlp_engine.process_batch.call_count >= 1
+    per_file = triage_directory_for_pii(str(share), None, "", nlp_batch_size=1, seed=7)
+    # Same report apart from the elapsed time in its first line
+    assert per_file.split("\n")[1:] == batched.split("\n")[1:]
+
+
+def test_triage_cli_jsonl(share, mock_analyzer):
+    args = build_parser().parse_args([str(share), "--triage", "--seed", "1"])
+    stream = io.StringIO()
+    assert run_triage(args, stream) == EXIT_PII_FOUND
+    records = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [record['type'] for record in records[:-1]] == ["directory"] * 5
+    assert records[-1]['type'] == "summary"
+    assert {record['directory'] for record in records[:-1]} == {"/", "/exports/", "/exports/2024/", "/src/", "/src/lib/"}
@@ -0,0 +1,70 @@
+import os
+import pytest
+from ghcp_exclusion_builder.exclusions import ExclusionMatcher, is_excluded
+from ghcp_exclusion_builder.walker import walk_directory
+
+
+@pytest.fixture
+def temp_tree(tmp_path):
+    """Create a small directory tree with excluded and included entries."""
+    test_files = {
+        'root.txt': 'root',
+        'image.png': 'binary-ish',
+        'src/app.py': 'code',
+        'src/deep/nested/data.csv': 'a,b',
+        'node_modules/lib/index.js': 'vendored',
+        'build/out.txt': 'built',
+        'project/build/keep.txt': 'not a root build dir',
+    }
+    for file_path, content in test_files.items():
+        full_path = tmp_path / file_path
+        full_path.parent.mkdir(parents=True, exist_ok=True)
+        full_path.write_text(content)
+    return str(tmp_path)
+
+
+PATTERNS = ["*.png", "/node_modules/**", "/build/**"]
+
+
+def test_walk_directory_applies_exclusions(temp_tree):
+    """Test that the walker yields exactly the non-excluded files."""
+    walked = {rel for rel, _, _ in walk_directory(temp_tree, ExclusionMatcher(PATTERNS))}
+
+    assert walked == {
+        'root.txt', 'src/app.py', 'src/deep/nested/data.csv', 'project/build/keep.txt'
+    }
+
+
+def test_walk_directory_matches_reference_walk(temp_tree):
+    """Test that the walker agrees with os.walk plus is_excluded pruning."""
+    expected = set()
+    for root, dirs, files in os.walk(temp_tree):
+        rel_root = os.path.relpath(root, temp_tree).replace(os.sep, '/')
+        prefix = "" if rel_root == '.' else rel_root + '/'
+        dirs[:] = [d for d in dirs if not is_excluded(prefix + d + '/', PATTERNS)]
+        expected.update(prefix + f for f in files if not is_excluded(prefix + f, PATTERNS))
+
+    walked = {rel for rel, _, _ in walk_directory(temp_tree, ExclusionMatcher(PATTERNS))}
+    assert walked == expected
+
+
+def test_walk_directory_yields_paths_and_sizes(temp_tree):
+    """Test that absolute paths and stat sizes come with each relative path."""
+    for rel, file_path_abs, file_size in walk_directory(temp_tree, ExclusionMatcher(PATTERNS)):
+        assert file_path_abs == os.path.join(temp_tree, *rel.split('/'))
+        assert file_size == os.path.getsize(file_path_abs)
+
+
+def test_walk_directory_prunes_before_listing(temp_tree):
+    """Test that excluded directories are never listed and stats are filled in."""
+    stats = {}
+    walker = walk_directory(temp_tree, ExclusionMatcher(PATTERNS), stats)
+    first = next(walker)
+    assert first[0] == 'root.txt'
+    assert stats['complete'] is False
+
+    list(walker)
+    assert stats['complete'] is True
+    assert stats['files'] == 4
+    # Root, src, src/deep, src/deep/nested, project, project/build
+    assert stats['directories'] == 6